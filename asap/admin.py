@@ -1,8 +1,28 @@
+from django import forms
 from django.contrib import admin
+from django.shortcuts import render, redirect
+from django.urls import path
 from django.contrib.auth.admin import UserAdmin as DjangoUserAdmin
 from django.utils.translation import ugettext_lazy as _
 
-from .models import User, Student, Prof, Research, Unit, Record
+from .models import User, Student, Prof, Research, Unit, Record, Waitlist, Preference, OutboundMail, ArchivedUnit, ArchivedRecord
+from .importer import SemesterImporter, ImportFailed, read_rows, read_bundle
+from .pagination import EstimatedCountPaginator
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """Changelist settings for tables that grow every semester.
+
+    Counts come from :class:`EstimatedCountPaginator` and the second
+    ``COUNT(*)`` over the unfiltered table is skipped.  Number columns
+    (student/prof/research number) are searched exactly, so their index can
+    answer the lookup; prefix lookups on names compile to LIKE, which SQLite
+    cannot take from an index, so a search that includes them scans.
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    list_per_page = 50
+
 
 class StudentInline(admin.StackedInline):
     model = Student
@@ -11,7 +31,7 @@ class ProfInline(admin.StackedInline):
     model = Prof
 
 @admin.register(User)
-class UserAdmin(admin.ModelAdmin):
+class UserAdmin(LargeTableAdmin):
     inlines = (StudentInline, ProfInline)
     fieldsets = (
         (None, {'fields': ('email', 'password')}),
@@ -19,56 +39,160 @@ class UserAdmin(admin.ModelAdmin):
         ('Permissions', {'fields': ('is_active', 'is_staff', 'is_superuser', 'is_student', 'is_prof')}))
 
     list_display = ('email', 'name', 'sex', 'is_active', 'is_superuser', 'is_student', 'is_prof', 'date_joined') #무엇을 노출
-    search_fields = ('email', 'name', 'sex', 'is_active', 'is_superuser', 'is_student', 'is_prof', 'date_joined')
-    ordering = ('email', 'name', 'sex', 'is_active', 'is_student', 'is_prof', 'date_joined')
+    list_filter = ('is_student', 'is_prof', 'is_active', 'is_staff')
+    search_fields = ('email__startswith', 'name__startswith')
+    ordering = ('email',)
 
-class StudentAdmin(admin.ModelAdmin):
+class StudentAdmin(LargeTableAdmin):
     fieldsets = (
         ('Personal info', {'fields': ('student_number', 'user', 'major',)}),
     )
     list_display = ('student_number', 'user', 'major', )
-    search_fields = ('student_number', 'user', 'major', )
-    ordering = ('student_number', 'user', 'major', )
+    list_select_related = ('user', )
+    search_fields = ('student_number__exact', 'user__name__startswith', 'user__email__startswith', )
+    autocomplete_fields = ('user', )
+    ordering = ('student_number', )
 
-class ProfAdmin(admin.ModelAdmin):
+class ProfAdmin(LargeTableAdmin):
     fieldsets = (
         ('Personal info', {'fields': ('prof_number', 'user', 'major',) }),
     )
     list_display = ('prof_number',  'user', 'major', )
-    search_fields = ('prof_number', 'user', 'major', )
-    ordering = ('prof_number', 'user', 'major', )
+    list_select_related = ('user', )
+    search_fields = ('prof_number__exact', 'user__name__startswith', 'user__email__startswith', )
+    autocomplete_fields = ('user', )
+    ordering = ('prof_number', )
+
+class SemesterImportForm(forms.Form):
+    bundle = forms.FileField(required=False, help_text='"researches", "units", "students" 목록을 가진 JSON 파일')
+    researches = forms.FileField(required=False, help_text='research_number, research_name, prof_number, year, semester, description')
+    units = forms.FileField(required=False, help_text='research_number, year, semester, place, date, period, max_number, remark')
+    students = forms.FileField(required=False, help_text='email, name, sex, student_number, major')
+
+
+class ResearchAdmin(LargeTableAdmin):
+    change_list_template = 'admin/asap/research/change_list.html'
+
+    def get_urls(self):
+        urls = [
+            path('import/', self.admin_site.admin_view(self.import_view), name='asap_research_import'),
+        ]
+        return urls + super().get_urls()
+
+    def import_view(self, request):
+        form = SemesterImportForm(request.POST or None, request.FILES or None)
+        errors = []
+        if request.method == 'POST' and form.is_valid():
+            data = form.cleaned_data
+            try:
+                if data['bundle']:
+                    researches, units, students = read_bundle(data['bundle'])
+                else:
+                    researches, units, students = [
+                        read_rows(data[kind], data[kind].name) if data[kind] else []
+                        for kind in ('researches', 'units', 'students')]
+                counts = SemesterImporter().run(researches, units, students)
+            except ImportFailed as exc:
+                errors = exc.errors
+            except ValueError as exc:
+                errors = [str(exc)]
+            else:
+                self.message_user(request, '실험 %d개, 세션 %d개, 학생 %d명을 등록했습니다.' % (
+                    counts['Research'], counts['Unit'], counts['Student']))
+                return redirect('admin:asap_research_changelist')
+        context = dict(self.admin_site.each_context(request), opts=self.model._meta,
+                       form=form, errors=errors, title='학기 일괄 등록')
+        return render(request, 'admin/asap/research/import.html', context)
 
-class ResearchAdmin(admin.ModelAdmin):
     fieldsets = (
         ('Research info', {'fields': ('research_number', 'research_name',
                                       'prof_obj', 'year', 'semester', 'description', 'created_date',)}),
     )
     list_display = ('research_number', 'research_name', 'prof_obj',
-                    'year', 'semester', 'description', 'created_date',)
-    search_fields = ('research_number', 'research_name', 'prof_obj',
-                     'year', 'semester', 'description', 'created_date',)
-    ordering = ('research_number', 'research_name', 'prof_obj',
-                'year', 'semester', 'description', 'created_date',)
+                    'year', 'semester', 'created_date',)
+    list_select_related = ('prof_obj__user', )
+    list_filter = ('year', 'semester', )
+    date_hierarchy = 'created_date'
+    search_fields = ('research_number__exact', 'research_name__startswith', 'prof_obj__user__name__startswith',)
+    autocomplete_fields = ('prof_obj', )
+    readonly_fields = ('created_date', )
+    ordering = ('-pk',)
 
 
-class UnitAdmin(admin.ModelAdmin):
+class UnitAdmin(LargeTableAdmin):
     fieldsets = (
         ('Unit info', {'fields': ('research_obj', 'date', 'place', 'max_number', 'current_number', 'remark',)}),
     )
     list_display = ('research_obj', 'date', 'place',
                     'max_number', 'current_number', 'remark',)
-    search_fields = ('research_obj', 'date', 'place',
-                     'max_number', 'current_number', 'remark',)
-    ordering = ('research_obj', 'date', 'place',
-                'max_number', 'current_number', 'remark',)
+    list_select_related = ('research_obj', )
+    list_filter = ('research_obj__year', 'research_obj__semester', )
+    date_hierarchy = 'date'
+    search_fields = ('research_obj__research_number__exact', 'research_obj__research_name__startswith',
+                     'place__startswith',)
+    autocomplete_fields = ('research_obj', )
+    ordering = ('-date',)
 
-class RecordAdmin(admin.ModelAdmin):
+class RecordAdmin(LargeTableAdmin):
     fieldsets = (
         ('Record info', {'fields': ('score', )}),
     )
-    list_display = ('score', )
-    search_fields = ('score', )
-    ordering = ('unit_obj', 'student_obj',)
+    list_display = ('__str__', 'student_obj', 'unit_date', 'score', )
+    list_select_related = ('unit_obj__research_obj', 'student_obj__user', )
+    list_filter = ('unit_obj__research_obj__year', 'unit_obj__research_obj__semester', 'score', )
+    search_fields = ('student_obj__student_number__exact', 'student_obj__user__name__startswith',
+                     'unit_obj__research_obj__research_number__exact',)
+    ordering = ('-pk',)
+
+    def unit_date(self, obj):
+        return obj.unit_obj.date
+    unit_date.short_description = 'date'
+    unit_date.admin_order_field = 'unit_obj__date'
+
+class WaitlistAdmin(LargeTableAdmin):
+    list_display = ('__str__', 'student_obj', 'created_date', )
+    list_select_related = ('unit_obj__research_obj', 'student_obj__user', )
+    search_fields = ('student_obj__student_number__exact', 'student_obj__user__name__startswith',)
+    autocomplete_fields = ('student_obj', 'unit_obj', )
+    ordering = ('unit_obj', 'pk',)
+
+class PreferenceAdmin(LargeTableAdmin):
+    list_display = ('__str__', 'unit_obj', 'rank', 'created_date', )
+    list_select_related = ('unit_obj__research_obj', 'student_obj', )
+    list_filter = ('unit_obj__research_obj__year', 'unit_obj__research_obj__semester', 'rank', )
+    search_fields = ('student_obj__student_number__exact', )
+    autocomplete_fields = ('student_obj', 'unit_obj', )
+    ordering = ('student_obj', 'rank',)
+
+class OutboundMailAdmin(LargeTableAdmin):
+    list_display = ('subject', 'to', 'created_date', 'attempts', 'next_attempt', 'sent_date', )
+    search_fields = ('to__startswith', 'subject__startswith', )
+    readonly_fields = ('created_date', 'sent_date', 'last_error', )
+
+class ArchiveAdmin(LargeTableAdmin):
+    """Archived semesters are read-only; they change only through archive_semester."""
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+class ArchivedUnitAdmin(ArchiveAdmin):
+    list_display = ('research_name', 'date', 'place', 'max_number', 'current_number', 'archived_date', )
+    list_filter = ('year', 'semester', )
+    search_fields = ('research_number__exact', 'research_name__startswith', )
+    ordering = ('-date',)
+
+class ArchivedRecordAdmin(ArchiveAdmin):
+    list_display = ('__str__', 'student_number', 'total', 'score', )
+    list_select_related = ('unit_obj', )
+    list_filter = ('unit_obj__year', 'unit_obj__semester', 'score', )
+    search_fields = ('student_number__exact', )
+    ordering = ('-pk',)
 
 # Register your models here.
 admin.site.register(Student, StudentAdmin)
@@ -76,3 +200,8 @@ admin.site.register(Prof, ProfAdmin)
 admin.site.register(Research, ResearchAdmin)
 admin.site.register(Unit, UnitAdmin)
 admin.site.register(Record, RecordAdmin)
+admin.site.register(Waitlist, WaitlistAdmin)
+admin.site.register(Preference, PreferenceAdmin)
+admin.site.register(OutboundMail, OutboundMailAdmin)
+admin.site.register(ArchivedUnit, ArchivedUnitAdmin)
+admin.site.register(ArchivedRecord, ArchivedRecordAdmin)
@@ -0,0 +1,124 @@
+"""Helpers for the read-only JSON API views in views.py.
+
+Every response carries an ETag and answers a matching ``If-None-Match``
+with an empty 304.  ``?fields=a,b`` limits the keys of each object
+(``unit_fields`` for the units nested in a research) and
+``?after=<pk>&size=<n>`` pages through listings by primary key.
+Listings show the current semester; ``?year=<n>&semester=<1|2>`` picks a
+past one.
+"""
+import hashlib
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
+
+from . import catalogue
+from .models import Research
+from .pagination import PAGE_SIZE
+
+MAX_PAGE_SIZE = 100
+
+RESEARCH_FIELDS = {
+    'id': lambda r: r.pk,
+    'research_number': lambda r: r.research_number,
+    'research_name': lambda r: r.research_name,
+    'year': lambda r: r.year,
+    'semester': lambda r: r.semester,
+    'prof': lambda r: r.prof_obj.user.name,
+    'description': lambda r: r.description,
+    'created_date': lambda r: r.created_date,
+}
+
+UNIT_FIELDS = {
+    'id': lambda u: u.pk,
+    'research': lambda u: u.research_obj_id,
+    'place': lambda u: u.place,
+    'date': lambda u: u.date,
+    'end_date': lambda u: u.end_date,
+    'period': lambda u: u.period,
+    'current_number': lambda u: u.current_number,
+    'max_number': lambda u: u.max_number,
+    'remark': lambda u: u.remark,
+}
+
+RECORD_FIELDS = {
+    'id': lambda r: r.pk,
+    'unit': lambda r: r.unit_obj_id,
+    'research': lambda r: r.unit_obj.research_obj_id,
+    'research_number': lambda r: r.unit_obj.research_obj.research_number,
+    'research_name': lambda r: r.unit_obj.research_obj.research_name,
+    'place': lambda r: r.unit_obj.place,
+    'date': lambda r: r.unit_obj.date,
+    'score': lambda r: r.score,
+    'total': lambda r: r.total,
+}
+
+
+class ParamError(ValueError):
+    pass
+
+
+class FieldError(ParamError):
+    pass
+
+
+def select_fields(request, available, param='fields'):
+    """Field names asked for with ``?fields=``; all of them by default."""
+    names = [name.strip() for name in request.GET.get(param, '').split(',') if name.strip()]
+    unknown = [name for name in names if name not in available]
+    if unknown:
+        raise FieldError('알 수 없는 필드: %s' % ', '.join(unknown))
+    return names or list(available)
+
+
+def serialize(objects, available, names):
+    return [{name: available[name](obj) for name in names} for obj in objects]
+
+
+def page_size(request):
+    try:
+        return max(1, min(int(request.GET['size']), MAX_PAGE_SIZE))
+    except (KeyError, ValueError):
+        return PAGE_SIZE
+
+
+def requested_semester(request):
+    """``(year, semester)`` asked for with ``?year=&semester=``; the current semester by default."""
+    year, semester = request.GET.get('year'), request.GET.get('semester')
+    if year is None and semester is None:
+        return catalogue.current_semester()
+    if not (year and year.isdigit() and semester in dict(Research.SEME)):
+        raise ParamError('year와 semester를 함께 지정해야 합니다.')
+    return int(year), semester
+
+
+def make_etag(*parts):
+    data = json.dumps(parts, cls=DjangoJSONEncoder, sort_keys=True)
+    return quote_etag(hashlib.md5(data.encode()).hexdigest())
+
+
+def error(message, status=400):
+    return JsonResponse({'error': message}, status=status, json_dumps_params={'ensure_ascii': False})
+
+
+def conditional_json(request, build, etag=None):
+    """JSON response of ``build()`` or a bodyless 304.
+
+    With an ``etag`` computed up front ``build`` is skipped entirely when the
+    client's copy is current; without one the ETag is a hash of the payload,
+    which still saves the transfer.
+    """
+    payload = None
+    if etag is None:
+        payload = build()
+        etag = make_etag(payload)
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = JsonResponse(build() if payload is None else payload,
+                                json_dumps_params={'ensure_ascii': False})
+    response['ETag'] = etag
+    response['Cache-Control'] = 'private, no-cache'  # 매번 ETag로 재검증
+    return response
@@ -0,0 +1,70 @@
+"""Move a closed semester's units and records out of the hot tables.
+
+After archiving, Unit, Record, Waitlist and UnitSummary only hold the
+semesters still in use; the history stays readable through ArchivedUnit
+and ArchivedRecord (admin, research info page), optionally in a separate
+SQLite file (ARCHIVE_DATABASE).  Researches stay where they are.
+"""
+from django.conf import settings
+from django.db import transaction
+
+from .db import write_atomic
+from .models import Unit, Record, ArchivedUnit, ArchivedRecord
+from . import catalogue
+
+# SQLite의 바인딩 변수 한도(999)를 넘지 않도록 pk 목록을 나눈다
+CHUNK_SIZE = 500
+
+
+class ArchiveRefused(Exception):
+    pass
+
+
+def _chunks(items, size):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def _copy(unit_pks):
+    units = (Unit.objects.filter(pk__in=unit_pks)
+             .values_list('pk', 'research_obj_id', 'research_obj__research_number', 'research_obj__research_name',
+                          'research_obj__year', 'research_obj__semester', 'place', 'date', 'end_date', 'period',
+                          'max_number', 'current_number', 'remark'))
+    ArchivedUnit.objects.bulk_create([
+        ArchivedUnit(id=pk, research_id=research_pk, research_number=number, research_name=name,
+                     year=year, semester=semester, place=place, date=date, end_date=end_date, period=period,
+                     max_number=max_number, current_number=current_number, remark=remark)
+        for pk, research_pk, number, name, year, semester, place, date, end_date, period,
+        max_number, current_number, remark in units])
+    records = (Record.objects.filter(unit_obj_id__in=unit_pks)
+               .values_list('pk', 'unit_obj_id', 'student_obj_id', 'student_obj__student_number', 'total', 'score'))
+    archived = [ArchivedRecord(id=pk, unit_obj_id=unit_pk, student_pk=student_pk, student_number=number,
+                               total=total, score=score)
+                for pk, unit_pk, student_pk, number, total, score in records]
+    ArchivedRecord.objects.bulk_create(archived, batch_size=CHUNK_SIZE)
+    return len(archived)
+
+
+def archive_semester(year, semester, chunk_size=CHUNK_SIZE, force=False):
+    """Copy the semester's units and records into the archive, then delete them.
+
+    The copy is committed before the delete starts, and a rerun replaces
+    whatever an interrupted run left in the archive, so it is safe to retry.
+    Refuses the current semester unless ``force``.  Returns the counts.
+    """
+    if not force and catalogue.current_semester() == (year, semester):
+        raise ArchiveRefused('%s-%s 학기는 현재 학기이므로 보관할 수 없습니다.' % (year, semester))
+    unit_pks = list(Unit.objects.in_semester(year, semester).order_by('pk').values_list('pk', flat=True))
+    counts = {'units': len(unit_pks), 'records': 0}
+    if not unit_pks:
+        return counts
+
+    with transaction.atomic(using=settings.ARCHIVE_DATABASE):
+        for chunk in _chunks(unit_pks, chunk_size):
+            ArchivedUnit.objects.filter(pk__in=chunk).delete()
+            counts['records'] += _copy(chunk)
+    with write_atomic():
+        for chunk in _chunks(unit_pks, chunk_size):
+            Unit.objects.filter(pk__in=chunk).delete()  # Record, Waitlist, UnitSummary도 함께 지워진다
+    catalogue.invalidate_semester(year, semester)
+    return counts
@@ -0,0 +1,338 @@
+"""Static asset pipeline: bundles, referenced-only collection, hashing, precompression.
+
+``manage.py collectstatic`` does the whole build:
+
+* :class:`ReferencedFinder` collects from this app only the files templates,
+  bundles and their CSS actually use (not the demo samples, screenshots
+  and tests shipped with the theme);
+* :class:`BundledManifestStorage` concatenates each bundle in BUNDLES into
+  ``bundles/<name>``, content-hashes every file like
+  ManifestStaticFilesStorage and writes ``.gz`` (and ``.br`` when the
+  ``brotli`` package is installed) next to each compressible file;
+* :class:`StaticFilesApplication` serves the result straight from the WSGI
+  app, picking the precompressed variant and sending far-future cache
+  headers for hashed names.
+
+Templates include a bundle with ``{% load assets %}{% asset_bundle 'site.css' %}``;
+with ASSET_BUNDLES off (DEBUG) it expands to the member files one by one.
+"""
+import gzip
+import json
+import mimetypes
+import os
+import posixpath
+import re
+from email.utils import formatdate
+
+from django.apps import apps
+from django.conf import settings
+from django.contrib.staticfiles.finders import AppDirectoriesFinder
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+
+try:
+    import brotli
+except ImportError:  # .br 파일은 brotli 패키지가 있을 때만 만든다
+    brotli = None
+
+BUNDLES = {
+    'site.css': [
+        'lib/owlcarousel/assets/owl.carousel.min.css',
+        'lib/owlcarousel/assets/owl.theme.default.min.css',
+        'lib/font-awesome/css/font-awesome.min.css',
+        'lib/animate/animate.min.css',
+        'lib/modal-video/css/modal-video.min.css',
+        'css/style.css',
+    ],
+    'site.js': [
+        'lib/jquery/jquery.min.js',
+        'lib/jquery/jquery-migrate.min.js',
+        'lib/bootstrap/js/bootstrap.bundle.min.js',
+        'lib/superfish/hoverIntent.js',
+        'lib/superfish/superfish.min.js',
+        'lib/easing/easing.min.js',
+        'lib/modal-video/js/modal-video.js',
+        'lib/owlcarousel/owl.carousel.min.js',
+        'lib/wow/wow.min.js',
+        'contactform/contactform.js',
+        'js/main.js',
+    ],
+    'login.css': [
+        'vendor/bootstrap/css/bootstrap.min.css',
+        'fonts/font-awesome-4.7.0/css/font-awesome.min.css',
+        'vendor/animate/animate.css',
+        'vendor/css-hamburgers/hamburgers.min.css',
+        'vendor/animsition/css/animsition.min.css',
+        'vendor/select2/select2.min.css',
+        'vendor/daterangepicker/daterangepicker.css',
+        'css/util.css',
+        'css/main.css',
+    ],
+    'login.js': [
+        'vendor/jquery/jquery-3.2.1.min.js',
+        'vendor/animsition/js/animsition.min.js',
+        'vendor/bootstrap/js/popper.js',
+        'vendor/bootstrap/js/bootstrap.min.js',
+        'vendor/select2/select2.min.js',
+        'vendor/daterangepicker/moment.min.js',
+        'vendor/daterangepicker/daterangepicker.js',
+        'vendor/countdowntime/countdowntime.js',
+        'js/main.js',
+    ],
+}
+BUNDLE_DIR = 'bundles'
+
+STATIC_TAG_RE = re.compile(r'''\{%\s*static\s+['"]([^'"]+)['"]\s*%\}''')
+CSS_URL_RE = re.compile(r'''url\(\s*['"]?([^'")]+?)['"]?\s*\)|@import\s+['"]([^'"]+)['"]''')
+CSS_COMMENT_RE = re.compile(r'/\*(?!!).*?\*/', re.S)
+CSS_STRING_RE = re.compile(r'''("(?:[^"\\\n]|\\.)*"|'(?:[^'\\\n]|\\.)*')''')
+
+COMPRESSIBLE = ('.css', '.js', '.svg', '.json', '.txt', '.html', '.xml', '.map', '.ico', '.eot', '.ttf', '.otf')
+# 압축해도 이만큼 줄지 않으면 변형 파일을 만들지 않는다
+MIN_SAVING = 0.95
+
+
+def bundle_path(name):
+    return posixpath.join(BUNDLE_DIR, name)
+
+
+def _is_local(url):
+    return not re.match(r'^(?:[a-z]+:|//|#|/)', url, re.I)
+
+
+def css_references(path, content):
+    """Static paths referenced by ``url()``/``@import`` in the CSS at ``path``."""
+    base = posixpath.dirname(path)
+    for match in CSS_URL_RE.finditer(content):
+        url = (match.group(1) or match.group(2)).strip()
+        if _is_local(url):
+            yield posixpath.normpath(posixpath.join(base, re.split(r'[?#]', url)[0]))
+
+
+def _rebase_css(path, content, target):
+    """Rewrite relative urls of the CSS at ``path`` so they work from ``target``."""
+    source, destination = posixpath.dirname(path), posixpath.dirname(target)
+
+    def rebase(match):
+        url = match.group(1)
+        if not _is_local(url):
+            return match.group(0)
+        absolute = posixpath.normpath(posixpath.join(source, url))
+        return 'url("%s")' % posixpath.relpath(absolute, destination)
+    return re.sub(r'''url\(\s*['"]?([^'")]+?)['"]?\s*\)''', rebase, content)
+
+
+def minify_css(content):
+    """Drop comments (except /*! licences) and collapse whitespace outside strings."""
+    parts = CSS_STRING_RE.split(CSS_COMMENT_RE.sub('', content))
+    for i in range(0, len(parts), 2):  # 홀수 번째 조각은 따옴표 문자열이므로 그대로 둔다
+        parts[i] = re.sub(r'\s*([{};,>])\s*', r'\1', re.sub(r'\s+', ' ', parts[i]))
+    return ''.join(parts).strip()
+
+
+def build_bundle(name, read):
+    """Contents of bundle ``name``; ``read(path)`` returns a member's text.
+
+    JavaScript members are only concatenated (most are already minified);
+    CSS members get their urls rebased onto the bundle's directory.
+    """
+    target = bundle_path(name)
+    parts = []
+    for path in BUNDLES[name]:
+        content = read(path)
+        if name.endswith('.css'):
+            parts.append(minify_css(_rebase_css(path, content, target)))
+        else:
+            parts.append(content.rstrip().rstrip(';') + ';')
+    return '\n'.join(parts) + '\n'
+
+
+# <------------------------------------수집------------------------------------>
+
+def _template_dirs():
+    dirs = [d for engine in settings.TEMPLATES for d in engine.get('DIRS', [])]
+    dirs += [os.path.join(config.path, 'templates') for config in apps.get_app_configs()]
+    return [d for d in dirs if os.path.isdir(d)]
+
+
+def referenced_assets(storage):
+    """Paths in ``storage`` used by templates, bundles and, recursively, their CSS."""
+    pending = {path for members in BUNDLES.values() for path in members}
+    for directory in _template_dirs():
+        for root, _, files in os.walk(directory):
+            for filename in files:
+                if filename.endswith(('.html', '.txt')):
+                    with open(os.path.join(root, filename), encoding='utf-8', errors='replace') as f:
+                        pending.update(STATIC_TAG_RE.findall(f.read()))
+    found = set()
+    while pending:
+        path = pending.pop()
+        if path in found or not storage.exists(path):
+            continue
+        found.add(path)
+        if path.endswith('.css'):
+            with storage.open(path) as f:
+                pending.update(css_references(path, f.read().decode('utf-8', 'replace')))
+    return found
+
+
+class ReferencedFinder(AppDirectoriesFinder):
+    """AppDirectoriesFinder that lists only the referenced files of this app.
+
+    Other apps (admin, datepicker) are collected in full; ``find`` is
+    unchanged, so development serving still sees every file.
+    """
+
+    def list(self, ignore_patterns):
+        own = self.storages.get(__package__)
+        referenced = referenced_assets(own) if own is not None else set()
+        for path, storage in super().list(ignore_patterns):
+            if storage is not own or path in referenced:
+                yield path, storage
+
+
+class BundledManifestStorage(ManifestStaticFilesStorage):
+    """Manifest storage that also writes the bundles and precompressed variants."""
+
+    manifest_strict = False
+
+    def stored_name(self, name):
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            # 템플릿이 없는 파일을 가리켜도 500 대신 원래 경로로 둔다
+            return name
+
+    def post_process(self, paths, dry_run=False, **options):
+        if not dry_run:
+            for name in BUNDLES:
+                path = bundle_path(name)
+                content = build_bundle(name, self._read_collected)
+                if self.exists(path):
+                    self.delete(path)
+                self._save(path, ContentFile(content.encode('utf-8')))
+                paths[path] = (self, path)
+        yield from super().post_process(paths, dry_run, **options)
+        if not dry_run:
+            for name in set(self.hashed_files.values()) | set(paths):
+                if name.endswith(COMPRESSIBLE) and self.exists(name):
+                    self.compress(name)
+
+    def _read_collected(self, path):
+        with self.open(path) as f:
+            return f.read().decode('utf-8')
+
+    def compress(self, name):
+        with self.open(name) as f:
+            data = f.read()
+        variants = [('.gz', gzip.compress(data, 9))]
+        if brotli is not None:
+            variants.append(('.br', brotli.compress(data)))
+        for suffix, compressed in variants:
+            if len(compressed) < len(data) * MIN_SAVING:
+                if self.exists(name + suffix):
+                    self.delete(name + suffix)
+                self._save(name + suffix, ContentFile(compressed))
+
+
+# <------------------------------------서빙------------------------------------>
+
+class StaticFile:
+
+    def __init__(self, path):
+        self.path = path
+        self.variants = {}
+        base, ext = os.path.splitext(path)
+        content_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        if content_type.startswith('text/') or content_type in ('application/javascript', 'image/svg+xml'):
+            content_type += '; charset=utf-8'
+        self.content_type = content_type
+        for encoding, suffix in (('br', '.br'), ('gzip', '.gz')):
+            if os.path.exists(path + suffix):
+                self.variants[encoding] = path + suffix
+
+    def choose(self, accept_encoding):
+        for encoding, path in self.variants.items():
+            if encoding in accept_encoding:
+                return encoding, path
+        return None, self.path
+
+
+class StaticFilesApplication:
+    """WSGI wrapper serving STATIC_ROOT before the request reaches Django.
+
+    Files are indexed once at startup.  Hashed names from the manifest are
+    cached for a year as immutable; other files for CACHE_SECONDS.
+    """
+
+    CACHE_SECONDS = 60
+    HASHED_CACHE_SECONDS = 365 * 24 * 60 * 60
+
+    def __init__(self, application, root, prefix):
+        self.application = application
+        self.prefix = prefix
+        self.files = {}
+        self.hashed = set()
+        manifest = os.path.join(root, ManifestStaticFilesStorage.manifest_name)
+        if os.path.exists(manifest):
+            with open(manifest) as f:
+                self.hashed = set(json.load(f).get('paths', {}).values())
+        for directory, _, filenames in os.walk(root):
+            for filename in filenames:
+                if filename.endswith(('.gz', '.br')):
+                    continue
+                path = os.path.join(directory, filename)
+                name = os.path.relpath(path, root).replace(os.sep, '/')
+                self.files[name] = StaticFile(path)
+
+    def __call__(self, environ, start_response):
+        path = environ.get('PATH_INFO', '')
+        if not path.startswith(self.prefix) or environ['REQUEST_METHOD'] not in ('GET', 'HEAD'):
+            return self.application(environ, start_response)
+        name = path[len(self.prefix):].encode('latin-1').decode('utf-8', 'replace')
+        static_file = self.files.get(name)
+        if static_file is None:
+            return self.application(environ, start_response)
+
+        encoding, filename = static_file.choose(environ.get('HTTP_ACCEPT_ENCODING', ''))
+        stat = os.stat(filename)
+        etag = '"%x-%x"' % (int(stat.st_mtime), stat.st_size)
+        max_age = self.HASHED_CACHE_SECONDS if name in self.hashed else self.CACHE_SECONDS
+        headers = [
+            ('Cache-Control', 'public, max-age=%d%s' % (max_age, ', immutable' if name in self.hashed else '')),
+            ('ETag', etag),
+            ('Last-Modified', formatdate(stat.st_mtime, usegmt=True)),
+        ]
+        if static_file.variants:
+            headers.append(('Vary', 'Accept-Encoding'))
+        if etag in environ.get('HTTP_IF_NONE_MATCH', '').split(', '):
+            start_response('304 Not Modified', headers)
+            return []
+        headers += [('Content-Type', static_file.content_type), ('Content-Length', str(stat.st_size))]
+        if encoding:
+            headers.append(('Content-Encoding', encoding))
+        start_response('200 OK', headers)
+        if environ['REQUEST_METHOD'] == 'HEAD':
+            return []
+        f = open(filename, 'rb')
+        file_wrapper = environ.get('wsgi.file_wrapper')
+        if file_wrapper:
+            return file_wrapper(f, 8192)
+        return _read_chunks(f)
+
+
+def _read_chunks(f):
+    with f:
+        yield from iter(lambda: f.read(8192), b'')
+
+
+def serve_static(application):
+    """Wrap the WSGI app with StaticFilesApplication when SERVE_STATIC is on.
+
+    Only a STATIC_ROOT written by collectstatic (it has the manifest) is
+    served, never an arbitrary directory such as a source tree.
+    """
+    root = settings.STATIC_ROOT or ''
+    if not settings.SERVE_STATIC or not os.path.exists(os.path.join(root, ManifestStaticFilesStorage.manifest_name)):
+        return application
+    return StaticFilesApplication(application, root, settings.STATIC_URL)
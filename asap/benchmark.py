@@ -0,0 +1,343 @@
+"""Registration-rush load generator used by ``manage.py loadtest``.
+
+Builds a throw-away population of professors, researches, units and
+students, then drives ``proj.wsgi.application`` directly from many threads
+(optionally in several forked processes) the way a class does at 09:00:
+open the enroll page, enroll into a popular unit, sometimes cancel.
+``manage.py lotterytest`` reuses the population to time asap.lottery.
+"""
+import datetime
+import multiprocessing
+import random
+import threading
+import time
+from collections import Counter, defaultdict
+from importlib import import_module
+from io import BytesIO
+from wsgiref.util import setup_testing_defaults
+
+from django.conf import settings
+from django.contrib.auth import SESSION_KEY, BACKEND_SESSION_KEY, HASH_SESSION_KEY
+from django.db import connection, connections
+from django.db.models import Count, F, Q
+from django.urls import reverse
+
+from proj.wsgi import application
+
+from .middleware import QueryCollector, _percentile
+from .models import User, Student, Prof, Research, Unit, Record, Waitlist, Preference
+from . import lottery, summary
+
+EMAIL_DOMAIN = 'loadtest.invalid'
+FIXTURE_SEMESTER = (2000, '1')
+
+
+# <------------------------------------가상 학기 생성------------------------------------>
+
+def generate_fixture(profs=5, researches=20, units=40, students=500, seats=20, seed=0):
+    """Create the test population with bulk_create; returns the pks to drive."""
+    rng = random.Random(seed)
+    cleanup()
+    prof_users = [User(email='prof%d@%s' % (i, EMAIL_DOMAIN), name='prof%d' % i, sex='M', is_prof=True)
+                  for i in range(profs)]
+    student_users = [User(email='student%d@%s' % (i, EMAIL_DOMAIN), name='student%d' % i,
+                          sex=rng.choice('MF'), is_student=True) for i in range(students)]
+    for user in prof_users + student_users:
+        user.set_unusable_password()
+    User.objects.bulk_create(prof_users + student_users, batch_size=500)
+    users = dict(User.objects.filter(email__endswith='@' + EMAIL_DOMAIN).values_list('email', 'pk'))
+
+    Prof.objects.bulk_create([Prof(user_id=users[u.email], prof_number='LT%d' % i, major='loadtest')
+                              for i, u in enumerate(prof_users)])
+    Student.objects.bulk_create([Student(user_id=users[u.email], student_number='LT%06d' % i, major='loadtest')
+                                 for i, u in enumerate(student_users)], batch_size=500)
+    prof_pks = [users[u.email] for u in prof_users]
+
+    Research.objects.bulk_create([
+        Research(research_number='LT%03d' % i, research_name='loadtest %d' % i,
+                 prof_obj_id=prof_pks[i % profs], year=FIXTURE_SEMESTER[0], semester=FIXTURE_SEMESTER[1])
+        for i in range(researches)])
+    research_pks = list(Research.objects.filter(research_number__startswith='LT', year=FIXTURE_SEMESTER[0])
+                        .order_by('pk').values_list('pk', flat=True))
+    start = datetime.datetime(2000, 3, 2, 9)
+    Unit.objects.bulk_create([
+        Unit(research_obj_id=research_pks[i % researches], place='LT-%d' % i,
+             date=start + datetime.timedelta(hours=i), period=1, max_number=seats,
+             remark='loadtest').set_end_date()
+        for i in range(units)])
+    unit_pks = list(Unit.objects.filter(research_obj_id__in=research_pks).order_by('pk').values_list('pk', flat=True))
+    summary.refresh(unit_pks)
+    student_pks = [users[u.email] for u in student_users]
+    return {'units': unit_pks, 'students': student_pks}
+
+
+def cleanup():
+    """Delete everything generate_fixture created; cascades to researches and records."""
+    User.objects.filter(email__endswith='@' + EMAIL_DOMAIN).delete()
+
+
+def login_sessions(student_pks):
+    """Create an authenticated session per student; returns pk -> cookie."""
+    SessionStore = import_module(settings.SESSION_ENGINE).SessionStore
+    cookies = {}
+    for user in User.objects.filter(pk__in=student_pks):
+        session = SessionStore()
+        session[SESSION_KEY] = str(user.pk)
+        session[BACKEND_SESSION_KEY] = 'django.contrib.auth.backends.ModelBackend'
+        session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+        session.save()
+        cookies[user.pk] = '%s=%s' % (settings.SESSION_COOKIE_NAME, session.session_key)
+    return cookies
+
+
+def logout_sessions(cookies):
+    SessionStore = import_module(settings.SESSION_ENGINE).SessionStore
+    for cookie in cookies.values():
+        SessionStore().delete(cookie.split('=', 1)[1])
+
+
+# <------------------------------------WSGI 호출------------------------------------>
+
+def wsgi_get(application, path, cookie):
+    environ = {
+        'REQUEST_METHOD': 'GET',
+        'PATH_INFO': path,
+        'HTTP_COOKIE': cookie,
+        'HTTP_HOST': 'localhost',
+        'wsgi.input': BytesIO(),
+    }
+    setup_testing_defaults(environ)
+    status = []
+
+    def start_response(status_line, headers, exc_info=None):
+        status.append(int(status_line.split()[0]))
+
+    result = application(environ, start_response)
+    try:
+        for _ in result:
+            pass
+    finally:
+        if hasattr(result, 'close'):
+            result.close()
+    return status[0]
+
+
+def _drive(application, jobs, results, think_time):
+    """Worker thread: run (cookie, unit) jobs and append timing samples."""
+    collector = QueryCollector()
+    with connection.execute_wrapper(collector):
+        for cookie, unit_pk in jobs:
+            steps = [('enroll_page', reverse('enroll_page')),
+                     ('enroll_unit', reverse('enroll_unit', args=[unit_pk]))]
+            for name, path in steps:
+                queries = collector.count
+                start = time.perf_counter()
+                try:
+                    status = wsgi_get(application, path, cookie)
+                except Exception as exc:
+                    status = repr(exc)
+                results.append((name, time.perf_counter() - start, collector.count - queries, status))
+            if think_time:
+                time.sleep(think_time)
+    connection.close()
+
+
+def _cancel(application, jobs, results):
+    """Second wave: students who decided to drop their seat cancel it."""
+    collector = QueryCollector()
+    with connection.execute_wrapper(collector):
+        for cookie, record_pk in jobs:
+            queries = collector.count
+            start = time.perf_counter()
+            try:
+                status = wsgi_get(application, reverse('cancel_unit', args=[record_pk]), cookie)
+            except Exception as exc:
+                status = repr(exc)
+            results.append(('cancel_unit', time.perf_counter() - start, collector.count - queries, status))
+    connection.close()
+
+
+def _run_threads(target, job_lists, *args):
+    results = []
+    threads = [threading.Thread(target=target, args=(application, jobs, results) + args)
+               for jobs in job_lists if jobs]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def _process_main(target, job_lists, args, queue):
+    queue.put(_run_threads(target, job_lists, *args))
+
+
+def _run(target, jobs, threads, processes, *args):
+    """Spread jobs over ``processes`` forked workers with ``threads`` each."""
+    lanes = threads * processes
+    job_lists = [jobs[i::lanes] for i in range(lanes)]
+    if processes <= 1:
+        return _run_threads(target, job_lists, *args)
+    connections.close_all()  # fork 전에 연결을 닫아 자식과 공유하지 않는다
+    context = multiprocessing.get_context('fork')
+    queue = context.Queue()
+    workers = [context.Process(target=_process_main,
+                               args=(target, job_lists[i * threads:(i + 1) * threads], args, queue))
+               for i in range(processes)]
+    for worker in workers:
+        worker.start()
+    results = []
+    for _ in workers:
+        results.extend(queue.get())
+    for worker in workers:
+        worker.join()
+    return results
+
+
+# <------------------------------------실행과 보고------------------------------------>
+
+def check_invariants(unit_pks):
+    """Units whose seat counter or summary disagrees with their records or exceeds capacity."""
+    broken = (Unit.objects.filter(pk__in=unit_pks)
+              .annotate(records=Count('record', distinct=True))
+              .filter(~Q(records=F('current_number')) | ~Q(summary__enrolled=F('current_number'))
+                      | Q(current_number__gt=F('max_number')))
+              .select_related('summary'))
+    violations = ['unit %d: current_number=%d records=%d summary=%d max_number=%d'
+                  % (u.pk, u.current_number, u.records, u.summary.enrolled, u.max_number) for u in broken]
+    both = Waitlist.objects.filter(unit_obj_id__in=unit_pks,
+                                   unit_obj__record__student_obj=F('student_obj')).count()
+    if both:
+        violations.append('%d students are both enrolled and waitlisted' % both)
+    return violations
+
+
+def rush(fixture, threads=16, processes=1, hot_units=5, cancel_rate=0.1, think_time=0, seed=0):
+    """One registration rush over the fixture; returns the report dict.
+
+    Every student opens the enroll page and enrolls into one of the first
+    ``hot_units`` units; afterwards ``cancel_rate`` of them drop their seat,
+    which exercises the waitlist promotion under the same load.
+    """
+    rng = random.Random(seed)
+    cookies = login_sessions(fixture['students'])
+    try:
+        hot = fixture['units'][:hot_units] or fixture['units']
+        jobs = [(cookies[pk], rng.choice(hot)) for pk in fixture['students']]
+        cancellers = [pk for pk in fixture['students'] if rng.random() < cancel_rate]
+
+        started = time.perf_counter()
+        samples = _run(_drive, jobs, threads, processes, think_time)
+        records = dict(Record.objects.filter(student_obj_id__in=cancellers)
+                       .values_list('student_obj_id', 'pk'))
+        samples += _run(_cancel, [(cookies[pk], records[pk]) for pk in cancellers if pk in records],
+                        threads, processes)
+        elapsed = time.perf_counter() - started
+    finally:
+        logout_sessions(cookies)
+    return report(samples, elapsed, check_invariants(fixture['units']))
+
+
+def report(samples, elapsed, violations):
+    by_step = defaultdict(list)
+    for name, seconds, queries, status in samples:
+        by_step[name].append((seconds, queries, status))
+    steps = {}
+    for name, rows in sorted(by_step.items()):
+        latency = [seconds * 1000 for seconds, _, _ in rows]
+        queries = [q for _, q, _ in rows]
+        statuses = Counter(str(status) for _, _, status in rows)
+        steps[name] = {
+            'requests': len(rows),
+            'latency_p50_ms': round(_percentile(latency, 50), 2),
+            'latency_p95_ms': round(_percentile(latency, 95), 2),
+            'latency_p99_ms': round(_percentile(latency, 99), 2),
+            'queries_p50': _percentile(queries, 50),
+            'queries_p95': _percentile(queries, 95),
+            'status': dict(statuses),
+        }
+    errors = sum(1 for _, _, _, status in samples if not isinstance(status, int) or status >= 500)
+    return {
+        'requests': len(samples),
+        'seconds': round(elapsed, 3),
+        'throughput_rps': round(len(samples) / elapsed, 1) if elapsed else 0,
+        'errors': errors,
+        'violations': violations,
+        'steps': steps,
+    }
+
+
+def compare(result, baseline, tolerance=0.2):
+    """Regressions of ``result`` against a saved baseline report."""
+    problems = []
+    if result['violations']:
+        problems.append('%d invariant violations' % len(result['violations']))
+    if result['errors'] > baseline.get('errors', 0):
+        problems.append('errors %d > baseline %d' % (result['errors'], baseline.get('errors', 0)))
+    if result['throughput_rps'] < baseline['throughput_rps'] * (1 - tolerance):
+        problems.append('throughput %.1f rps < baseline %.1f rps'
+                        % (result['throughput_rps'], baseline['throughput_rps']))
+    for name, step in result['steps'].items():
+        base = baseline['steps'].get(name)
+        if not base:
+            continue
+        if step['latency_p95_ms'] > base['latency_p95_ms'] * (1 + tolerance):
+            problems.append('%s p95 %.1f ms > baseline %.1f ms'
+                            % (name, step['latency_p95_ms'], base['latency_p95_ms']))
+        if step['queries_p95'] > base['queries_p95']:
+            problems.append('%s queries p95 %d > baseline %d'
+                            % (name, step['queries_p95'], base['queries_p95']))
+    return problems
+
+
+# <------------------------------------추첨 배정------------------------------------>
+
+def generate_preferences(fixture, choices=5, seed=0):
+    """Give every student ``choices`` distinct ranked units, skewed towards the first units.
+
+    Unit i is picked with weight 1/(i+1), so the first sessions are heavily
+    oversubscribed the way popular time slots are.
+    """
+    rng = random.Random(seed)
+    units = fixture['units']
+    weights = [1 / (i + 1) for i in range(len(units))]
+    choices = min(choices, len(units))
+    preferences = []
+    for student_pk in fixture['students']:
+        ranked = []
+        while len(ranked) < choices:
+            unit_pk = rng.choices(units, weights)[0]
+            if unit_pk not in ranked:
+                ranked.append(unit_pk)
+        preferences += [Preference(student_obj_id=student_pk, unit_obj_id=unit_pk, rank=rank)
+                        for rank, unit_pk in enumerate(ranked, 1)]
+    Preference.objects.bulk_create(preferences, batch_size=500)
+    return len(preferences)
+
+
+def check_assignments(unit_pks):
+    """Students holding two units of one research or two overlapping units."""
+    sessions = defaultdict(list)
+    for student_pk, research_pk, start, end in (Record.objects.filter(unit_obj_id__in=unit_pks)
+                                                .values_list('student_obj_id', 'unit_obj__research_obj_id',
+                                                             'unit_obj__date', 'unit_obj__end_date')):
+        sessions[student_pk].append((start, end, research_pk))
+    violations = []
+    for student_pk, held in sessions.items():
+        if len({research_pk for _, _, research_pk in held}) < len(held):
+            violations.append('student %d holds two units of one research' % student_pk)
+        held.sort()
+        if any(held[i][0] < held[i - 1][1] for i in range(1, len(held))):
+            violations.append('student %d holds overlapping units' % student_pk)
+    return violations
+
+
+def allocation(fixture, choices=5, seed=0):
+    """Time one lottery allocation over the fixture; returns the report dict."""
+    generate_preferences(fixture, choices, seed)
+    started = time.perf_counter()
+    stats = lottery.allocate(*FIXTURE_SEMESTER, seed=seed)
+    elapsed = time.perf_counter() - started
+    stats.update(seconds=round(elapsed, 3),
+                 violations=check_invariants(fixture['units']) + check_assignments(fixture['units']))
+    return stats
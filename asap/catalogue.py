@@ -0,0 +1,123 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Research, Unit, ArchivedUnit
+
+CATALOGUE_TIMEOUT = 60 * 60
+# 좌석 수는 짧게만 캐시해서 마감 여부가 오래 틀리지 않도록 한다
+SEAT_TIMEOUT = 2
+
+SEMESTERS_KEY = 'catalogue:semesters'
+
+
+def _semester_key(year, semester):
+    return 'catalogue:semester:%s:%s' % (year, semester)
+
+def _research_key(pk):
+    return 'catalogue:research:%s' % pk
+
+def _version_key(year, semester):
+    return 'catalogue:version:%s:%s' % (year, semester)
+
+def _seat_key(unit_pk):
+    return 'catalogue:seats:%s' % unit_pk
+
+
+# <------------------------------------조회------------------------------------>
+
+def semesters():
+    """All (year, semester) pairs that have researches, oldest first."""
+    result = cache.get(SEMESTERS_KEY)
+    if result is None:
+        result = sorted(set(Research.objects.values_list('year', 'semester')))
+        cache.set(SEMESTERS_KEY, result, CATALOGUE_TIMEOUT)
+    return result
+
+
+def current_semester():
+    """The (year, semester) open for enrollment: CURRENT_SEMESTER, else the newest one."""
+    if settings.CURRENT_SEMESTER:
+        year, semester = settings.CURRENT_SEMESTER.split('-')
+        return int(year), semester
+    pairs = semesters()
+    return pairs[-1] if pairs else None
+
+
+def semester_catalogue(year, semester):
+    """``(researches, units)`` of one semester, professors joined in."""
+    key = _semester_key(year, semester)
+    result = cache.get(key)
+    if result is None:
+        researches = list(Research.objects.in_semester(year, semester)
+                          .select_related('prof_obj__user').order_by('pk'))
+        units = list(Unit.objects.catalogue().in_semester(year, semester).order_by('pk'))
+        result = (researches, units)
+        cache.set(key, result, CATALOGUE_TIMEOUT)
+    return result
+
+
+def current_units():
+    """Units of the current semester with live seat counts."""
+    pair = current_semester()
+    return with_seats(list(semester_catalogue(*pair)[1])) if pair else []
+
+
+def research_detail(pk):
+    """``(research, units)`` for the info page; raises Research.DoesNotExist."""
+    key = _research_key(pk)
+    result = cache.get(key)
+    if result is None:
+        research = Research.objects.get(pk=pk)
+        units = list(Unit.objects.filter(research_obj=research).order_by('pk'))
+        if not units:  # 보관된 학기의 실험은 보관 표에서 읽는다
+            units = list(ArchivedUnit.objects.filter(research_id=pk).order_by('pk'))
+        result = (research, units)
+        cache.set(key, result, CATALOGUE_TIMEOUT)
+    research, units = result
+    return research, with_seats(units)
+
+
+def semester_version(year, semester):
+    """Counter bumped on every change to the semester's catalogue."""
+    return cache.get_or_set(_version_key(year, semester), int(time.time()), None)
+
+
+# <------------------------------------좌석 수------------------------------------>
+
+def seat_counts(unit_pks):
+    keys = {_seat_key(pk): pk for pk in unit_pks}
+    counts = {keys[key]: value for key, value in cache.get_many(keys).items()}
+    missing = [pk for pk in unit_pks if pk not in counts]
+    if missing:
+        fresh = dict(Unit.objects.filter(pk__in=missing).values_list('pk', 'current_number'))
+        cache.set_many({_seat_key(pk): n for pk, n in fresh.items()}, SEAT_TIMEOUT)
+        counts.update(fresh)
+    return counts
+
+
+def with_seats(units):
+    """Overlay the short-lived seat counts onto cached Unit instances."""
+    counts = seat_counts([unit.pk for unit in units])
+    for unit in units:
+        unit.current_number = counts.get(unit.pk, unit.current_number)
+    return units
+
+
+# <------------------------------------무효화------------------------------------>
+
+def invalidate_seats(unit_pk):
+    cache.delete(_seat_key(unit_pk))
+
+
+def invalidate_research(pk):
+    cache.delete(_research_key(pk))
+
+
+def invalidate_semester(year, semester):
+    cache.delete_many([SEMESTERS_KEY, _semester_key(year, semester)])
+    try:
+        cache.incr(_version_key(year, semester))
+    except ValueError:
+        cache.set(_version_key(year, semester), int(time.time()), None)
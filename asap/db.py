@@ -0,0 +1,26 @@
+from contextlib import contextmanager
+
+from django.db import transaction
+
+
+@contextmanager
+def write_atomic(using=None):
+    """``transaction.atomic`` that takes the write lock when it begins.
+
+    On the tuned SQLite backend the outermost block starts with
+    ``BEGIN IMMEDIATE``, so concurrent writers wait out the busy timeout
+    instead of failing with "database is locked" when a read turns into a
+    write.  Nested blocks and other databases get a plain atomic block.
+    """
+    connection = transaction.get_connection(using)
+    immediate = not connection.in_atomic_block and hasattr(connection, 'begin_immediate')
+    if immediate:
+        connection.begin_immediate = True
+    try:
+        with transaction.atomic(using=using):
+            if immediate:
+                connection.begin_immediate = False
+            yield
+    finally:
+        if immediate:
+            connection.begin_immediate = False
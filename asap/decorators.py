@@ -0,0 +1,25 @@
+from functools import wraps
+
+from django.contrib.auth.views import redirect_to_login
+from django.shortcuts import redirect
+
+
+def role_required(flag):
+    """Send anonymous users to login and users without ``user.<flag>`` to the warning page.
+
+    Only the user's flags are checked, so the decorator itself runs no query.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if not request.user.is_authenticated:
+                return redirect_to_login(request.get_full_path())
+            if not getattr(request.user, flag):
+                return redirect('warning')
+            return view(request, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+prof_required = role_required('is_prof')
+student_required = role_required('is_student')
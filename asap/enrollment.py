@@ -0,0 +1,174 @@
+from bisect import bisect_left
+from itertools import accumulate
+
+from django.db import IntegrityError, transaction
+from django.db.models import F, Count, IntegerField, OuterRef, Subquery
+
+from .models import Unit, Record, Waitlist
+from . import catalogue, live, summary
+from .db import write_atomic
+
+# 신청/취소 결과
+SUCCESS = 'success'
+WAITLISTED = 'waitlisted'
+ALREADY_ENROLLED = 'already_enrolled'
+ALREADY_WAITLISTED = 'already_waitlisted'
+NOT_ENROLLED = 'not_enrolled'
+CONFLICT = 'conflict'
+
+
+class ScheduleConflict(Exception):
+    """The student already has a unit overlapping the requested one."""
+
+
+def has_conflict(student_pk, unit_pk):
+    """Whether any of the student's other units overlaps ``unit_pk``, in one query.
+
+    Two sessions overlap when each starts before the other ends; the unit's
+    bounds come from subqueries so nothing is loaded into Python.
+    """
+    unit = Unit.objects.filter(pk=unit_pk)
+    return (Record.objects
+            .filter(student_obj_id=student_pk,
+                    unit_obj__date__lt=Subquery(unit.values('end_date')),
+                    unit_obj__end_date__gt=Subquery(unit.values('date')))
+            .exclude(unit_obj_id=unit_pk)
+            .exists())
+
+
+def conflicting_unit_pks(units, records):
+    """Pks of ``units`` overlapping any of the ``records``' units, in one pass.
+
+    Enrolled sessions are sorted by start once; for every unit a bisection
+    finds the sessions starting before it ends and a running maximum of
+    their end times tells whether one of them is still going.
+    """
+    sessions = sorted((r.unit_obj.date, r.unit_obj.end_date, r.unit_obj_id) for r in records)
+    starts = [start for start, _, _ in sessions]
+    latest_end = list(accumulate((end for _, end, _ in sessions), max))
+    enrolled = {pk for _, _, pk in sessions}
+    conflicts = set()
+    for unit in units:
+        i = bisect_left(starts, unit.end_date)
+        if i and latest_end[i - 1] > unit.date and unit.pk not in enrolled:
+            conflicts.add(unit.pk)
+    return conflicts
+
+
+def _seats_changed(unit_pk):
+    catalogue.invalidate_seats(unit_pk)
+    live.seats_changed(unit_pk)
+
+
+def _reserve(student_pk, unit_pk):
+    """Take a seat and insert the Record; returns False when the unit is full.
+
+    The increment is a conditional UPDATE, so concurrent requests can never
+    push ``current_number`` past ``max_number``.  A duplicate Record raises
+    IntegrityError and rolls the seat back with it; an overlapping session
+    raises ScheduleConflict before any seat is taken.
+    """
+    with write_atomic():
+        if has_conflict(student_pk, unit_pk):
+            raise ScheduleConflict
+        taken = (Unit.objects
+                 .filter(pk=unit_pk, current_number__lt=F('max_number'))
+                 .update(current_number=F('current_number') + 1))
+        if not taken:
+            return False
+        Record.objects.create(student_obj_id=student_pk, unit_obj_id=unit_pk)
+        summary.seat_taken(unit_pk)
+        transaction.on_commit(lambda: _seats_changed(unit_pk))
+    return True
+
+
+def promote_waitlist(unit_pk):
+    """Move the head of the unit's queue into free seats, first come first.
+
+    Returns the pks of the promoted students.  Call it inside the transaction
+    that freed the seat so nobody else can take it in between.
+    """
+    promoted = []
+    with write_atomic():
+        for entry in Waitlist.objects.filter(unit_obj_id=unit_pk).order_by('pk'):
+            try:
+                reserved = _reserve(entry.student_obj_id, unit_pk)
+            except (IntegrityError, ScheduleConflict):  # 이미 신청했거나 그새 시간이 겹치는 실험을 신청한 학생
+                reserved = None
+            if reserved is False:
+                break
+            entry.delete()
+            if reserved:
+                promoted.append(entry.student_obj_id)
+    return promoted
+
+
+def enroll(student, unit_pk):
+    """Reserve a seat in the unit, or queue the student when it is full.
+
+    Raises Unit.DoesNotExist for an unknown unit.
+    """
+    try:
+        if _reserve(student.pk, unit_pk):
+            Waitlist.objects.filter(student_obj=student, unit_obj_id=unit_pk).delete()
+            return SUCCESS
+    except IntegrityError:
+        return ALREADY_ENROLLED
+    except ScheduleConflict:
+        return CONFLICT
+
+    if Record.objects.filter(student_obj=student, unit_obj_id=unit_pk).exists():
+        return ALREADY_ENROLLED
+    if not Unit.objects.filter(pk=unit_pk).exists():
+        raise Unit.DoesNotExist
+
+    try:
+        with write_atomic():
+            Waitlist.objects.create(student_obj=student, unit_obj_id=unit_pk)
+            # 대기열 등록 직전에 자리가 났다면 바로 승격한다
+            if student.pk in promote_waitlist(unit_pk):
+                return SUCCESS
+    except IntegrityError:
+        return ALREADY_WAITLISTED
+    return WAITLISTED
+
+
+def cancel(student, record_pk):
+    """Give the student's seat back and promote the head of the waitlist.
+
+    Returns NOT_ENROLLED for records that do not belong to the student.
+    """
+    with write_atomic():
+        record = (Record.objects
+                  .filter(pk=record_pk, student_obj=student)
+                  .values_list('unit_obj_id', 'score').first())
+        if record is None:
+            return NOT_ENROLLED
+        unit_pk, score = record
+        # 동시에 들어온 취소 요청은 삭제된 행이 있을 때만 정원을 돌려준다
+        deleted, _ = Record.objects.filter(pk=record_pk).delete()
+        if not deleted:
+            return NOT_ENROLLED
+        (Unit.objects
+         .filter(pk=unit_pk, current_number__gt=0)
+         .update(current_number=F('current_number') - 1))
+        summary.seat_released(unit_pk, score)
+        transaction.on_commit(lambda: _seats_changed(unit_pk))
+        promote_waitlist(unit_pk)
+    return SUCCESS
+
+
+def leave_waitlist(student, unit_pk):
+    deleted, _ = Waitlist.objects.filter(student_obj=student, unit_obj_id=unit_pk).delete()
+    return SUCCESS if deleted else NOT_ENROLLED
+
+
+def waitlist_with_position(student):
+    """The student's queue entries annotated with their 1-based ``position``."""
+    ahead = (Waitlist.objects
+             .filter(unit_obj=OuterRef('unit_obj'), pk__lte=OuterRef('pk'))
+             .order_by().values('unit_obj')
+             .annotate(n=Count('pk')).values('n'))
+    return (Waitlist.objects.filter(student_obj=student)
+            .select_related('unit_obj__research_obj')
+            .annotate(position=Subquery(ahead, output_field=IntegerField())))
@@ -0,0 +1,79 @@
+import csv
+
+from django.http import StreamingHttpResponse
+
+from .models import Record, Research
+
+CHUNK_SIZE = 2000
+
+# (values_list 경로, 머리글)
+RECORD_COLUMNS = (
+    ('unit_obj__research_obj__year', '연도'),
+    ('unit_obj__research_obj__semester', '학기'),
+    ('unit_obj__research_obj__research_number', '실험번호'),
+    ('unit_obj__research_obj__research_name', '실험명'),
+    ('unit_obj__research_obj__prof_obj__user__name', '교강사'),
+    ('unit_obj__place', '장소'),
+    ('unit_obj__date', '시간'),
+    ('student_obj__student_number', '학번'),
+    ('student_obj__user__name', '이름'),
+    ('student_obj__major', '전공'),
+    ('score', '평점'),
+    ('total', '급여'),
+)
+
+
+class Echo:
+    """File-like object whose write() hands the csv row straight back."""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(filename, header, rows):
+    """Stream ``rows`` as a CSV download without building it in memory."""
+    writer = csv.writer(Echo())
+
+    def generate():
+        yield '\ufeff'  # 엑셀에서 한글이 깨지지 않도록 BOM을 붙인다
+        yield writer.writerow(header)
+        for row in rows:
+            yield writer.writerow(row)
+
+    response = StreamingHttpResponse(generate(), content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = 'attachment; filename="%s"' % filename
+    return response
+
+
+def stream_records(filename, queryset):
+    fields = [field for field, _ in RECORD_COLUMNS]
+    rows = (queryset.order_by('unit_obj__research_obj', 'unit_obj', 'student_obj__student_number')
+            .values_list(*fields).iterator(chunk_size=CHUNK_SIZE))
+    return stream_csv(filename, [title for _, title in RECORD_COLUMNS], rows)
+
+
+def unit_roster(unit):
+    return stream_records('unit_%s_roster.csv' % unit.pk, Record.objects.filter(unit_obj=unit))
+
+
+def research_grades(research):
+    return stream_records('research_%s_grades.csv' % research.research_number,
+                          Record.objects.filter(unit_obj__research_obj=research))
+
+
+def semester_records(year=None, semester=None):
+    """All records, optionally of one year and semester.
+
+    Raises ValueError for a bad ``year`` or ``semester`` before anything is
+    streamed, so the caller can answer 400 instead of a cut-off file.
+    """
+    if year and not year.isdigit():
+        raise ValueError('연도는 숫자여야 합니다: %s' % year)
+    if semester and semester not in dict(Research.SEME):
+        raise ValueError('학기는 1 또는 2여야 합니다: %s' % semester)
+    queryset = Record.objects.all()
+    if year:
+        queryset = queryset.filter(unit_obj__research_obj__year=year)
+    if semester:
+        queryset = queryset.filter(unit_obj__research_obj__semester=semester)
+    return stream_records('records_%s_%s.csv' % (year or 'all', semester or 'all'), queryset)
@@ -1,5 +1,6 @@
 from django import forms
-from django.forms import modelformset_factory
+from django.core.exceptions import ValidationError
+from django.forms import modelformset_factory, BaseModelFormSet
 from django.contrib.auth.forms import UserCreationForm
 from .models import User, Student, Prof, Research, Record, Unit
 
@@ -8,10 +9,24 @@ from django.template.loader import render_to_string
 from django.utils.http import urlsafe_base64_encode
 from django.utils.encoding import force_bytes
 from django.contrib.auth.tokens import PasswordResetTokenGenerator
-from django.core.mail import EmailMessage
+
+from . import outbox
 
 from bootstrap_datepicker_plus import DateTimePickerInput
 
+def queue_activation_mail(user):
+    """Put the account activation mail in the outbox; it is sent outside the request."""
+    current_site = Site.objects.get_current()
+    current_site.domain = '52.78.163.167'
+    subject = '실험관리시스템에 가입해주셔서 감사합니다. 이메일을 인증 절차를 완료해주세요.'
+    message = render_to_string('registration/user_activate_email.html', {
+        'user': user,
+        'domain': current_site.domain,
+        'uid': urlsafe_base64_encode(force_bytes(user.pk)).decode(),
+        'token': PasswordResetTokenGenerator().make_token(user),
+    })
+    outbox.queue_mail(subject, message, [user.email])
+
 class StudentSignUpForm(UserCreationForm):
 
     student_number = forms.CharField(max_length=10)
@@ -33,18 +48,7 @@ class StudentSignUpForm(UserCreationForm):
             student.student_number = self.cleaned_data.get('student_number')
             student.major = self.cleaned_data.get('major')
             student.save()
-
-            current_site = Site.objects.get_current()
-            current_site.domain = '52.78.163.167'
-            subject = '실험관리시스템에 가입해주셔서 감사합니다. 이메일을 인증 절차를 완료해주세요.'
-            message = render_to_string('registration/user_activate_email.html', {
-                'user': user,
-                'domain': current_site.domain,
-                'uid': urlsafe_base64_encode(force_bytes(user.pk)).decode(),
-                'token': PasswordResetTokenGenerator().make_token(user),
-            })
-            email = EmailMessage(subject, message, to=[user.email])
-            email.send()
+            queue_activation_mail(user)
         return user
 
 class ProfSignUpForm(UserCreationForm):
@@ -68,7 +72,7 @@ class ProfSignUpForm(UserCreationForm):
             prof.prof_number = self.cleaned_data.get('prof_number')
             prof.major = self.cleaned_data.get('major')
             prof.save()
-
+            queue_activation_mail(user)
         return user
 
 class CreateResearchForm(forms.ModelForm):
@@ -93,7 +97,39 @@ class CreateUnitForm(forms.ModelForm):
 # UnitFormset = modelformset_factory(CreateUnitForm, fields=('place', 'date', 'period', 'max_number', 'remark', ), extra=1)
 
 
-RecordScoreFormSet = modelformset_factory(Record, fields=('score', ), extra=0)
+class LoadedChoiceField(forms.ModelChoiceField):
+    """ModelChoiceField that looks values up in already-loaded objects instead of querying."""
+
+    def __init__(self, objects, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.objects = {str(obj.pk): obj for obj in objects}
+
+    def to_python(self, value):
+        if value in self.empty_values:
+            return None
+        try:
+            return self.objects[str(value)]
+        except KeyError:
+            raise ValidationError(self.error_messages['invalid_choice'], code='invalid_choice')
+
+
+class BaseRecordScoreFormSet(BaseModelFormSet):
+    """Check posted row ids against the loaded roster, not with one query per row."""
+
+    def add_fields(self, form, index):
+        super().add_fields(form, index)
+        name = self.model._meta.pk.name
+        field = form.fields[name]
+        form.fields[name] = LoadedChoiceField(self.get_queryset(), field.queryset, initial=field.initial,
+                                              required=False, widget=field.widget)
+
+
+RecordScoreFormSet = modelformset_factory(Record, formset=BaseRecordScoreFormSet,
+                                          fields=('score', 'total', ), extra=0)
+
+
+class GradeUploadForm(forms.Form):
+    grades = forms.FileField(help_text='student_number, score, total 열을 가진 CSV 또는 JSON 파일')
 
 class ModifyStudentForm(forms.ModelForm):
     class Meta():
@@ -0,0 +1,72 @@
+import csv
+import io
+import json
+
+from .db import write_atomic
+from .models import Record
+from . import summary
+
+GRADE_FIELDS = ('score', 'total')
+SCORES = dict(Record.SCORE)
+
+
+def apply_grades(records):
+    """Write score and total of the given records in one UPDATE statement.
+
+    The P/F counts of the touched units are recomputed in the same transaction.
+    """
+    records = list(records)
+    if records:
+        with write_atomic():
+            Record.objects.bulk_update(records, GRADE_FIELDS)
+            summary.refresh({record.unit_obj_id for record in records})
+    return len(records)
+
+
+def _read_rows(upload):
+    data = upload.read()
+    if isinstance(data, bytes):
+        data = data.decode('utf-8-sig')
+    if upload.name.lower().endswith('.json'):
+        rows = json.loads(data)
+        if not isinstance(rows, list):
+            raise ValueError('JSON 파일은 목록이어야 합니다.')
+        return rows
+    return list(csv.DictReader(io.StringIO(data)))
+
+
+def grades_from_file(unit, upload):
+    """Match an uploaded CSV/JSON score sheet against the unit's roster.
+
+    Each row needs ``student_number`` and may carry ``score`` (P/F) and
+    ``total``.  Returns ``(records, errors)``; the records carry the new
+    values but are not saved.
+    """
+    try:
+        rows = _read_rows(upload)
+    except (ValueError, UnicodeDecodeError, csv.Error) as exc:
+        return [], ['파일을 읽을 수 없습니다: %s' % exc]
+
+    roster = {record.student_obj.student_number: record
+              for record in Record.objects.roster(unit)}
+    records, errors = [], []
+    for line, row in enumerate(rows, start=1):
+        if not isinstance(row, dict):
+            errors.append('%d행: 형식이 올바르지 않습니다.' % line)
+            continue
+        record = roster.get(str(row.get('student_number') or '').strip())
+        if record is None:
+            errors.append('%d행: 이 실험에 신청한 학번이 아닙니다.' % line)
+            continue
+        score = str(row.get('score') or '').strip().upper() or None
+        if score is not None and score not in SCORES:
+            errors.append('%d행: 평점은 P 또는 F 이어야 합니다.' % line)
+            continue
+        total = str(row.get('total') or '').strip()
+        if total and not total.isdigit():
+            errors.append('%d행: 급여는 0 이상의 정수여야 합니다.' % line)
+            continue
+        record.score = score
+        record.total = int(total) if total else None
+        records.append(record)
+    return records, errors
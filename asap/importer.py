@@ -0,0 +1,203 @@
+import csv
+import io
+import json
+from collections import Counter
+
+from django import forms
+from django.db import transaction
+
+from .forms import CreateResearchForm, CreateUnitForm
+from .models import User, Student, Prof, Research, Unit
+from . import catalogue, search, summary
+
+CHUNK_SIZE = 500
+
+
+class ImportFailed(Exception):
+    """Raised with the per-row errors; nothing of the import is committed."""
+
+    def __init__(self, errors):
+        super().__init__('%d rows failed validation' % len(errors))
+        self.errors = errors
+
+
+class ImportStudentForm(forms.Form):
+    email = forms.EmailField()
+    name = forms.CharField(max_length=10)
+    sex = forms.ChoiceField(choices=User.SEX)
+    student_number = forms.CharField(max_length=10)
+    major = forms.CharField(max_length=10)
+
+
+class ImportUnitForm(CreateUnitForm):
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['remark'].required = False
+
+
+def _csv_rows(reader, name):
+    # 읽는 도중 깨진 줄을 만나면 그 행이 시작한 줄 번호와 함께 ValueError로 바꾼다 (가져오기는 통째로 롤백된다)
+    line = 0
+    try:
+        reader.fieldnames  # 머리글 줄을 먼저 읽어 둔다
+        line = reader.line_num
+        for row in reader:
+            yield row
+            line = reader.line_num
+    except csv.Error as exc:
+        raise ValueError('%s %d번째 줄: %s' % (name or 'CSV', line + 1, exc)) from exc
+
+
+def read_rows(fileobj, name=''):
+    """Rows of a CSV file (streamed) or of a JSON list, as dicts.
+
+    Malformed CSV raises ValueError naming the file line while the rows are read.
+    """
+    if name.lower().endswith('.json'):
+        data = fileobj.read()
+        if isinstance(data, bytes):
+            data = data.decode('utf-8-sig')
+        rows = json.loads(data)
+        if not isinstance(rows, list):
+            raise ValueError('%s: JSON must be a list of rows' % name)
+        return rows
+    if not isinstance(fileobj, io.TextIOBase):
+        fileobj = io.TextIOWrapper(fileobj, encoding='utf-8-sig', newline='')
+    return _csv_rows(csv.DictReader(fileobj, strict=True), name)
+
+
+def read_bundle(fileobj):
+    """A single JSON document with "researches", "units" and "students" lists."""
+    data = fileobj.read()
+    if isinstance(data, bytes):
+        data = data.decode('utf-8-sig')
+    bundle = json.loads(data)
+    if not isinstance(bundle, dict):
+        raise ValueError('JSON bundle must be an object')
+    return bundle.get('researches', []), bundle.get('units', []), bundle.get('students', [])
+
+
+def _research_key(row):
+    return (str(row.get('research_number', '')).strip(), str(row.get('year', '')).strip(),
+            str(row.get('semester', '')).strip())
+
+
+class SemesterImporter:
+    """Validate rows in one streaming pass and write them with chunked bulk_create.
+
+    Everything runs in one transaction; if any row is invalid the whole
+    import is rolled back and ImportFailed lists every bad row.
+    """
+
+    def __init__(self, chunk_size=CHUNK_SIZE):
+        self.chunk_size = chunk_size
+        self.errors = []
+        self.counts = Counter()
+        self.semesters = set()
+
+    def error(self, kind, line, message):
+        self.errors.append('%s %d행: %s' % (kind, line, message))
+
+    @staticmethod
+    def _form_errors(form):
+        return '; '.join('%s: %s' % (field, ' '.join(errors))
+                         for field, errors in form.errors.items())
+
+    def run(self, researches=(), units=(), students=()):
+        with transaction.atomic():
+            self.import_researches(researches)
+            self.import_units(units)
+            self.import_students(students)
+            if self.errors:
+                raise ImportFailed(self.errors)
+            transaction.on_commit(self._refresh_caches)
+        return self.counts
+
+    def _refresh_caches(self):
+        # bulk_create는 signal을 보내지 않으므로 색인과 캐시를 직접 갱신
+        search.rebuild_index()
+        for year, semester in self.semesters:
+            catalogue.invalidate_semester(year, semester)
+
+    def _flush(self, model, buffer):
+        if buffer:
+            model.objects.bulk_create(buffer, batch_size=self.chunk_size)
+            self.counts[model.__name__] += len(buffer)
+            buffer.clear()
+
+    def import_researches(self, rows):
+        profs = dict(Prof.objects.values_list('prof_number', 'pk'))
+        existing = {(number, str(year), semester) for number, year, semester
+                    in Research.objects.values_list('research_number', 'year', 'semester')}
+        buffer = []
+        for line, row in enumerate(rows, start=1):
+            form = CreateResearchForm(data=row)
+            prof_pk = profs.get(str(row.get('prof_number', '')).strip())
+            key = _research_key(row)
+            if not form.is_valid():
+                self.error('research', line, self._form_errors(form))
+            elif prof_pk is None:
+                self.error('research', line, '교강사 번호 %s를 찾을 수 없습니다.' % row.get('prof_number'))
+            elif key in existing:
+                self.error('research', line, '이미 등록된 실험입니다: %s %s-%s' % key)
+            else:
+                existing.add(key)
+                research = form.save(commit=False)
+                research.prof_obj_id = prof_pk
+                self.semesters.add((research.year, research.semester))
+                buffer.append(research)
+                if len(buffer) >= self.chunk_size:
+                    self._flush(Research, buffer)
+        self._flush(Research, buffer)
+
+    def import_units(self, rows):
+        researches = {(number, str(year), semester): (pk, year, semester)
+                      for pk, number, year, semester
+                      in Research.objects.values_list('pk', 'research_number', 'year', 'semester')}
+        buffer = []
+        for line, row in enumerate(rows, start=1):
+            form = ImportUnitForm(data=row)
+            research = researches.get(_research_key(row))
+            if not form.is_valid():
+                self.error('unit', line, self._form_errors(form))
+            elif research is None:
+                self.error('unit', line, '실험 %s %s-%s를 찾을 수 없습니다.' % _research_key(row))
+            else:
+                unit = form.save(commit=False).set_end_date()
+                unit.research_obj_id, year, semester = research
+                self.semesters.add((year, semester))
+                buffer.append(unit)
+                if len(buffer) >= self.chunk_size:
+                    self._flush(Unit, buffer)
+        self._flush(Unit, buffer)
+        summary.create_missing()
+
+    def _flush_students(self, users, students):
+        self._flush(User, users)
+        pks = dict(User.objects.filter(email__in=list(students)).values_list('email', 'pk'))
+        self._flush(Student, [Student(user_id=pks[email], **fields)
+                              for email, fields in students.items()])
+        students.clear()
+
+    def import_students(self, rows):
+        emails = set(User.objects.values_list('email', flat=True))
+        users, students = [], {}
+        for line, row in enumerate(rows, start=1):
+            form = ImportStudentForm(data=row)
+            if not form.is_valid():
+                self.error('student', line, self._form_errors(form))
+                continue
+            data = form.cleaned_data
+            email = User.objects.normalize_email(data['email'])
+            if email in emails:
+                self.error('student', line, '이미 가입된 이메일입니다: %s' % email)
+                continue
+            emails.add(email)
+            user = User(email=email, name=data['name'], sex=data['sex'], is_student=True)
+            user.set_unusable_password()  # 학생은 비밀번호 찾기로 처음 비밀번호를 정한다
+            users.append(user)
+            students[email] = {'student_number': data['student_number'], 'major': data['major']}
+            if len(users) >= self.chunk_size:
+                self._flush_students(users, students)
+        self._flush_students(users, students)
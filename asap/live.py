@@ -0,0 +1,87 @@
+"""Seat-count change notifications for the live enroll page (see proj/asgi.py).
+
+The enrollment path publishes the pk of every unit whose seats changed; the
+SSE hub drains the broker a few times a second, reads the changed counts in
+one query and fans them out to every connected watcher.
+"""
+import threading
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from .models import Unit
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+class LocalBroker:
+    """In-process pub/sub: publish() marks a unit dirty, drain() hands the set over.
+
+    Only sees enrollments handled by the same process, i.e. when the ASGI
+    server also serves the Django app (proj.asgi does).
+    """
+
+    def __init__(self):
+        self._changed = set()
+        self._lock = threading.Lock()
+
+    def publish(self, unit_pk):
+        with self._lock:
+            self._changed.add(unit_pk)
+
+    def drain(self):
+        with self._lock:
+            changed, self._changed = self._changed, set()
+        return changed
+
+
+class PollingBroker:
+    """For enrollments served by other processes: diff the open semester's seats.
+
+    One query per drain, however many watchers are connected.
+    """
+
+    def __init__(self):
+        self._seats = None
+
+    def publish(self, unit_pk):
+        pass
+
+    def drain(self):
+        seats = dict(open_units().values_list('pk', 'current_number'))
+        previous, self._seats = self._seats, seats
+        if previous is None:
+            return set()
+        return {pk for pk, current in seats.items() if previous.get(pk) != current}
+
+
+def broker():
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                _broker = import_string(settings.SEAT_BROKER)()
+    return _broker
+
+
+def seats_changed(unit_pk):
+    """Call after the transaction that changed the unit's seats has committed."""
+    broker().publish(unit_pk)
+
+
+def open_units():
+    """Units of the semester open for enrollment."""
+    return Unit.objects.current()
+
+
+def snapshot(unit_pks):
+    """``{pk: {'current': n, 'max': m}}`` of the given units in one query."""
+    rows = Unit.objects.filter(pk__in=unit_pks).values_list('pk', 'current_number', 'max_number')
+    return {pk: {'current': current, 'max': maximum} for pk, current, maximum in rows}
+
+
+def poll():
+    """Drain the broker and return the changed units' seats; runs off the event loop."""
+    changed = broker().drain()
+    return snapshot(changed) if changed else {}
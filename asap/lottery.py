@@ -0,0 +1,242 @@
+"""Preference-based allocation, the alternative to first-come enrollment.
+
+While ENROLLMENT_MODE is 'lottery' students rank the current semester's
+units instead of racing for them; ``manage.py allocate_lottery`` then
+hands out every seat in one pass and one transaction.
+
+Students are shuffled once and the seats go out in two phases:
+
+1. Everyone gets a first seat before anyone gets a second.  Each student
+   in turn takes their best choice that still has a seat; then, for the
+   students left without one, seated students are moved to another of
+   their own choices wherever that frees a seat (augmenting paths, as in
+   Hopcroft-Karp), so as many students as possible hold a seat.
+2. The remaining seats go out in rounds: each student in turn gets their
+   best still-feasible choice (a unit with a free seat, of a research they
+   do not hold yet, not overlapping what they already have).  The order
+   reverses every round so the last pick of one round is the first of the
+   next.  Nothing a later pick does can make a skipped choice feasible
+   again, so every preference is looked at once.
+"""
+import random
+from collections import Counter, defaultdict, deque
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+
+from .db import write_atomic
+from .models import Unit, Record, Preference
+from . import catalogue, live, summary
+
+# 첫 자리를 맞출 때 학생을 연달아 옮기는 사슬의 최대 길이
+MAX_CHAIN = 50
+
+
+def is_open():
+    return settings.ENROLLMENT_MODE == 'lottery'
+
+
+# <------------------------------------희망 세션 접수------------------------------------>
+
+def preferences(student):
+    """The student's current-semester preferences by rank, units joined in."""
+    return (Preference.objects.filter(student_obj=student, unit_obj__in=Unit.objects.current())
+            .select_related('unit_obj__research_obj'))
+
+
+def save_preferences(student, unit_pks):
+    """Replace the student's current-semester ranking with ``unit_pks`` (best first).
+
+    Unknown, duplicate and other-semester pks are dropped and the list is
+    cut at LOTTERY_CHOICES.  Returns the pks that were saved.
+    """
+    open_pks = set(Unit.objects.current().filter(pk__in=unit_pks).values_list('pk', flat=True))
+    ranked = []
+    for pk in unit_pks:
+        if pk in open_pks and pk not in ranked:
+            ranked.append(pk)
+    ranked = ranked[:settings.LOTTERY_CHOICES]
+    with write_atomic():
+        Preference.objects.filter(student_obj=student, unit_obj__in=Unit.objects.current()).delete()
+        Preference.objects.bulk_create([Preference(student_obj=student, unit_obj_id=pk, rank=rank)
+                                        for rank, pk in enumerate(ranked, 1)])
+    return ranked
+
+
+# <------------------------------------배정------------------------------------>
+
+def _load(year, semester):
+    units, free = {}, {}
+    for pk, research_pk, start, end, max_number, current_number in (
+            Unit.objects.in_semester(year, semester)
+            .values_list('pk', 'research_obj_id', 'date', 'end_date', 'max_number', 'current_number')):
+        units[pk] = (research_pk, start, end)
+        free[pk] = max_number - current_number
+    wishes = defaultdict(list)
+    for student_pk, unit_pk in (Preference.objects.filter(unit_obj_id__in=Unit.objects.in_semester(year, semester))
+                                .order_by('student_obj_id', 'rank').values_list('student_obj_id', 'unit_obj_id')):
+        wishes[student_pk].append(unit_pk)
+    held = defaultdict(list)  # 이미 신청한 세션도 시간 중복/실험 중복 검사에 넣는다
+    for student_pk, unit_pk in (Record.objects.filter(unit_obj_id__in=Unit.objects.in_semester(year, semester))
+                                .values_list('student_obj_id', 'unit_obj_id')):
+        held[student_pk].append(unit_pk)
+    return units, free, wishes, held
+
+
+def _first_seats(order, choices, free):
+    """``{student_pk: unit_pk}`` giving as many students as possible one seat.
+
+    ``choices`` are each student's feasible units by rank; ``free`` is
+    updated in place.  A greedy pass in ``order`` is followed by phases of
+    shortest augmenting paths: a student without a seat takes a full unit
+    whose holder moves on to another of their choices, and so on until a
+    unit with a free seat ends the chain.
+    """
+    seat = {}
+    holders = defaultdict(set)
+
+    def take(student_pk, unit_pk):
+        old = seat.get(student_pk)
+        if old is not None:
+            holders[old].discard(student_pk)
+            free[old] += 1
+        seat[student_pk] = unit_pk
+        holders[unit_pk].add(student_pk)
+        free[unit_pk] -= 1
+
+    for student_pk in order:
+        for unit_pk in choices[student_pk]:
+            if free[unit_pk] > 0:
+                take(student_pk, unit_pk)
+                break
+
+    def augment(student_pk, depth):
+        for unit_pk in choices[student_pk]:
+            if unit_pk == seat.get(student_pk):
+                continue
+            if free[unit_pk] > 0:
+                take(student_pk, unit_pk)
+                return True
+            for holder in list(holders[unit_pk]):
+                if depth.get(holder) == depth[student_pk] + 1 and augment(holder, depth):
+                    take(student_pk, unit_pk)
+                    return True
+        depth[student_pk] = None  # 이 단계에서는 더 볼 필요 없다
+        return False
+
+    while True:
+        seatless = [pk for pk in order if pk not in seat and choices[pk]]
+        depth = dict.fromkeys(seatless, 0)
+        queue, reachable = deque(seatless), False
+        while queue:
+            student_pk = queue.popleft()
+            if depth[student_pk] >= MAX_CHAIN:
+                continue
+            for unit_pk in choices[student_pk]:
+                if unit_pk == seat.get(student_pk):
+                    continue
+                if free[unit_pk] > 0:
+                    reachable = True
+                    continue
+                for holder in holders[unit_pk]:
+                    if holder not in depth:
+                        depth[holder] = depth[student_pk] + 1
+                        queue.append(holder)
+        if not reachable or not sum(augment(pk, depth) for pk in seatless):
+            return seat
+
+
+def plan(year, semester, seed=None):
+    """Compute the allocation without writing it.
+
+    Returns ``(assignments, stats)`` where ``assignments`` is a list of
+    ``(student_pk, unit_pk)`` and ``stats`` counts students, preferences,
+    assigned seats and how many of them were first choices.
+    """
+    units, free, wishes, held = _load(year, semester)
+    researches = {pk: {units[unit_pk][0] for unit_pk in unit_pks} for pk, unit_pks in held.items()}
+    sessions = {pk: [units[unit_pk][1:] for unit_pk in unit_pks] for pk, unit_pks in held.items()}
+
+    def feasible(student_pk, unit_pk):
+        research_pk, start, end = units[unit_pk]
+        if research_pk in researches.setdefault(student_pk, set()):
+            return False
+        return not any(other_start < end and start < other_end
+                       for other_start, other_end in sessions.setdefault(student_pk, []))
+
+    def assign(student_pk, unit_pk):
+        researches[student_pk].add(units[unit_pk][0])
+        sessions[student_pk].append(units[unit_pk][1:])
+        assignments.append((student_pk, unit_pk))
+
+    order = sorted(wishes)
+    random.Random(seed).shuffle(order)
+    assignments = []
+
+    # 1단계: 모두 한 자리씩 받기 전에는 아무도 두 번째 자리를 받지 않는다
+    first = _first_seats(order, {pk: [unit_pk for unit_pk in wishes[pk] if feasible(pk, unit_pk)] for pk in order},
+                         free)
+    for student_pk in order:
+        if student_pk in first:
+            assign(student_pk, first[student_pk])
+
+    # 2단계: 남은 자리를 뱀 순서로
+    cursor = dict.fromkeys(order, 0)
+    active, forward = order, True
+    while active:
+        for student_pk in (active if forward else reversed(active)):
+            choices = wishes[student_pk]
+            i = cursor[student_pk]
+            while i < len(choices):
+                unit_pk = choices[i]
+                i += 1
+                if free[unit_pk] > 0 and feasible(student_pk, unit_pk):
+                    free[unit_pk] -= 1
+                    assign(student_pk, unit_pk)
+                    break
+            cursor[student_pk] = i
+        active = [pk for pk in active if cursor[pk] < len(wishes[pk])]
+        forward = not forward
+
+    seats = Counter(student_pk for student_pk, _ in assignments)
+    stats = {
+        'students': len(wishes),
+        'preferences': sum(len(choices) for choices in wishes.values()),
+        'assigned': len(assignments),
+        'first_choice': sum(1 for student_pk, unit_pk in assignments if wishes[student_pk][0] == unit_pk),
+        'students_without_seat': len(wishes) - len(seats),
+        'students_with_several_seats': sum(1 for n in seats.values() if n > 1),
+    }
+    return assignments, stats
+
+
+def allocate(year, semester, seed=None):
+    """Run :func:`plan` and write its Records and seat counts in one transaction.
+
+    The write lock is held from the first read, so nobody can enroll in
+    between and push a unit past ``max_number``.  Returns the plan's stats.
+    """
+    with write_atomic():
+        assignments, stats = plan(year, semester, seed)
+        Record.objects.bulk_create([Record(student_obj_id=student_pk, unit_obj_id=unit_pk)
+                                    for student_pk, unit_pk in assignments], batch_size=500)
+        # 늘어난 인원이 같은 세션끼리 묶어 UPDATE 수를 줄인다
+        by_count = defaultdict(list)
+        for unit_pk, n in Counter(unit_pk for _, unit_pk in assignments).items():
+            by_count[n].append(unit_pk)
+        for n, unit_pks in by_count.items():
+            for i in range(0, len(unit_pks), 500):
+                (Unit.objects.filter(pk__in=unit_pks[i:i + 500])
+                 .update(current_number=F('current_number') + n))
+        changed = [unit_pk for unit_pks in by_count.values() for unit_pk in unit_pks]
+        summary.refresh(changed)
+        transaction.on_commit(lambda: _seats_changed(year, semester, changed))
+    return stats
+
+
+def _seats_changed(year, semester, unit_pks):
+    for unit_pk in unit_pks:
+        catalogue.invalidate_seats(unit_pk)
+        live.seats_changed(unit_pk)
+    catalogue.invalidate_semester(year, semester)
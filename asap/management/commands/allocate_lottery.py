@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from asap import catalogue, lottery
+
+
+class Command(BaseCommand):
+    help = ('Allocate the seats of a semester from the students\' ranked preferences '
+            '(ENROLLMENT_MODE=lottery).  Defaults to the current semester.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('semester', nargs='?', metavar='YEAR-SEMESTER',
+                            help='e.g. 2019-1; the current semester when omitted.')
+        parser.add_argument('--seed', type=int,
+                            help='Fix the draw so it can be reproduced.')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Compute and report the allocation without writing it.')
+
+    def handle(self, *args, **options):
+        if options['semester']:
+            try:
+                year, semester = options['semester'].split('-')
+                year = int(year)
+            except ValueError:
+                raise CommandError('Give the semester as YEAR-SEMESTER, e.g. 2019-1.')
+        elif catalogue.current_semester():
+            year, semester = catalogue.current_semester()
+        else:
+            raise CommandError('No current semester: there are no researches and CURRENT_SEMESTER is not set.')
+        if options['dry_run']:
+            _, stats = lottery.plan(year, semester, options['seed'])
+        else:
+            stats = lottery.allocate(year, semester, options['seed'])
+        self.stdout.write('%d-%s: %d students, %d preferences, %d seats assigned (%d first choices), '
+                          '%d students without a seat, %d with more than one.'
+                          % (year, semester, stats['students'], stats['preferences'], stats['assigned'],
+                             stats['first_choice'], stats['students_without_seat'],
+                             stats['students_with_several_seats']))
+        if not options['dry_run']:
+            self.stdout.write(self.style.SUCCESS('Allocation written.'))
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from asap import archive
+
+
+class Command(BaseCommand):
+    help = ('Move the units and records of a closed semester into the archive tables '
+            '(ArchivedUnit/ArchivedRecord, on ARCHIVE_DATABASE) so the live tables stay small.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('year', type=int)
+        parser.add_argument('semester', choices=['1', '2'])
+        parser.add_argument('--chunk-size', type=int, default=archive.CHUNK_SIZE)
+        parser.add_argument('--force', action='store_true',
+                            help='Archive even if it is the current semester.')
+
+    def handle(self, *args, **options):
+        try:
+            counts = archive.archive_semester(options['year'], options['semester'],
+                                              options['chunk_size'], options['force'])
+        except archive.ArchiveRefused as exc:
+            raise CommandError(str(exc))
+        self.stdout.write(self.style.SUCCESS('Archived %(units)d units and %(records)d records.' % counts))
@@ -0,0 +1,52 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from asap.importer import SemesterImporter, ImportFailed, read_rows, read_bundle
+
+MAX_REPORTED_ERRORS = 50
+
+
+class Command(BaseCommand):
+    help = ('Load a semester of researches, units and students from CSV/JSON files. '
+            'Either pass one JSON bundle or separate --researches/--units/--students files.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('bundle', nargs='?',
+                            help='JSON object with "researches", "units" and "students" lists.')
+        parser.add_argument('--researches', help='research_number, research_name, prof_number, year, semester, description')
+        parser.add_argument('--units', help='research_number, year, semester, place, date, period, max_number, remark')
+        parser.add_argument('--students', help='email, name, sex, student_number, major')
+        parser.add_argument('--chunk-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        files = []
+        try:
+            if options['bundle']:
+                with open(options['bundle'], 'rb') as fileobj:
+                    researches, units, students = read_bundle(fileobj)
+            else:
+                sources = []
+                for kind in ('researches', 'units', 'students'):
+                    path = options[kind]
+                    if path:
+                        fileobj = open(path, 'rb')
+                        files.append(fileobj)
+                        sources.append(read_rows(fileobj, path))
+                    else:
+                        sources.append([])
+                researches, units, students = sources
+            counts = SemesterImporter(options['chunk_size']).run(researches, units, students)
+        except ImportFailed as exc:
+            for error in exc.errors[:MAX_REPORTED_ERRORS]:
+                self.stderr.write(error)
+            if len(exc.errors) > MAX_REPORTED_ERRORS:
+                self.stderr.write('... and %d more' % (len(exc.errors) - MAX_REPORTED_ERRORS))
+            raise CommandError('Nothing was imported: %d rows have errors.' % len(exc.errors))
+        except (OSError, ValueError) as exc:
+            raise CommandError(str(exc))
+        finally:
+            for fileobj in files:
+                fileobj.close()
+
+        for model in ('Research', 'Unit', 'Student'):
+            self.stdout.write('%s: %d' % (model, counts[model]))
+        self.stdout.write(self.style.SUCCESS('Import finished.'))
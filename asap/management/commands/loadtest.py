@@ -0,0 +1,64 @@
+import json
+import logging
+
+from django.core.management.base import BaseCommand, CommandError
+
+from asap import benchmark
+
+
+class Command(BaseCommand):
+    help = ('Simulate a registration rush against the WSGI application and report throughput, '
+            'latency, query counts and overbooking.  Writes to the configured database, so run '
+            'it with --settings pointing at a scratch database.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=500)
+        parser.add_argument('--units', type=int, default=40)
+        parser.add_argument('--researches', type=int, default=20)
+        parser.add_argument('--seats', type=int, default=20)
+        parser.add_argument('--hot-units', type=int, default=5,
+                            help='Students all pick among the first N units.')
+        parser.add_argument('--cancel-rate', type=float, default=0.1)
+        parser.add_argument('--threads', type=int, default=16)
+        parser.add_argument('--processes', type=int, default=1)
+        parser.add_argument('--think-time', type=float, default=0)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--save-baseline', metavar='FILE',
+                            help='Write the report to FILE as the new baseline.')
+        parser.add_argument('--baseline', metavar='FILE',
+                            help='Fail when the run regresses against the report in FILE.')
+        parser.add_argument('--tolerance', type=float, default=0.2,
+                            help='Allowed relative slowdown against the baseline.')
+        parser.add_argument('--keep', action='store_true',
+                            help='Leave the generated users, researches and records in place.')
+
+    def handle(self, *args, **options):
+        if options['verbosity'] < 2:
+            # 요청마다 찍히는 성능 로그는 결과 보고서를 가린다
+            logging.getLogger('asap.perf').setLevel(logging.ERROR)
+        fixture = benchmark.generate_fixture(
+            researches=options['researches'], units=options['units'],
+            students=options['students'], seats=options['seats'], seed=options['seed'])
+        try:
+            result = benchmark.rush(
+                fixture, threads=options['threads'], processes=options['processes'],
+                hot_units=options['hot_units'], cancel_rate=options['cancel_rate'],
+                think_time=options['think_time'], seed=options['seed'])
+        finally:
+            if not options['keep']:
+                benchmark.cleanup()
+
+        self.stdout.write(json.dumps(result, indent=2, ensure_ascii=False))
+        if options['save_baseline']:
+            with open(options['save_baseline'], 'w') as f:
+                json.dump(result, f, indent=2, ensure_ascii=False)
+            self.stdout.write('Saved baseline to %s' % options['save_baseline'])
+
+        problems = list(result['violations'])
+        if options['baseline']:
+            with open(options['baseline']) as f:
+                problems += benchmark.compare(result, json.load(f), options['tolerance'])
+        if problems:
+            raise CommandError('Load test failed:\n  ' + '\n  '.join(problems))
+        self.stdout.write(self.style.SUCCESS('%d requests, %.1f req/s, no invariant violations.'
+                                             % (result['requests'], result['throughput_rps'])))
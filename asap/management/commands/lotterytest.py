@@ -0,0 +1,43 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from asap import benchmark
+
+
+class Command(BaseCommand):
+    help = ('Time the lottery allocation (asap.lottery) over a generated semester and check '
+            'capacity, conflicts and one unit per research.  Writes to the configured database, '
+            'so run it with --settings pointing at a scratch database.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=10000)
+        parser.add_argument('--units', type=int, default=500)
+        parser.add_argument('--researches', type=int, default=100)
+        parser.add_argument('--seats', type=int, default=20)
+        parser.add_argument('--choices', type=int, default=5,
+                            help='Ranked units per student.')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--max-seconds', type=float,
+                            help='Fail when the allocation takes longer.')
+        parser.add_argument('--keep', action='store_true',
+                            help='Leave the generated users, units, preferences and records in place.')
+
+    def handle(self, *args, **options):
+        fixture = benchmark.generate_fixture(
+            researches=options['researches'], units=options['units'],
+            students=options['students'], seats=options['seats'], seed=options['seed'])
+        try:
+            result = benchmark.allocation(fixture, choices=options['choices'], seed=options['seed'])
+        finally:
+            if not options['keep']:
+                benchmark.cleanup()
+
+        self.stdout.write(json.dumps(result, indent=2, ensure_ascii=False))
+        problems = list(result['violations'])
+        if options['max_seconds'] and result['seconds'] > options['max_seconds']:
+            problems.append('allocation took %.2f s > %.2f s' % (result['seconds'], options['max_seconds']))
+        if problems:
+            raise CommandError('Lottery test failed:\n  ' + '\n  '.join(problems))
+        self.stdout.write(self.style.SUCCESS('Allocated %d seats to %d students in %.2f s, no violations.'
+                                             % (result['assigned'], result['students'], result['seconds'])))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from asap import search
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the SQLite FTS5 index used by the research search.'
+
+    def handle(self, *args, **options):
+        search.create_index()
+        if not search.index_available():
+            self.stdout.write('Search index is not available on this database; nothing to do.')
+            return
+        count = search.rebuild_index()
+        self.stdout.write(self.style.SUCCESS('Indexed %d researches.' % count))
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from asap import summary
+
+
+class Command(BaseCommand):
+    help = ('Recompute the professor dashboard summaries from the records, e.g. after '
+            'records were deleted or graded outside the site.')
+
+    def handle(self, *args, **options):
+        count = summary.refresh()
+        self.stdout.write(self.style.SUCCESS('Rebuilt %d unit summaries.' % count))
@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from asap import outbox
+
+
+class Command(BaseCommand):
+    help = 'Send queued mail from the outbox in batches over one SMTP connection.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=outbox.BATCH_SIZE)
+        parser.add_argument('--loop', action='store_true',
+                            help='Keep running and poll the outbox every --interval seconds.')
+        parser.add_argument('--interval', type=float, default=10)
+
+    def handle(self, *args, **options):
+        while True:
+            count = outbox.send_all(options['batch_size'])
+            if count:
+                self.stdout.write('Processed %d queued messages.' % count)
+            if not options['loop']:
+                return
+            close_old_connections()
+            time.sleep(options['interval'])
@@ -0,0 +1,46 @@
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.migrations.recorder import MigrationRecorder
+
+from asap.models import User
+
+# 요청별로 나누기 전의 마이그레이션 이름 -> 같은 스키마를 만드는 지금의 마이그레이션
+RENAMED = {
+    '0002_semester_scale': ['0002_record_unique', '0003_waitlist', '0004_search_indexes', '0005_outboundmail',
+                            '0006_unit_end_date', '0007_number_indexes', '0008_unitsummary',
+                            '0009_semester_index_archive', '0010_preference'],
+    '0003_fill_end_date_dedupe_records': [],
+    '0004_record_unique_end_date_not_null': [],
+}
+
+
+class Command(BaseCommand):
+    help = ('Bring a database created with `migrate --run-syncdb` (before asap had migrations) '
+            'under migrations: mark asap.0001_initial as applied when its tables already exist, '
+            'then run migrate, which adds end_date, the unique record constraint and the new tables. '
+            'Databases migrated with the old combined 0002-0004 are re-recorded under the current names.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        recorder = MigrationRecorder(connection)
+        recorder.ensure_schema()
+        applied = {name for app, name in recorder.applied_migrations() if app == 'asap'}
+        if not applied and User._meta.db_table in connection.introspection.table_names():
+            recorder.record_applied('asap', '0001_initial')
+            self.stdout.write('Marked asap.0001_initial as applied (tables created by --run-syncdb).')
+        old = applied & set(RENAMED)
+        if old:
+            if old != set(RENAMED):
+                raise CommandError('The old asap migrations are only partly applied (%s); finish them first.'
+                                   % ', '.join(sorted(old)))
+            for name in RENAMED:
+                recorder.record_unapplied('asap', name)
+                for new_name in RENAMED[name]:
+                    recorder.record_applied('asap', new_name)
+            self.stdout.write('Re-recorded asap 0002-0004 under the per-change migration names.')
+        call_command('migrate', database=options['database'], verbosity=options['verbosity'])
+        self.stdout.write(self.style.SUCCESS('Database is up to date.'))
@@ -0,0 +1,191 @@
+import json
+import logging
+import threading
+import time
+from collections import Counter, defaultdict, deque
+
+from django.conf import settings
+from django.contrib.auth import SESSION_KEY
+from django.db import connection
+from django.http import HttpResponse
+from django.utils.functional import SimpleLazyObject
+
+from .models import Prof, Student
+from . import ratelimit
+
+logger = logging.getLogger('asap.perf')
+
+# 뷰마다 최근 요청 몇 개까지 기억할지
+SAMPLE_SIZE = 1000
+
+_samples = defaultdict(lambda: deque(maxlen=SAMPLE_SIZE))
+_samples_lock = threading.Lock()
+
+# 세션 만료를 마지막으로 연장한 시각
+SESSION_REFRESHED_KEY = '_refreshed'
+
+
+class QueryCollector:
+    """``connection.execute_wrapper`` that counts and times every query."""
+
+    def __init__(self):
+        self.count = 0
+        self.time = 0.0
+        self.statements = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.time += time.perf_counter() - start
+            self.count += 1
+            self.statements[(sql, repr(params))] += 1
+
+    @property
+    def duplicates(self):
+        return sum(n - 1 for n in self.statements.values() if n > 1)
+
+
+class QueryInstrumentationMiddleware:
+    """Log query count, SQL time, duplicate queries and latency of every request."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        collector = QueryCollector()
+        start = time.perf_counter()
+        with connection.execute_wrapper(collector):
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - start
+
+        match = request.resolver_match
+        view = (match.url_name or match.view_name) if match else 'unresolved'
+        sample = {
+            'view': view,
+            'method': request.method,
+            'status': response.status_code,
+            'latency_ms': round(elapsed * 1000, 2),
+            'queries': collector.count,
+            'sql_ms': round(collector.time * 1000, 2),
+            'duplicate_queries': collector.duplicates,
+        }
+        with _samples_lock:
+            _samples[view].append(sample)
+        level = logging.WARNING if collector.duplicates else logging.INFO
+        logger.log(level, json.dumps(sample), extra=sample)
+        return response
+
+
+def _percentile(values, percent):
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(percent / 100 * (len(values) - 1))))
+    return values[index]
+
+
+def summary():
+    """Per view p50/p95 of latency and query counts over the recent samples."""
+    with _samples_lock:
+        snapshot = {view: list(samples) for view, samples in _samples.items()}
+    rows = []
+    for view, samples in sorted(snapshot.items()):
+        latency = [s['latency_ms'] for s in samples]
+        queries = [s['queries'] for s in samples]
+        sql = [s['sql_ms'] for s in samples]
+        rows.append({
+            'view': view,
+            'requests': len(samples),
+            'latency_p50': _percentile(latency, 50),
+            'latency_p95': _percentile(latency, 95),
+            'queries_p50': _percentile(queries, 50),
+            'queries_p95': _percentile(queries, 95),
+            'queries_max': max(queries),
+            'sql_p95': _percentile(sql, 95),
+            'duplicate_queries': sum(s['duplicate_queries'] for s in samples),
+        })
+    return rows
+
+
+def reset():
+    with _samples_lock:
+        _samples.clear()
+
+
+class SessionRefreshMiddleware:
+    """Slide the session expiry without writing the session on every request.
+
+    Replaces SESSION_SAVE_EVERY_REQUEST: the session is only marked modified
+    (and so saved, with a fresh cookie) once half of SESSION_COOKIE_AGE has
+    passed since the last refresh.  Must come after SessionMiddleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        session = getattr(request, 'session', None)
+        if session is None or session.session_key is None:
+            return response
+        now = int(time.time())
+        if session.modified:
+            # 어차피 저장되는 요청이면 연장 시각만 같이 기록한다
+            if session.keys():
+                session[SESSION_REFRESHED_KEY] = now
+        elif session.keys() and now - session.get(SESSION_REFRESHED_KEY, 0) >= settings.SESSION_COOKIE_AGE // 2:
+            session[SESSION_REFRESHED_KEY] = now
+        return response
+
+
+def _role(model, user, flag):
+    if not user.is_authenticated or not getattr(user, flag):
+        return None
+    return model.objects.select_related('user').filter(user_id=user.pk).first()
+
+
+class RoleMiddleware:
+    """Attach lazy ``request.prof`` and ``request.student``.
+
+    Each resolves on first use with one query (user joined in) and is then
+    memoized for the request; it is falsy for users without that role.
+    Must come after AuthenticationMiddleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.prof = SimpleLazyObject(lambda: _role(Prof, request.user, 'is_prof'))
+        request.student = SimpleLazyObject(lambda: _role(Student, request.user, 'is_student'))
+        return self.get_response(request)
+
+
+class RateLimitMiddleware:
+    """Answer 429 to users over their RATE_LIMITS budget before the view runs.
+
+    The user id is read from the session, not request.user, so a rejected
+    request costs one cache read and write and no query.  Anonymous clients
+    are keyed by address.  Must come after SessionMiddleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        return self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        url_name = request.resolver_match.url_name
+        if url_name not in settings.RATE_LIMITS:
+            return None
+        user_pk = request.session.get(SESSION_KEY)
+        client = 'user:%s' % user_pk if user_pk else 'addr:%s' % request.META.get('REMOTE_ADDR')
+        wait = ratelimit.take(url_name, client)
+        if not wait:
+            return None
+        ratelimit.reject(url_name)
+        response = HttpResponse('요청이 너무 많습니다. 잠시 후 다시 시도해 주세요.',
+                                status=429, content_type='text/plain; charset=utf-8')
+        response['Retry-After'] = str(ratelimit.retry_after(wait))
+        return response
@@ -0,0 +1,99 @@
+# Generated by Django 2.2.28
+
+import asap.models
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('auth', '0011_update_proxy_permissions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='User',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('password', models.CharField(max_length=128, verbose_name='password')),
+                ('last_login', models.DateTimeField(blank=True, null=True, verbose_name='last login')),
+                ('email', models.EmailField(help_text='반드시 자신의 학교 이메일을 기입해야만 합니다.', max_length=254, unique=True)),
+                ('name', models.CharField(max_length=10)),
+                ('sex', models.CharField(choices=[('M', '남자'), ('F', '여자')], max_length=1)),
+                ('date_joined', models.DateTimeField(auto_now_add=True)),
+                ('is_active', models.BooleanField(default=True)),
+                ('is_staff', models.BooleanField(default=False)),
+                ('is_superuser', models.BooleanField(default=False)),
+                ('is_student', models.BooleanField(default=False, verbose_name='student status')),
+                ('is_prof', models.BooleanField(default=False, verbose_name='teacher status')),
+                ('groups', models.ManyToManyField(blank=True, help_text='The groups this user belongs to. A user will get all permissions granted to each of their groups.', related_name='user_set', related_query_name='user', to='auth.Group', verbose_name='groups')),
+                ('user_permissions', models.ManyToManyField(blank=True, help_text='Specific permissions for this user.', related_name='user_set', related_query_name='user', to='auth.Permission', verbose_name='user permissions')),
+            ],
+            options={
+                'abstract': False,
+            },
+            managers=[
+                ('objects', asap.models.UserManager()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Research',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('research_number', models.CharField(max_length=6)),
+                ('research_name', models.CharField(max_length=30)),
+                ('semester', models.CharField(choices=[('1', 'Spring'), ('2', 'Fall')], max_length=1)),
+                ('year', models.PositiveIntegerField(default=2018)),
+                ('description', models.TextField(blank=True, null=True)),
+                ('created_date', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Prof',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('prof_number', models.CharField(max_length=10)),
+                ('major', models.CharField(max_length=10)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Student',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('student_number', models.CharField(max_length=10)),
+                ('major', models.CharField(max_length=10)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Unit',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('place', models.CharField(max_length=30)),
+                ('date', models.DateTimeField()),
+                ('period', models.PositiveIntegerField(default=1)),
+                ('max_number', models.PositiveIntegerField(default=20)),
+                ('current_number', models.PositiveIntegerField(default=0)),
+                ('remark', models.CharField(max_length=30, null=True)),
+                ('research_obj', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='asap.Research')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='research',
+            name='prof_obj',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='asap.Prof'),
+        ),
+        migrations.CreateModel(
+            name='Record',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total', models.PositiveIntegerField(blank=True, null=True)),
+                ('score', models.CharField(blank=True, choices=[('P', 'P'), ('F', 'F')], max_length=2, null=True)),
+                ('unit_obj', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='asap.Unit')),
+                ('student_obj', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='asap.Student')),
+            ],
+        ),
+    ]
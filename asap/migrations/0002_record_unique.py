@@ -0,0 +1,38 @@
+from django.db import migrations, router
+from django.db.models import Count, Min
+
+
+def dedupe_records(apps, schema_editor):
+    """Drop duplicate (student, unit) records left by the old check-then-insert enroll.
+
+    The oldest record is kept, and the seat counters of the affected units
+    are recounted so the unique constraint below can be added.
+    """
+    Record = apps.get_model('asap', 'Record')
+    Unit = apps.get_model('asap', 'Unit')
+    if not router.allow_migrate_model(schema_editor.connection.alias, Record):  # 보관 DB에는 Record가 없다
+        return
+    duplicates = (Record.objects.values('student_obj', 'unit_obj')
+                  .annotate(n=Count('pk'), keep=Min('pk')).filter(n__gt=1))
+    unit_pks = set()
+    for row in duplicates:
+        (Record.objects.filter(student_obj=row['student_obj'], unit_obj=row['unit_obj'])
+         .exclude(pk=row['keep']).delete())
+        unit_pks.add(row['unit_obj'])
+    for unit_pk in unit_pks:
+        Unit.objects.filter(pk=unit_pk).update(current_number=Record.objects.filter(unit_obj=unit_pk).count())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('asap', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(dedupe_records, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='record',
+            unique_together={('student_obj', 'unit_obj')},
+        ),
+    ]
@@ -0,0 +1,25 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('asap', '0002_record_unique'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Waitlist',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_date', models.DateTimeField(auto_now_add=True)),
+                ('student_obj', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='asap.Student')),
+                ('unit_obj', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='asap.Unit')),
+            ],
+            options={
+                'ordering': ('pk',),
+                'unique_together': {('student_obj', 'unit_obj')},
+            },
+        ),
+    ]
@@ -0,0 +1,26 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('asap', '0003_waitlist'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='user',
+            name='name',
+            field=models.CharField(db_index=True, max_length=10),
+        ),
+        migrations.AlterField(
+            model_name='research',
+            name='research_number',
+            field=models.CharField(db_index=True, max_length=6),
+        ),
+        migrations.AlterField(
+            model_name='research',
+            name='research_name',
+            field=models.CharField(db_index=True, max_length=30),
+        ),
+    ]
@@ -0,0 +1,30 @@
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('asap', '0004_search_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutboundMail',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('subject', models.CharField(max_length=200)),
+                ('body', models.TextField()),
+                ('to', models.TextField(help_text='쉼표로 구분한 수신 주소')),
+                ('created_date', models.DateTimeField(auto_now_add=True)),
+                ('next_attempt', models.DateTimeField(default=django.utils.timezone.now)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('sent_date', models.DateTimeField(blank=True, null=True)),
+                ('last_error', models.TextField(blank=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='outboundmail',
+            index=models.Index(fields=['sent_date', 'next_attempt'], name='asap_outbou_sent_da_0cba87_idx'),
+        ),
+    ]
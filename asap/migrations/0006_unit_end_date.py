@@ -0,0 +1,40 @@
+import datetime
+
+from django.db import migrations, models, router
+
+# asap.models.Unit.PERIOD_LENGTH
+PERIOD_LENGTH = datetime.timedelta(hours=1)
+
+
+def fill_end_date(apps, schema_editor):
+    Unit = apps.get_model('asap', 'Unit')
+    if not router.allow_migrate_model(schema_editor.connection.alias, Unit):  # 보관 DB에는 Unit이 없다
+        return
+    for unit in Unit.objects.filter(end_date__isnull=True).only('pk', 'date', 'period'):
+        Unit.objects.filter(pk=unit.pk).update(end_date=unit.date + unit.period * PERIOD_LENGTH)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('asap', '0005_outboundmail'),
+    ]
+
+    operations = [
+        # 기존 세션을 채운 뒤에 NOT NULL로 바꾼다
+        migrations.AddField(
+            model_name='unit',
+            name='end_date',
+            field=models.DateTimeField(editable=False, null=True),
+        ),
+        migrations.RunPython(fill_end_date, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='unit',
+            name='end_date',
+            field=models.DateTimeField(editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='unit',
+            index=models.Index(fields=['date', 'end_date'], name='asap_unit_date_b70d12_idx'),
+        ),
+    ]
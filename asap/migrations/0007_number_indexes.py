@@ -0,0 +1,21 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('asap', '0006_unit_end_date'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='student',
+            name='student_number',
+            field=models.CharField(db_index=True, max_length=10),
+        ),
+        migrations.AlterField(
+            model_name='prof',
+            name='prof_number',
+            field=models.CharField(db_index=True, max_length=10),
+        ),
+    ]
@@ -0,0 +1,28 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('asap', '0007_number_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UnitSummary',
+            fields=[
+                ('unit_obj', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='summary', serialize=False, to='asap.Unit')),
+                ('enrolled', models.PositiveIntegerField(default=0)),
+                ('capacity', models.PositiveIntegerField(default=0)),
+                ('passed', models.PositiveIntegerField(default=0)),
+                ('failed', models.PositiveIntegerField(default=0)),
+                ('prof_obj', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='asap.Prof')),
+                ('research_obj', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='asap.Research')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='unitsummary',
+            index=models.Index(fields=['prof_obj', 'research_obj'], name='asap_unitsu_prof_ob_d541c7_idx'),
+        ),
+    ]
@@ -0,0 +1,50 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('asap', '0008_unitsummary'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='research',
+            index=models.Index(fields=['year', 'semester'], name='asap_resear_year_2aba43_idx'),
+        ),
+        migrations.CreateModel(
+            name='ArchivedUnit',
+            fields=[
+                ('id', models.IntegerField(primary_key=True, serialize=False)),
+                ('research_id', models.IntegerField(db_index=True)),
+                ('research_number', models.CharField(max_length=6)),
+                ('research_name', models.CharField(max_length=30)),
+                ('year', models.PositiveIntegerField()),
+                ('semester', models.CharField(choices=[('1', 'Spring'), ('2', 'Fall')], max_length=1)),
+                ('place', models.CharField(max_length=30)),
+                ('date', models.DateTimeField()),
+                ('end_date', models.DateTimeField()),
+                ('period', models.PositiveIntegerField()),
+                ('max_number', models.PositiveIntegerField()),
+                ('current_number', models.PositiveIntegerField()),
+                ('remark', models.CharField(max_length=30, null=True)),
+                ('archived_date', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='archivedunit',
+            index=models.Index(fields=['year', 'semester'], name='asap_archiv_year_2ecb93_idx'),
+        ),
+        migrations.CreateModel(
+            name='ArchivedRecord',
+            fields=[
+                ('id', models.IntegerField(primary_key=True, serialize=False)),
+                ('student_pk', models.IntegerField(db_index=True)),
+                ('student_number', models.CharField(max_length=10)),
+                ('total', models.PositiveIntegerField(blank=True, null=True)),
+                ('score', models.CharField(blank=True, choices=[('P', 'P'), ('F', 'F')], max_length=2, null=True)),
+                ('unit_obj', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='asap.ArchivedUnit')),
+            ],
+        ),
+    ]
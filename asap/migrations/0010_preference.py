@@ -0,0 +1,26 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('asap', '0009_semester_index_archive'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Preference',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveIntegerField()),
+                ('created_date', models.DateTimeField(auto_now_add=True)),
+                ('student_obj', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='asap.Student')),
+                ('unit_obj', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='asap.Unit')),
+            ],
+            options={
+                'ordering': ('student_obj', 'rank'),
+                'unique_together': {('student_obj', 'unit_obj')},
+            },
+        ),
+    ]
@@ -1,5 +1,8 @@
+import datetime
+
 from django.contrib.auth.models import (BaseUserManager, AbstractBaseUser, PermissionsMixin)
 from django.db import models
+from django.utils import timezone
 from django.utils.translation import ugettext_lazy as _
 from django.utils.dates import MONTHS
 
@@ -40,7 +43,7 @@ class UserManager(BaseUserManager):
 class User(AbstractBaseUser, PermissionsMixin):
     email = models.EmailField(unique=True,
                               help_text="""반드시 자신의 학교 이메일을 기입해야만 합니다.""")
-    name = models.CharField(max_length=10)
+    name = models.CharField(max_length=10, db_index=True)
     SEX = (
         ('M', '남자'),
         ('F', '여자'),
@@ -60,7 +63,7 @@ class User(AbstractBaseUser, PermissionsMixin):
 
 class Student(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True)
-    student_number = models.CharField(max_length=10)
+    student_number = models.CharField(max_length=10, db_index=True)
     major = models.CharField(max_length=10)
 
     def __str__(self):
@@ -68,16 +71,36 @@ class Student(models.Model):
 
 class Prof(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True)
-    prof_number = models.CharField(max_length=10)
+    prof_number = models.CharField(max_length=10, db_index=True)
     major = models.CharField(max_length=10)
 
     def __str__(self):
         return self.user.name
 
+def _current_semester():
+    from .catalogue import current_semester  # catalogue가 models를 import하므로 호출할 때 가져온다
+    return current_semester()
+
+
+class ResearchQuerySet(models.QuerySet):
+
+    def owned_by(self, user):
+        """Researches of the professor whose user is ``user`` (Prof shares the user pk)."""
+        return self.filter(prof_obj_id=user.pk)
+
+    def in_semester(self, year, semester):
+        return self.filter(year=year, semester=semester)
+
+    def current(self):
+        """Researches of the semester open for enrollment (see catalogue.current_semester)."""
+        pair = _current_semester()
+        return self.in_semester(*pair) if pair else self.none()
+
+
 class Research(models.Model):
-    research_number = models.CharField(max_length=6)
+    research_number = models.CharField(max_length=6, db_index=True)
     prof_obj = models.ForeignKey('Prof', on_delete=models.CASCADE)
-    research_name = models.CharField(max_length=30)
+    research_name = models.CharField(max_length=30, db_index=True)
     SEME = (
         ('1', 'Spring'),
         ('2', 'Fall'),
@@ -86,19 +109,79 @@ class Research(models.Model):
     year = models.PositiveIntegerField(default=2018)
     description = models.TextField(null=True, blank=True)
     created_date = models.DateTimeField(auto_now_add=True)
+
+    objects = ResearchQuerySet.as_manager()
+
+    class Meta:
+        indexes = [models.Index(fields=['year', 'semester'])]
+
     def __str__(self):
         return self.research_name
 
 
+class UnitQuerySet(models.QuerySet):
+
+    def catalogue(self):
+        """Units with their research and its professor joined in one query."""
+        return self.select_related('research_obj__prof_obj__user')
+
+    def owned_by(self, user):
+        """Units of the professor whose user is ``user``, research joined in."""
+        return self.filter(research_obj__prof_obj_id=user.pk).select_related('research_obj')
+
+    def in_semester(self, year, semester):
+        return self.filter(research_obj__year=year, research_obj__semester=semester)
+
+    def current(self):
+        pair = _current_semester()
+        return self.in_semester(*pair) if pair else self.none()
+
+
 class Unit(models.Model):
     research_obj = models.ForeignKey('Research', on_delete=models.CASCADE)
     place = models.CharField(max_length=30)
     date = models.DateTimeField()
     period = models.PositiveIntegerField(default=1)
+    # date + period 시간, 시간 중복 검사를 범위 조회 한 번으로 하기 위해 저장
+    end_date = models.DateTimeField(editable=False)
     max_number = models.PositiveIntegerField(default=20)
     current_number = models.PositiveIntegerField(default=0)
     remark = models.CharField(max_length=30, null=True)
 
+    objects = UnitQuerySet.as_manager()
+
+    # 시수 1 = 1시간
+    PERIOD_LENGTH = datetime.timedelta(hours=1)
+
+    class Meta:
+        indexes = [models.Index(fields=['date', 'end_date'])]
+
+    def set_end_date(self):
+        """Fill ``end_date``; bulk_create callers must call this themselves."""
+        self.end_date = self.date + self.period * self.PERIOD_LENGTH
+        return self
+
+    def save(self, *args, **kwargs):
+        self.set_end_date()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and ({'date', 'period'} & set(update_fields)):
+            kwargs['update_fields'] = list(update_fields) + ['end_date']
+        super().save(*args, **kwargs)
+
+
+class RecordQuerySet(models.QuerySet):
+
+    def for_student(self, student):
+        """The student's records with unit, research and professor joined."""
+        return (self.filter(student_obj=student)
+                .select_related('unit_obj__research_obj__prof_obj__user'))
+
+    def roster(self, unit):
+        """The unit's records with each student's user joined, by student number."""
+        return (self.filter(unit_obj=unit)
+                .select_related('student_obj__user')
+                .order_by('student_obj__student_number', 'pk'))
+
 
 class Record(models.Model):
     student_obj = models.ForeignKey('Student', on_delete=models.CASCADE)
@@ -110,6 +193,122 @@ class Record(models.Model):
     )
     score = models.CharField(max_length=2, choices=SCORE, null=True, blank=True)
 
+    objects = RecordQuerySet.as_manager()
+
+    class Meta:
+        unique_together = ('student_obj', 'unit_obj')
+
     def __str__(self):
         return self.unit_obj.research_obj.research_name + ' / ' + self.student_obj.user.name
 
+
+
+class UnitSummary(models.Model):
+    """Enrollment and grading counts of one unit for the professor dashboard.
+
+    Kept up to date by asap.summary on enroll, cancel and grading; research
+    and professor are copied in so the dashboard is one indexed query.
+    """
+    unit_obj = models.OneToOneField('Unit', on_delete=models.CASCADE, primary_key=True, related_name='summary')
+    research_obj = models.ForeignKey('Research', on_delete=models.CASCADE, related_name='+')
+    prof_obj = models.ForeignKey('Prof', on_delete=models.CASCADE, related_name='+')
+    enrolled = models.PositiveIntegerField(default=0)
+    capacity = models.PositiveIntegerField(default=0)
+    passed = models.PositiveIntegerField(default=0)
+    failed = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [models.Index(fields=['prof_obj', 'research_obj'])]
+
+    @property
+    def graded(self):
+        return self.passed + self.failed
+
+
+class Waitlist(models.Model):
+    student_obj = models.ForeignKey('Student', on_delete=models.CASCADE)
+    unit_obj = models.ForeignKey('Unit', on_delete=models.CASCADE)
+    created_date = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('student_obj', 'unit_obj')
+        ordering = ('pk',)
+
+    def __str__(self):
+        return self.unit_obj.research_obj.research_name + ' / ' + self.student_obj.user.name
+
+
+class Preference(models.Model):
+    """A student's ranked wish for a unit; asap.lottery turns them into Records."""
+    student_obj = models.ForeignKey('Student', on_delete=models.CASCADE)
+    unit_obj = models.ForeignKey('Unit', on_delete=models.CASCADE)
+    rank = models.PositiveIntegerField()  # 1이 1지망
+    created_date = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('student_obj', 'unit_obj')
+        ordering = ('student_obj', 'rank')
+
+    def __str__(self):
+        return '%s / %s' % (self.student_obj, self.rank)
+
+
+class OutboundMail(models.Model):
+    subject = models.CharField(max_length=200)
+    body = models.TextField()
+    to = models.TextField(help_text='쉼표로 구분한 수신 주소')
+    created_date = models.DateTimeField(auto_now_add=True)
+    next_attempt = models.DateTimeField(default=timezone.now)
+    attempts = models.PositiveIntegerField(default=0)
+    sent_date = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['sent_date', 'next_attempt'])]
+
+    def __str__(self):
+        return self.subject + ' / ' + self.to
+
+
+# <------------------------------------지난 학기 보관------------------------------------>
+# `manage.py archive_semester`가 끝난 학기의 Unit/Record를 옮겨 두는 표.
+# 다른 표를 FK로 가리키지 않으므로 ARCHIVE_DATABASE로 별도 SQLite 파일에 둘 수도 있다.
+
+class ArchivedUnit(models.Model):
+    id = models.IntegerField(primary_key=True)  # 원래 Unit의 pk
+    research_id = models.IntegerField(db_index=True)
+    research_number = models.CharField(max_length=6)
+    research_name = models.CharField(max_length=30)
+    year = models.PositiveIntegerField()
+    semester = models.CharField(max_length=1, choices=Research.SEME)
+    place = models.CharField(max_length=30)
+    date = models.DateTimeField()
+    end_date = models.DateTimeField()
+    period = models.PositiveIntegerField()
+    max_number = models.PositiveIntegerField()
+    current_number = models.PositiveIntegerField()
+    remark = models.CharField(max_length=30, null=True)
+    archived_date = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['year', 'semester'])]
+
+    def __str__(self):
+        return '%s / %s' % (self.research_name, self.date)
+
+    @property
+    def research_obj_id(self):
+        # Unit과 같은 이름으로 읽히게 해서 실험 정보 페이지와 API가 보관된 세션도 그대로 보여준다
+        return self.research_id
+
+
+class ArchivedRecord(models.Model):
+    id = models.IntegerField(primary_key=True)  # 원래 Record의 pk
+    unit_obj = models.ForeignKey('ArchivedUnit', on_delete=models.CASCADE)
+    student_pk = models.IntegerField(db_index=True)
+    student_number = models.CharField(max_length=10)
+    total = models.PositiveIntegerField(null=True, blank=True)
+    score = models.CharField(max_length=2, choices=Record.SCORE, null=True, blank=True)
+
+    def __str__(self):
+        return '%s / %s' % (self.unit_obj.research_name, self.student_number)
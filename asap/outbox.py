@@ -0,0 +1,135 @@
+import datetime
+import logging
+import threading
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from .models import OutboundMail
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 50
+MAX_ATTEMPTS = 5
+# 재시도 간격: 60초, 120초, 240초 ...
+BACKOFF_SECONDS = 60
+# 발송 중인 메일은 이 시간 동안 다른 워커가 가져가지 않는다
+LEASE_SECONDS = 300
+
+
+def queue_mail(subject, body, to):
+    """Store a message in the outbox; it is sent outside the request."""
+    mail = OutboundMail.objects.create(subject=subject, body=body, to=','.join(to))
+    if getattr(settings, 'OUTBOX_WORKER', False):
+        start_worker()
+        transaction.on_commit(wake_worker)
+    return mail
+
+
+def _claim(batch_size):
+    now = timezone.now()
+    lease = now + datetime.timedelta(seconds=LEASE_SECONDS)
+    candidates = (OutboundMail.objects
+                  .filter(sent_date=None, attempts__lt=MAX_ATTEMPTS, next_attempt__lte=now)
+                  .order_by('next_attempt', 'pk')[:batch_size])
+    claimed = []
+    for mail in candidates:
+        if OutboundMail.objects.filter(pk=mail.pk, next_attempt=mail.next_attempt).update(next_attempt=lease):
+            claimed.append(mail)
+    return claimed
+
+
+def _failed(mail, exc):
+    mail.attempts += 1
+    mail.next_attempt = timezone.now() + datetime.timedelta(
+        seconds=BACKOFF_SECONDS * 2 ** (mail.attempts - 1))
+    mail.last_error = repr(exc)
+    mail.save(update_fields=['attempts', 'next_attempt', 'last_error'])
+    logger.warning('Sending mail %s failed (attempt %d): %r', mail.pk, mail.attempts, exc)
+
+
+def send_pending(batch_size=BATCH_SIZE):
+    """Send one batch of due messages over a single SMTP connection.
+
+    Returns the number of messages taken from the outbox.
+    """
+    batch = _claim(batch_size)
+    if not batch:
+        return 0
+
+    connection = get_connection()
+    try:
+        connection.open()
+    except Exception as exc:
+        for mail in batch:
+            _failed(mail, exc)
+        return len(batch)
+
+    sent = []
+    try:
+        for mail in batch:
+            message = EmailMessage(mail.subject, mail.body, to=mail.to.split(','),
+                                   connection=connection)
+            try:
+                message.send()
+            except Exception as exc:
+                _failed(mail, exc)
+            else:
+                sent.append(mail.pk)
+    finally:
+        connection.close()
+        OutboundMail.objects.filter(pk__in=sent).update(sent_date=timezone.now())
+    return len(batch)
+
+
+def send_all(batch_size=BATCH_SIZE):
+    total = 0
+    while True:
+        # 다른 워커와 나눠 가지면 덜 찬 배치가 와도 남은 메일이 있으니, 가져갈 것이 없을 때까지 돈다
+        count = send_pending(batch_size)
+        total += count
+        if not count:
+            return total
+
+
+# <------------------------------------백그라운드 발송 스레드------------------------------------>
+
+class OutboxWorker(threading.Thread):
+    """Daemon thread that drains the outbox when woken and every ``interval`` seconds."""
+
+    def __init__(self, interval=30):
+        super().__init__(name='outbox-worker', daemon=True)
+        self.interval = interval
+        self.wakeup = threading.Event()
+
+    def run(self):
+        while True:
+            self.wakeup.wait(self.interval)
+            self.wakeup.clear()
+            close_old_connections()
+            try:
+                send_all()
+            except Exception:
+                logger.exception('Outbox worker failed')
+            finally:
+                close_old_connections()
+
+
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def start_worker(interval=None):
+    global _worker
+    with _worker_lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = OutboxWorker(interval or getattr(settings, 'OUTBOX_INTERVAL', 30))
+            _worker.start()
+    return _worker
+
+
+def wake_worker():
+    if _worker is not None:
+        _worker.wakeup.set()
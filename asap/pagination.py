@@ -0,0 +1,65 @@
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+PAGE_SIZE = 20
+# 이보다 작은 표는 추정치 대신 COUNT(*)로 정확히 센다
+ESTIMATE_THRESHOLD = 10000
+
+
+def keyset_page(queryset, after=None, size=PAGE_SIZE):
+    """Return ``(objects, next_cursor)`` for the rows after the ``after`` pk.
+
+    Seeks on the primary key instead of using OFFSET, so the cost of a page
+    does not depend on how deep into the listing it is.
+    """
+    queryset = queryset.order_by('pk')
+    try:
+        queryset = queryset.filter(pk__gt=int(after))
+    except (TypeError, ValueError):
+        pass
+    objects = list(queryset[:size + 1])
+    next_cursor = objects[size - 1].pk if len(objects) > size else None
+    return objects[:size], next_cursor
+
+
+def estimated_count(model, using='default'):
+    """Cheap row-count estimate of ``model``'s table, or None if unavailable.
+
+    Uses the planner statistics on PostgreSQL/MySQL and the largest rowid
+    on SQLite (an upper bound, exact until rows are deleted).
+    """
+    connection = connections[using]
+    table = model._meta.db_table
+    if connection.vendor == 'postgresql':
+        sql, params = 'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass', [table]
+    elif connection.vendor == 'mysql':
+        sql = ('SELECT table_rows FROM information_schema.tables '
+               'WHERE table_schema = DATABASE() AND table_name = %s')
+        params = [table]
+    elif connection.vendor == 'sqlite':
+        sql, params = 'SELECT MAX(_ROWID_) FROM %s' % connection.ops.quote_name(table), []
+    else:
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        row = cursor.fetchone()
+    return int(row[0]) if row and row[0] is not None else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator for admin changelists of large tables.
+
+    An unfiltered listing takes its count from :func:`estimated_count`
+    instead of scanning the table with ``COUNT(*)``; filtered listings and
+    small tables are still counted exactly.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if hasattr(queryset, 'query') and not queryset.query.where:
+            estimate = estimated_count(queryset.model, queryset.db)
+            if estimate is not None and estimate >= ESTIMATE_THRESHOLD:
+                return estimate
+        return super().count
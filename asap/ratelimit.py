@@ -0,0 +1,70 @@
+"""Per-user token buckets for the enrollment endpoints (see RateLimitMiddleware).
+
+RATE_LIMITS maps a URL name to ``(burst, per_second)``: a user may send
+``burst`` requests at once and then ``per_second`` on average.  Buckets and
+rejection counters live in the RATE_LIMIT_CACHE alias, so every worker
+sharing that cache (file or Redis backend) shares the limits.
+"""
+import math
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+# 버킷은 가득 찰 때까지 걸리는 시간보다 조금 더 남겨 둔다
+EXPIRY_MARGIN = 60
+
+
+def _cache():
+    return caches[settings.RATE_LIMIT_CACHE]
+
+
+def _bucket_key(url_name, client):
+    return 'ratelimit:bucket:%s:%s' % (url_name, client)
+
+def _rejected_key(url_name):
+    return 'ratelimit:rejected:%s' % url_name
+
+
+def take(url_name, client, now=None):
+    """Take a token from ``client``'s bucket for ``url_name``.
+
+    Returns 0 when the request may go ahead, otherwise the seconds until
+    the next token.  The read-modify-write is not atomic across workers, so
+    a burst of simultaneous requests can overshoot by a request or two; the
+    limit is a brake, not an exact quota.
+    """
+    burst, rate = settings.RATE_LIMITS[url_name]
+    now = time.time() if now is None else now
+    cache = _cache()
+    key = _bucket_key(url_name, client)
+    tokens, updated = cache.get(key) or (burst, now)
+    tokens = min(burst, tokens + (now - updated) * rate)
+    if tokens < 1:
+        cache.set(key, (tokens, now), int(burst / rate) + EXPIRY_MARGIN)
+        return (1 - tokens) / rate
+    cache.set(key, (tokens - 1, now), int(burst / rate) + EXPIRY_MARGIN)
+    return 0
+
+
+def reject(url_name):
+    cache = _cache()
+    try:
+        cache.incr(_rejected_key(url_name))
+    except ValueError:
+        cache.add(_rejected_key(url_name), 1, None)
+
+
+def rejected_counts():
+    """``{url_name: rejected requests}`` for every limited URL name."""
+    keys = {_rejected_key(name): name for name in settings.RATE_LIMITS}
+    counts = _cache().get_many(keys)
+    return {name: counts.get(key, 0) for key, name in keys.items()}
+
+
+def reset_rejected():
+    _cache().delete_many([_rejected_key(name) for name in settings.RATE_LIMITS])
+
+
+def retry_after(seconds):
+    return max(1, int(math.ceil(seconds)))
@@ -0,0 +1,30 @@
+from django.conf import settings
+
+ARCHIVE_MODELS = {'asap.archivedunit', 'asap.archivedrecord'}
+
+
+class ArchiveRouter:
+    """Send the archive tables to ARCHIVE_DATABASE and keep everything else out of it."""
+
+    def _is_archive(self, model_or_obj):
+        # 인스턴스는 request.student 같은 SimpleLazyObject일 수 있으므로 type()이 아니라 _meta로 판별한다
+        return model_or_obj._meta.label_lower in ARCHIVE_MODELS
+
+    def db_for_read(self, model, **hints):
+        return settings.ARCHIVE_DATABASE if self._is_archive(model) else None
+
+    db_for_write = db_for_read
+
+    def allow_relation(self, obj1, obj2, **hints):
+        if self._is_archive(obj1) and self._is_archive(obj2):
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if settings.ARCHIVE_DATABASE == 'default':
+            return None
+        if app_label == 'asap' and model_name and 'asap.%s' % model_name in ARCHIVE_MODELS:
+            return db == settings.ARCHIVE_DATABASE
+        if db == settings.ARCHIVE_DATABASE:
+            return False
+        return None
@@ -0,0 +1,115 @@
+import logging
+
+from django.db import connection, DatabaseError
+from django.db.models import Q
+
+from .models import Research
+
+logger = logging.getLogger(__name__)
+
+# 검색 가능한 필드: q_option 값 -> (색인 컬럼, ORM lookup)
+SEARCH_FIELDS = {
+    'research_name': ('research_name', 'research_name'),
+    'research_number': ('research_number', 'research_number'),
+    'prof': ('prof_name', 'prof_obj__user__name'),
+}
+DEFAULT_FIELD = 'research_name'
+
+INDEX_TABLE = 'asap_research_fts'
+
+_index_ready = None
+
+
+def index_available():
+    """Whether the SQLite FTS5 index table exists on the default database."""
+    global _index_ready
+    if _index_ready is None:
+        _index_ready = False
+        if connection.vendor == 'sqlite':
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1 FROM sqlite_master WHERE name = %s", [INDEX_TABLE])
+                _index_ready = cursor.fetchone() is not None
+    return _index_ready
+
+
+def create_index():
+    """Create the FTS5 table; returns True if it did not exist before."""
+    global _index_ready
+    if connection.vendor != 'sqlite':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE name = %s", [INDEX_TABLE])
+        if cursor.fetchone() is not None:
+            _index_ready = True
+            return False
+        try:
+            cursor.execute(
+                "CREATE VIRTUAL TABLE %s USING fts5("
+                "research_name, research_number, prof_name, "
+                "tokenize = 'unicode61', prefix = '1 2 3')" % INDEX_TABLE)
+        except DatabaseError:
+            logger.warning('SQLite FTS5 is not available; research search falls back to LIKE.')
+            _index_ready = False
+            return False
+    _index_ready = True
+    return True
+
+
+def rebuild_index():
+    if not index_available():
+        return 0
+    rows = list(Research.objects.values_list(
+        'pk', 'research_name', 'research_number', 'prof_obj__user__name'))
+    with connection.cursor() as cursor:
+        cursor.execute("DELETE FROM %s" % INDEX_TABLE)
+        cursor.executemany(
+            "INSERT INTO %s (rowid, research_name, research_number, prof_name) "
+            "VALUES (%%s, %%s, %%s, %%s)" % INDEX_TABLE, rows)
+    return len(rows)
+
+
+def index_research(research):
+    if not index_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute("DELETE FROM %s WHERE rowid = %%s" % INDEX_TABLE, [research.pk])
+        cursor.execute(
+            "INSERT INTO %s (rowid, research_name, research_number, prof_name) "
+            "VALUES (%%s, %%s, %%s, %%s)" % INDEX_TABLE,
+            [research.pk, research.research_name, research.research_number,
+             research.prof_obj.user.name])
+
+
+def unindex_research(pk):
+    if not index_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute("DELETE FROM %s WHERE rowid = %%s" % INDEX_TABLE, [pk])
+
+
+def _match_expression(column, q):
+    terms = ['"%s"*' % term.replace('"', '""') for term in q.split()]
+    return ' AND '.join('%s : %s' % (column, term) for term in terms)
+
+
+def search_research(q, q_option=None):
+    """Researches whose ``q_option`` field has a word starting with each term of ``q``.
+
+    Unknown options fall back to the research name, so user input never
+    reaches the ORM as a field name.  Without the FTS5 index the same
+    per-word match runs as LIKE over the whole table (a scan; words are
+    split on spaces only).
+    """
+    column, lookup = SEARCH_FIELDS.get(q_option, SEARCH_FIELDS[DEFAULT_FIELD])
+    queryset = Research.objects.all()
+    if not q.strip():
+        return queryset
+    if index_available():
+        return queryset.extra(
+            where=['"%s"."id" IN (SELECT rowid FROM %s WHERE %s MATCH %%s)'
+                   % (Research._meta.db_table, INDEX_TABLE, INDEX_TABLE)],
+            params=[_match_expression(column, q)])
+    for term in q.split():
+        # 필드 맨 앞이나 공백 뒤에서 시작하는 단어 (FTS와 같은 결과)
+        queryset = queryset.filter(Q(**{lookup + '__istartswith': term}) | Q(**{lookup + '__icontains': ' ' + term}))
+    return queryset
@@ -0,0 +1,85 @@
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from .models import Research, Unit
+from . import catalogue, live, search, summary
+
+
+# <------------------------------------검색 색인 동기화------------------------------------>
+
+@receiver(post_save, sender=Research)
+def index_research(sender, instance, raw=False, **kwargs):
+    if not raw:
+        search.index_research(instance)
+
+@receiver(post_delete, sender=Research)
+def unindex_research(sender, instance, **kwargs):
+    search.unindex_research(instance.pk)
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def reindex_prof_researches(sender, instance, raw=False, update_fields=None, **kwargs):
+    # 교강사 이름이 바뀐 경우에만 재색인 (로그인 시 last_login 저장 등은 무시)
+    if raw or not instance.is_prof:
+        return
+    if update_fields is not None and 'name' not in update_fields:
+        return
+    for research in Research.objects.filter(prof_obj__user=instance).select_related('prof_obj__user'):
+        search.index_research(research)
+        catalogue.invalidate_research(research.pk)
+        catalogue.invalidate_semester(research.year, research.semester)
+
+
+
+# <------------------------------------실험 목록 캐시 무효화------------------------------------>
+
+@receiver(pre_save, sender=Research)
+def remember_research_semester(sender, instance, raw=False, **kwargs):
+    # 학기가 바뀌면 이전 학기 목록도 비워야 한다
+    if not raw and instance.pk:
+        instance._previous_semester = (Research.objects.filter(pk=instance.pk)
+                                       .values_list('year', 'semester').first())
+
+@receiver(post_save, sender=Research)
+@receiver(post_delete, sender=Research)
+def invalidate_research_catalogue(sender, instance, **kwargs):
+    catalogue.invalidate_research(instance.pk)
+    catalogue.invalidate_semester(instance.year, instance.semester)
+    previous = getattr(instance, '_previous_semester', None)
+    if previous and previous != (instance.year, instance.semester):
+        catalogue.invalidate_semester(*previous)
+
+@receiver(post_save, sender=Unit)
+@receiver(post_delete, sender=Unit)
+def invalidate_unit_catalogue(sender, instance, **kwargs):
+    catalogue.invalidate_research(instance.research_obj_id)
+    catalogue.invalidate_seats(instance.pk)
+    pk = instance.pk
+    # 정원 변경도 실시간 좌석 현황에 반영. 커밋 전에 알리면 구독자가 이전 값을 읽는다
+    transaction.on_commit(lambda: live.seats_changed(pk))
+    semester = (Research.objects.filter(pk=instance.research_obj_id)
+                .values_list('year', 'semester').first())
+    if semester:
+        catalogue.invalidate_semester(*semester)
+
+
+# <------------------------------------대시보드 요약------------------------------------>
+
+@receiver(post_save, sender=Research)
+def update_research_summaries(sender, instance, raw=False, **kwargs):
+    if not raw:
+        summary.research_saved(instance)
+
+@receiver(post_save, sender=Unit)
+def update_unit_summary(sender, instance, raw=False, **kwargs):
+    if not raw:
+        summary.unit_saved(instance)
+
+
+def create_search_index(sender, using=DEFAULT_DB_ALIAS, **kwargs):
+    # 색인은 기본 DB에만 있다. `migrate --database=archive`에서는 건드리지 않는다
+    if using != DEFAULT_DB_ALIAS:
+        return
+    if search.create_index():
+        search.rebuild_index()
@@ -0,0 +1,99 @@
+"""Per-unit summary counts behind the professor dashboard (UnitSummary).
+
+Enroll and cancel adjust the counters with F() updates inside their own
+transaction; grading, bulk imports and repairs recompute the touched units
+from their records with :func:`refresh`.
+"""
+from collections import OrderedDict
+
+from django.db.models import Count, F, Q
+
+from .db import write_atomic
+from .models import Unit, UnitSummary
+
+
+# <------------------------------------증감------------------------------------>
+
+def seat_taken(unit_pk):
+    UnitSummary.objects.filter(unit_obj_id=unit_pk).update(enrolled=F('enrolled') + 1)
+
+
+def seat_released(unit_pk, score=None):
+    """A record of the unit was deleted; ``score`` is the grade it carried."""
+    changes = {'enrolled': F('enrolled') - 1}
+    if score == 'P':
+        changes['passed'] = F('passed') - 1
+    elif score == 'F':
+        changes['failed'] = F('failed') - 1
+    UnitSummary.objects.filter(unit_obj_id=unit_pk, enrolled__gt=0).update(**changes)
+
+
+def unit_saved(unit):
+    """Copy capacity, research and professor of a created or edited unit."""
+    updated = (UnitSummary.objects.filter(unit_obj_id=unit.pk)
+               .update(capacity=unit.max_number, research_obj_id=unit.research_obj_id,
+                       prof_obj_id=unit.research_obj.prof_obj_id))
+    if not updated:
+        refresh([unit.pk])
+
+
+def research_saved(research):
+    UnitSummary.objects.filter(research_obj_id=research.pk).update(prof_obj_id=research.prof_obj_id)
+
+
+# <------------------------------------재계산------------------------------------>
+
+def refresh(unit_pks=None):
+    """Recompute the summaries of the given units (all units when None) from their records."""
+    units = Unit.objects.all() if unit_pks is None else Unit.objects.filter(pk__in=list(unit_pks))
+    rows = (units.order_by()
+            .annotate(enrolled=Count('record'),
+                      passed=Count('record', filter=Q(record__score='P')),
+                      failed=Count('record', filter=Q(record__score='F')))
+            .values_list('pk', 'research_obj_id', 'research_obj__prof_obj_id', 'max_number',
+                         'enrolled', 'passed', 'failed'))
+    summaries = [UnitSummary(unit_obj_id=pk, research_obj_id=research_pk, prof_obj_id=prof_pk,
+                             capacity=capacity, enrolled=enrolled, passed=passed, failed=failed)
+                 for pk, research_pk, prof_pk, capacity, enrolled, passed, failed in rows]
+    with write_atomic():
+        UnitSummary.objects.filter(unit_obj__in=units).delete()
+        UnitSummary.objects.bulk_create(summaries, batch_size=500)
+    return len(summaries)
+
+
+def create_missing():
+    """Summaries for units created without signals (bulk_create)."""
+    return refresh(Unit.objects.filter(summary__isnull=True).values_list('pk', flat=True))
+
+
+# <------------------------------------대시보드------------------------------------>
+
+class ResearchTotals:
+    """Sums over the units of one research, shaped like a UnitSummary."""
+
+    graded = UnitSummary.graded
+
+    def __init__(self, research_obj):
+        self.research_obj = research_obj
+        self.units = []
+        self.enrolled = self.capacity = self.passed = self.failed = 0
+
+    def add(self, summary):
+        self.units.append(summary)
+        self.enrolled += summary.enrolled
+        self.capacity += summary.capacity
+        self.passed += summary.passed
+        self.failed += summary.failed
+
+
+def dashboard(prof_pk):
+    """The professor's researches as ResearchTotals, newest first, from one query."""
+    summaries = (UnitSummary.objects.filter(prof_obj_id=prof_pk)
+                 .select_related('unit_obj', 'research_obj')
+                 .order_by('-research_obj_id', 'unit_obj__date'))
+    researches = OrderedDict()
+    for summary in summaries:
+        if summary.research_obj_id not in researches:
+            researches[summary.research_obj_id] = ResearchTotals(summary.research_obj)
+        researches[summary.research_obj_id].add(summary)
+    return list(researches.values())
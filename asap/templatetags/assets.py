@@ -0,0 +1,22 @@
+from django import template
+from django.conf import settings
+from django.templatetags.static import static
+from django.utils.html import format_html, format_html_join
+
+from asap.assets import BUNDLES, bundle_path
+
+register = template.Library()
+
+TAGS = {
+    '.css': '<link href="{}" rel="stylesheet">',
+    '.js': '<script src="{}"></script>',
+}
+
+
+@register.simple_tag
+def asset_bundle(name):
+    """Tag for bundle ``name``, or one tag per member file when ASSET_BUNDLES is off."""
+    tag = TAGS[name[name.rindex('.'):]]
+    if settings.ASSET_BUNDLES:
+        return format_html(tag, static(bundle_path(name)))
+    return format_html_join('\n', tag, ((static(path),) for path in BUNDLES[name]))
@@ -0,0 +1,13 @@
+from django import template
+
+register = template.Library()
+
+
+@register.filter
+def nav_role(user):
+    """Which navigation variant ``user`` sees; used as a {% cache %} key."""
+    if getattr(user, 'is_student', False):
+        return 'student'
+    if getattr(user, 'is_prof', False):
+        return 'prof'
+    return 'user' if user.is_active else 'anonymous'
@@ -1,3 +1,1217 @@
-from django.test import TestCase
+import datetime
+import io
+import json
+import os
+import tempfile
+import threading
+from collections import Counter
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib import admin
+from django.core.cache import caches
+from django.core import mail as django_mail
+from django.core.mail.backends import locmem
+from django.core.management import call_command, CommandError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import IntegrityError, connection, transaction
+from django.db.migrations.recorder import MigrationRecorder
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.http import HttpResponse
+from django.urls import reverse
+
+from .models import (User, Student, Prof, Research, Unit, Record, Waitlist, UnitSummary, Preference, OutboundMail,
+                     ArchivedUnit, ArchivedRecord)
+from . import (archive, assets, enrollment, grading, live, lottery, middleware, outbox, pagination, ratelimit, search,
+               signals)
+from .admin import LargeTableAdmin
+
+
+# <------------------------------------테스트 데이터------------------------------------>
+
+START = datetime.datetime(2019, 3, 4, 9)
+
+
+def make_prof(n=0):
+    user = User.objects.create_user('prof%d@test.invalid' % n, 'pw', name='prof%d' % n, sex='M', is_prof=True)
+    return Prof.objects.create(user=user, prof_number='P%d' % n, major='psy')
+
+
+def make_students(count, start=0):
+    students = []
+    for i in range(start, start + count):
+        user = User.objects.create_user('student%d@test.invalid' % i, 'pw', name='s%d' % i, sex='F',
+                                        is_student=True)
+        students.append(Student.objects.create(user=user, student_number='S%06d' % i, major='psy'))
+    return students
+
+
+def make_research(prof, number='R1', year=2019, semester='1'):
+    return Research.objects.create(research_number=number, research_name='research ' + number,
+                                   prof_obj=prof, year=year, semester=semester)
+
+
+def make_unit(research, hours=0, period=1, max_number=20):
+    return Unit.objects.create(research_obj=research, place='room', period=period, max_number=max_number,
+                               date=START + datetime.timedelta(hours=hours))
+
+
+def clear_caches():
+    # 테스트마다 pk가 다시 쓰이므로 목록/좌석/요청 한도 캐시가 이전 테스트 값을 돌려주지 않게 비운다
+    for alias in settings.CACHES:
+        caches[alias].clear()
+
+
+def run_concurrently(func, args):
+    """Call ``func(arg)`` for every arg, each in its own thread, all released at once."""
+    results = [None] * len(args)
+    barrier = threading.Barrier(len(args))
+
+    def worker(i, arg):
+        try:
+            barrier.wait()
+            results[i] = func(arg)
+        except Exception as exc:
+            results[i] = exc
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=worker, args=(i, arg)) for i, arg in enumerate(args)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def run_on_commit():
+    """Run the on_commit callbacks TestCase would drop; Django 2.2 has no captureOnCommitCallbacks."""
+    callbacks, connection.run_on_commit = connection.run_on_commit, []
+    for _, func in callbacks:
+        func()
+
+
+# <------------------------------------동시 신청------------------------------------>
+
+class ConcurrentEnrollmentTests(TransactionTestCase):
+    """Many students hitting one small unit at once must never overbook it."""
+
+    STUDENTS = 60
+    SEATS = 10
+
+    def setUp(self):
+        self.unit = make_unit(make_research(make_prof()), max_number=self.SEATS)
+        self.students = make_students(self.STUDENTS)
+
+    def assertSeatsConsistent(self):
+        self.unit.refresh_from_db()
+        self.assertEqual(self.unit.current_number, self.SEATS)
+        self.assertEqual(Record.objects.filter(unit_obj=self.unit).count(), self.SEATS)
+
+    def test_rush_fills_exactly_and_queues_the_rest(self):
+        results = run_concurrently(lambda student: enrollment.enroll(student, self.unit.pk), self.students)
+
+        self.assertEqual(Counter(results), {enrollment.SUCCESS: self.SEATS,
+                                            enrollment.WAITLISTED: self.STUDENTS - self.SEATS})
+        self.assertSeatsConsistent()
+        self.assertEqual(Waitlist.objects.filter(unit_obj=self.unit).count(), self.STUDENTS - self.SEATS)
+
+    def test_concurrent_cancels_promote_the_head_of_the_queue(self):
+        run_concurrently(lambda student: enrollment.enroll(student, self.unit.pk), self.students)
+        queue = list(Waitlist.objects.filter(unit_obj=self.unit).values_list('student_obj_id', flat=True))
+        leaving = list(Record.objects.filter(unit_obj=self.unit).select_related('student_obj')[:5])
+
+        results = run_concurrently(lambda record: enrollment.cancel(record.student_obj, record.pk), leaving)
+
+        self.assertEqual(results, [enrollment.SUCCESS] * len(leaving))
+        self.assertSeatsConsistent()
+        enrolled = set(Record.objects.filter(unit_obj=self.unit).values_list('student_obj_id', flat=True))
+        self.assertTrue(set(queue[:len(leaving)]) <= enrolled)
+        self.assertEqual(list(Waitlist.objects.filter(unit_obj=self.unit).values_list('student_obj_id', flat=True)),
+                         queue[len(leaving):])
+
+
+# <------------------------------------대기열------------------------------------>
+
+class WaitlistTests(TestCase):
+
+    def setUp(self):
+        clear_caches()
+        self.prof = make_prof()
+        self.unit = make_unit(make_research(self.prof), max_number=1)
+        self.holder, self.first, self.second = make_students(3)
+        enrollment.enroll(self.holder, self.unit.pk)
+
+    def queue(self):
+        return list(Waitlist.objects.filter(unit_obj=self.unit).values_list('student_obj_id', flat=True))
+
+    def enrolled(self, student):
+        return Record.objects.filter(unit_obj=self.unit, student_obj=student).exists()
+
+    def test_full_unit_queues_in_arrival_order(self):
+        self.assertEqual(enrollment.enroll(self.first, self.unit.pk), enrollment.WAITLISTED)
+        self.assertEqual(enrollment.enroll(self.second, self.unit.pk), enrollment.WAITLISTED)
+        self.assertEqual(enrollment.enroll(self.first, self.unit.pk), enrollment.ALREADY_WAITLISTED)
+        self.assertEqual(self.queue(), [self.first.pk, self.second.pk])
+
+    def test_cancel_promotes_the_head_of_the_queue(self):
+        enrollment.enroll(self.first, self.unit.pk)
+        enrollment.enroll(self.second, self.unit.pk)
+        record = Record.objects.get(unit_obj=self.unit, student_obj=self.holder)
+
+        self.assertEqual(enrollment.cancel(self.holder, record.pk), enrollment.SUCCESS)
+
+        self.assertTrue(self.enrolled(self.first))
+        self.assertFalse(self.enrolled(self.second))
+        self.assertEqual(self.queue(), [self.second.pk])
+        self.unit.refresh_from_db()
+        self.assertEqual(self.unit.current_number, 1)
+
+    def test_raising_capacity_in_modify_unit_promotes_the_queue(self):
+        enrollment.enroll(self.first, self.unit.pk)
+        enrollment.enroll(self.second, self.unit.pk)
+        self.client.force_login(self.prof.user)
+
+        response = self.client.post(reverse('modify_unit', args=[self.unit.research_obj_id, self.unit.pk]), {
+            'place': 'room', 'date': START.strftime('%Y-%m-%d %H:%M:%S'), 'period': 1, 'max_number': 3, 'remark': '-'})
+
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(self.enrolled(self.first))
+        self.assertTrue(self.enrolled(self.second))
+        self.assertEqual(self.queue(), [])
+        self.unit.refresh_from_db()
+        self.assertEqual((self.unit.current_number, self.unit.max_number), (3, 3))
+
+    def test_seat_freed_while_joining_the_queue_goes_to_the_joiner(self):
+        reserve = enrollment._reserve
+        record = Record.objects.get(unit_obj=self.unit, student_obj=self.holder)
+        calls = []
+
+        def full_then_freed(student_pk, unit_pk):
+            calls.append(student_pk)
+            taken = reserve(student_pk, unit_pk)
+            if len(calls) == 1:  # 자리가 없다고 확인한 직후 다른 학생이 취소한다
+                enrollment.cancel(self.holder, record.pk)
+            return taken
+
+        with mock.patch.object(enrollment, '_reserve', side_effect=full_then_freed):
+            result = enrollment.enroll(self.first, self.unit.pk)
+
+        self.assertEqual(result, enrollment.SUCCESS)
+        self.assertTrue(self.enrolled(self.first))
+        self.assertEqual(self.queue(), [])
+        self.unit.refresh_from_db()
+        self.assertEqual(self.unit.current_number, 1)
+
+    def test_waitlist_position_json(self):
+        enrollment.enroll(self.first, self.unit.pk)
+        enrollment.enroll(self.second, self.unit.pk)
+        url = reverse('waitlist_position', args=[self.unit.pk])
+
+        self.client.force_login(self.second.user)
+        self.assertEqual(self.client.get(url).json(),
+                         {'unit': self.unit.pk, 'waiting': True, 'position': 2, 'enrolled': False})
+        enrollment.leave_waitlist(self.first, self.unit.pk)
+        self.assertEqual(self.client.get(url).json()['position'], 1)
+
+        self.client.force_login(self.holder.user)
+        self.assertEqual(self.client.get(url).json(),
+                         {'unit': self.unit.pk, 'waiting': False, 'position': None, 'enrolled': True})
+
+
+# <------------------------------------시간 중복------------------------------------>
+
+class ScheduleConflictTests(TestCase):
+    """has_conflict (one query) and conflicting_unit_pks (bisection) must agree at the edges."""
+
+    def setUp(self):
+        self.research = make_research(make_prof())
+        self.student, = make_students(1)
+        self.enrolled = make_unit(self.research, hours=0, period=3)  # 9시-12시
+        Record.objects.create(student_obj=self.student, unit_obj=self.enrolled)
+
+    def assertConflict(self, unit, expected):
+        records = Record.objects.filter(student_obj=self.student).select_related('unit_obj')
+        self.assertEqual(enrollment.has_conflict(self.student.pk, unit.pk), expected)
+        self.assertEqual(unit.pk in enrollment.conflicting_unit_pks([unit], records), expected)
+
+    def test_touching_sessions_do_not_conflict(self):
+        self.assertConflict(make_unit(self.research, hours=-1, period=1), False)
+        self.assertConflict(make_unit(self.research, hours=3, period=1), False)
+
+    def test_overlap_and_containment_conflict(self):
+        self.assertConflict(make_unit(self.research, hours=2, period=2), True)
+        self.assertConflict(make_unit(self.research, hours=1, period=1), True)
+        self.assertConflict(make_unit(self.research, hours=-1, period=5), True)
+
+    def test_enrolled_unit_does_not_conflict_with_itself(self):
+        self.assertConflict(self.enrolled, False)
+
+    def test_update_fields_recomputes_end_date(self):
+        moved = make_unit(self.research, hours=4, period=1)
+        self.assertConflict(moved, False)
+        moved.date = START + datetime.timedelta(hours=2)
+        moved.save(update_fields=['date'])
+        moved.refresh_from_db()
+        self.assertEqual(moved.end_date, START + datetime.timedelta(hours=3))
+        self.assertConflict(moved, True)
+
+        longer = make_unit(self.research, hours=-2, period=1)
+        longer.period = 2
+        longer.save(update_fields=['period'])
+        self.assertConflict(longer, False)
+        longer.period = 3
+        longer.save(update_fields=['period'])
+        longer.refresh_from_db()
+        self.assertEqual(longer.end_date, START + datetime.timedelta(hours=1))
+        self.assertConflict(longer, True)
+
+
+# <------------------------------------성적 입력------------------------------------>
+
+class GradingTests(TestCase):
+
+    def setUp(self):
+        self.prof = make_prof()
+        self.unit = make_unit(make_research(self.prof))
+        self.students = make_students(3)
+        self.records = [Record.objects.create(student_obj=student, unit_obj=self.unit) for student in self.students]
+        self.client.force_login(self.prof.user)
+
+    def scores(self):
+        return list(Record.objects.filter(unit_obj=self.unit).order_by('pk').values_list('score', 'total'))
+
+    def post_scores(self, rows):
+        data = {'form-TOTAL_FORMS': len(rows), 'form-INITIAL_FORMS': len(rows),
+                'form-MIN_NUM_FORMS': 0, 'form-MAX_NUM_FORMS': 1000}
+        for i, (pk, score, total) in enumerate(rows):
+            data.update({'form-%d-id' % i: pk, 'form-%d-score' % i: score, 'form-%d-total' % i: total})
+        return self.client.post(reverse('manage_unit', args=[self.unit.pk]), data)
+
+    def test_score_formset_saves_the_roster(self):
+        response = self.post_scores([(record.pk, 'P', 10) for record in self.records])
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(self.scores(), [('P', 10)] * 3)
+
+    def test_score_formset_rejects_records_of_other_units(self):
+        other = make_unit(make_research(self.prof, 'R2'), hours=5)
+        stranger = Record.objects.create(student_obj=self.students[0], unit_obj=other)
+
+        response = self.post_scores([(self.records[0].pk, 'P', 10), (stranger.pk, 'P', 10)])
+
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.context['form'].is_valid())
+        self.assertEqual(self.scores(), [(None, None)] * 3)
+        self.assertIsNone(Record.objects.get(pk=stranger.pk).score)
+
+    def test_one_bad_upload_row_rejects_the_whole_file(self):
+        rows = ['student_number,score,total'] + ['%s,P,10' % s.student_number for s in self.students]
+        upload = SimpleUploadedFile('grades.csv', '\n'.join(rows[:3] + ['S999999,P,10'] + rows[3:]).encode())
+
+        response = self.client.post(reverse('upload_grades', args=[self.unit.pk]), {'grades': upload}, follow=True)
+
+        self.assertEqual(self.scores(), [(None, None)] * 3)
+        self.assertIn('3행', [str(message) for message in response.context['messages']][0])
+
+        upload = SimpleUploadedFile('grades.csv', '\n'.join(rows).encode())
+        self.client.post(reverse('upload_grades', args=[self.unit.pk]), {'grades': upload})
+        self.assertEqual(self.scores(), [('P', 10)] * 3)
+
+
+# <------------------------------------기록 내보내기------------------------------------>
+
+class SemesterExportTests(TestCase):
+
+    def setUp(self):
+        prof = make_prof()
+        self.student = make_students(1)[0]
+        for year, semester in ((2019, '1'), (2018, '2')):
+            unit = make_unit(make_research(prof, 'R%d%s' % (year, semester), year, semester))
+            Record.objects.create(student_obj=self.student, unit_obj=unit)
+        self.client.force_login(User.objects.create_superuser('staff@test.invalid', 'pw', name='staff', sex='M'))
+
+    def export(self, query=''):
+        return self.client.get(reverse('export_semester') + query)
+
+    def test_streams_the_chosen_semester(self):
+        response = self.export('?year=2018&semester=2')
+        self.assertEqual(response.status_code, 200)
+        rows = b''.join(response.streaming_content).decode('utf-8-sig').splitlines()
+        self.assertEqual(len(rows), 2)
+        self.assertTrue(rows[1].startswith('2018,2,R20182,'))
+        self.assertEqual(len(b''.join(self.export().streaming_content).decode('utf-8-sig').splitlines()), 3)
+
+    def test_bad_year_or_semester_is_a_400(self):
+        for query in ('?year=abc', '?year=2019&semester=3', '?semester=spring'):
+            response = self.export(query)
+            self.assertEqual(response.status_code, 400, query)
+            self.assertFalse(response.streaming)
+
+    def test_staff_only(self):
+        self.client.force_login(self.student.user)
+        self.assertEqual(self.export().status_code, 302)
+
+
+# <------------------------------------메일 발송------------------------------------>
+
+class FailingEmailBackend(locmem.EmailBackend):
+
+    def send_messages(self, messages):
+        raise ConnectionRefusedError('SMTP server is down')
+
+
+class OutboxTests(TestCase):
+
+    def test_queued_mail_is_sent_once_by_the_worker(self):
+        mail = outbox.queue_mail('Subject', 'Body', ['a@test.invalid', 'b@test.invalid'])
+        self.assertEqual(mail.to, 'a@test.invalid,b@test.invalid')
+        self.assertEqual(django_mail.outbox, [])
+
+        self.assertEqual(outbox.send_pending(), 1)
+        self.assertEqual([message.to for message in django_mail.outbox], [['a@test.invalid', 'b@test.invalid']])
+        mail.refresh_from_db()
+        self.assertIsNotNone(mail.sent_date)
+        self.assertEqual(mail.attempts, 0)
+
+        self.assertEqual(outbox.send_pending(), 0)
+        self.assertEqual(len(django_mail.outbox), 1)
+
+    def test_claimed_mail_is_leased_to_one_worker(self):
+        for i in range(3):
+            outbox.queue_mail('Subject %d' % i, 'Body', ['a@test.invalid'])
+        # 다른 워커가 같은 후보를 읽은 뒤 먼저 가져간 상황
+        stale = list(OutboundMail.objects.order_by('pk'))
+        self.assertEqual(len(outbox._claim(2)), 2)
+
+        self.assertEqual([mail.subject for mail in outbox._claim(10)], ['Subject 2'])
+        self.assertEqual(outbox._claim(10), [])
+        for mail in stale:
+            self.assertFalse(OutboundMail.objects.filter(pk=mail.pk, next_attempt=mail.next_attempt)
+                             .update(next_attempt=mail.next_attempt))
+
+    @override_settings(EMAIL_BACKEND='asap.tests.FailingEmailBackend')
+    def test_failures_back_off_exponentially_up_to_the_cap(self):
+        mail = outbox.queue_mail('Subject', 'Body', ['a@test.invalid'])
+        now = mail.next_attempt
+        with mock.patch.object(outbox.timezone, 'now', lambda: now):
+            for attempt in range(1, outbox.MAX_ATTEMPTS + 1):
+                self.assertEqual(outbox.send_pending(), 1)
+                mail.refresh_from_db()
+                self.assertEqual(mail.attempts, attempt)
+                self.assertEqual(mail.next_attempt - now,
+                                 datetime.timedelta(seconds=outbox.BACKOFF_SECONDS * 2 ** (attempt - 1)))
+                self.assertIn('SMTP server is down', mail.last_error)
+                # 재시도 시각 직전에는 가져가지 않는다
+                now = mail.next_attempt - datetime.timedelta(seconds=1)
+                self.assertEqual(outbox.send_pending(), 0)
+                now = mail.next_attempt
+            self.assertEqual(outbox.send_pending(), 0)
+        mail.refresh_from_db()
+        self.assertEqual(mail.attempts, outbox.MAX_ATTEMPTS)
+        self.assertIsNone(mail.sent_date)
+
+
+class ConcurrentOutboxTests(TransactionTestCase):
+
+    def test_workers_never_send_a_mail_twice(self):
+        for i in range(40):
+            outbox.queue_mail('Subject %d' % i, 'Body', ['a@test.invalid'])
+
+        taken = run_concurrently(lambda _: outbox.send_all(batch_size=5), range(4))
+
+        self.assertEqual(sum(taken), 40)
+        self.assertEqual(Counter(message.subject for message in django_mail.outbox),
+                         {'Subject %d' % i: 1 for i in range(40)})
+        self.assertFalse(OutboundMail.objects.filter(sent_date=None).exists())
+
+
+# <------------------------------------페이지별 쿼리 수------------------------------------>
+
+class StudentPageQueryCountTests(TestCase):
+    """The enroll page and my research page cost the same number of queries at any size."""
+
+    def setUp(self):
+        self.prof = make_prof()
+        self.student, self.other = make_students(2)
+        self.units = 0
+
+    def add_units(self, count):
+        # 세 개마다 하나는 신청, 하나는 다른 학생이 채워 대기, 하나는 비워 둔다
+        for i in range(self.units, self.units + count):
+            unit = make_unit(make_research(self.prof, 'R%d' % i), hours=2 * i, max_number=1)
+            if i % 3 == 0:
+                enrollment.enroll(self.student, unit.pk)
+            elif i % 3 == 1:
+                enrollment.enroll(self.other, unit.pk)
+                enrollment.enroll(self.student, unit.pk)
+        self.units += count
+
+    def count_queries(self, url_name):
+        self.client.force_login(self.student.user)
+        self.client.get(reverse(url_name))  # 로그인 직후 첫 요청의 세션 저장은 세지 않는다
+        clear_caches()  # 캐시가 비어 있을 때가 쿼리가 가장 많다
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse(url_name))
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def assertConstantQueries(self, url_name):
+        self.add_units(6)
+        small = self.count_queries(url_name)
+        self.add_units(12)
+        self.assertEqual(self.count_queries(url_name), small)
+
+    def test_enroll_page(self):
+        self.assertConstantQueries('enroll_page')
+
+    def test_my_research_student(self):
+        self.assertConstantQueries('my_research_student')
+
+
+# <------------------------------------실험 목록/API------------------------------------>
+
+class CatalogueListingTests(TestCase):
+    """Listings page through the database; old semesters do not make a page dearer."""
+
+    def setUp(self):
+        self.prof = make_prof()
+        self.research = make_research(self.prof, 'NOW')
+        self.units = [make_unit(self.research, hours=i) for i in range(3)]
+        make_unit(make_research(self.prof, 'OTHER'), hours=5)
+
+    def count_queries(self, url):
+        clear_caches()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_history_does_not_change_query_counts(self):
+        urls = [reverse('all_research'), reverse('api_researches'), reverse('api_units')]
+        before = [self.count_queries(url) for url in urls]
+        for year in range(2010, 2015):
+            for semester in '12':
+                make_unit(make_research(self.prof, 'H%d%s' % (year, semester), year, semester))
+        self.assertEqual([self.count_queries(url) for url in urls], before)
+
+    def test_api_units_filters_by_research_and_pages(self):
+        url = reverse('api_units') + '?research=%d&size=2' % self.research.pk
+        page = self.client.get(url).json()
+        self.assertEqual([unit['id'] for unit in page['results']], [unit.pk for unit in self.units[:2]])
+        rest = self.client.get(url + '&after=%d' % page['next']).json()
+        self.assertEqual([unit['id'] for unit in rest['results']], [self.units[2].pk])
+        self.assertIsNone(rest['next'])
+
+    def test_listings_default_to_the_current_semester(self):
+        old_unit = make_unit(make_research(self.prof, 'OLD', 2018, '2'))
+        old = old_unit.research_obj
+
+        def ids(name, query=''):
+            return [obj['id'] for obj in self.client.get(reverse(name) + query).json()['results']]
+
+        self.assertNotIn(old.pk, ids('api_researches'))
+        self.assertNotIn(old_unit.pk, ids('api_units'))
+        self.assertEqual(ids('api_researches', '?year=2018&semester=2'), [old.pk])
+        self.assertEqual(ids('api_units', '?year=2018&semester=2'), [old_unit.pk])
+        self.assertEqual(self.client.get(reverse('api_units') + '?year=2018').status_code, 400)
+
+        listed = self.client.get(reverse('all_research')).context['all_researches']
+        self.assertNotIn(old, listed)
+        self.assertEqual(self.client.get(reverse('all_research') + '?year=2018&semester=2').context['all_researches'],
+                         [old])
+
+
+class JsonApiTests(TestCase):
+
+    def setUp(self):
+        clear_caches()
+        self.prof = make_prof()
+        self.research = make_research(self.prof)
+        self.unit = make_unit(self.research, max_number=2)
+        self.student = make_students(1)[0]
+
+    def test_matching_etag_answers_304_without_building_the_listing(self):
+        url = reverse('api_researches')
+        response = self.client.get(url)
+        etag = response['ETag']
+        self.assertEqual(response.status_code, 200)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+        self.assertEqual(response['ETag'], etag)
+        self.assertFalse([query for query in queries if 'asap_research' in query['sql']])
+
+        self.research.research_name = 'Renamed'
+        self.research.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.json()['results'][0]['research_name'], 'Renamed')
+
+    def test_seat_changes_change_the_units_etag(self):
+        url = reverse('api_units')
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        enrollment.enroll(self.student, self.unit.pk)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'][0]['current_number'], 1)
+
+    def test_fields_limit_the_keys(self):
+        results = self.client.get(reverse('api_researches') + '?fields=id,research_name').json()['results']
+        self.assertEqual(results, [{'id': self.research.pk, 'research_name': self.research.research_name}])
+
+        detail = self.client.get(reverse('api_research', args=[self.research.pk])
+                                 + '?fields=id&unit_fields=id,max_number').json()
+        self.assertEqual(detail, {'id': self.research.pk, 'units': [{'id': self.unit.pk, 'max_number': 2}]})
+
+    def test_unknown_field_is_a_400(self):
+        urls = [reverse('api_researches') + '?fields=id,password',
+                reverse('api_units') + '?fields=password',
+                reverse('api_research', args=[self.research.pk]) + '?fields=id,password',
+                reverse('api_research', args=[self.research.pk]) + '?unit_fields=password']
+        for url in urls:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 400, url)
+            self.assertIn('password', response.json()['error'])
+
+        self.client.force_login(self.student.user)
+        response = self.client.get(reverse('api_my_records') + '?fields=password')
+        self.assertEqual(response.status_code, 400)
+
+    def test_my_records_are_for_students_only(self):
+        url = reverse('api_my_records')
+        self.assertEqual(self.client.get(url).status_code, 403)
+        self.client.force_login(self.prof.user)
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+        other = make_students(1, start=1)[0]
+        enrollment.enroll(self.student, self.unit.pk)
+        enrollment.enroll(other, self.unit.pk)
+        self.client.force_login(self.student.user)
+        response = self.client.get(url + '?fields=unit,research_number')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'], [{'unit': self.unit.pk, 'research_number': 'R1'}])
+
+
+# <------------------------------------정적 파일------------------------------------>
+
+class ServeStaticTests(TestCase):
+
+    def setUp(self):
+        self.app = lambda environ, start_response: []
+
+    def test_source_tree_is_not_served(self):
+        with override_settings(SERVE_STATIC=True, STATIC_ROOT=os.path.join(settings.BASE_DIR, 'static')):
+            self.assertIs(assets.serve_static(self.app), self.app)
+
+    def test_collectstatic_output_is_served(self):
+        with tempfile.TemporaryDirectory() as root:
+            with open(os.path.join(root, 'staticfiles.json'), 'w') as f:
+                f.write('{"paths": {}}')
+            with override_settings(SERVE_STATIC=True, STATIC_ROOT=root):
+                self.assertIsInstance(assets.serve_static(self.app), assets.StaticFilesApplication)
+
+
+# <------------------------------------요청 한도------------------------------------>
+
+@override_settings(RATE_LIMITS={'enroll_page': (2, 0.5)})
+class RateLimitTests(TestCase):
+
+    def setUp(self):
+        clear_caches()
+        self.url = reverse('enroll_page')
+
+    def get(self, addr='10.0.0.1'):
+        return self.client.get(self.url, REMOTE_ADDR=addr)
+
+    def test_over_the_burst_is_429_without_queries(self):
+        self.client.force_login(make_students(1)[0].user)
+        self.assertEqual([self.get().status_code for _ in range(2)], [200, 200])
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.get()
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '2')  # 토큰 하나가 다시 차는 데 2초
+        self.assertEqual(len(queries), 0)
+        self.assertEqual(ratelimit.rejected_counts()['enroll_page'], 1)
+
+    def test_anonymous_clients_are_keyed_by_address(self):
+        self.assertNotIn(429, [self.get().status_code for _ in range(2)])
+        self.assertEqual(self.get().status_code, 429)
+        self.assertNotEqual(self.get('10.0.0.2').status_code, 429)
+        # 같은 주소라도 로그인한 사용자는 자기 버킷을 쓴다
+        self.client.force_login(make_students(1)[0].user)
+        self.assertEqual(self.get().status_code, 200)
+
+
+# <------------------------------------실시간 좌석 현황------------------------------------>
+
+class LiveSeatsTests(TestCase):
+
+    def test_slow_watcher_keeps_the_latest_value_of_every_unit(self):
+        from proj.asgi import Watcher
+
+        watcher = Watcher({1, 2})
+        for tick in range(100):  # 보내지 못한 틱이 쌓여도 유닛마다 마지막 값만 남는다
+            watcher.push({1: {'current': tick, 'max': 100}, 3: {'current': tick, 'max': 100}})
+        watcher.push({2: {'current': 1, 'max': 5}})
+
+        self.assertTrue(watcher.ready.is_set())
+        self.assertEqual(watcher.take(), {1: {'current': 99, 'max': 100}, 2: {'current': 1, 'max': 5}})
+        self.assertFalse(watcher.ready.is_set())
+        watcher.push({3: {'current': 0, 'max': 1}})
+        self.assertFalse(watcher.ready.is_set())
+
+
+class SeatAnnouncementTests(TransactionTestCase):
+    """Seat changes are published once, after commit, so watchers read the new counts."""
+
+    def setUp(self):
+        clear_caches()
+        self.unit = make_unit(make_research(make_prof()), max_number=20)
+        self.student = make_students(1)[0]
+        self.published = []
+        patcher = mock.patch.object(live, 'seats_changed', side_effect=self.publish)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def publish(self, unit_pk):
+        # 구독자처럼 알림을 받은 시점에 DB에서 좌석 수를 읽는다
+        seats = Unit.objects.values_list('current_number', 'max_number').get(pk=unit_pk)
+        self.published.append((unit_pk, seats))
+
+    def test_unit_change_is_announced_once_after_commit(self):
+        with transaction.atomic():
+            self.unit.max_number = 30
+            self.unit.save()
+            self.assertEqual(self.published, [])
+        self.assertEqual(self.published, [(self.unit.pk, (0, 30))])
+
+    def test_enrollment_and_cancel_are_announced_once_after_commit(self):
+        self.assertEqual(enrollment.enroll(self.student, self.unit.pk), enrollment.SUCCESS)
+        self.assertEqual(self.published, [(self.unit.pk, (1, 20))])
+
+        record = Record.objects.get(student_obj=self.student)
+        self.assertEqual(enrollment.cancel(self.student, record.pk), enrollment.SUCCESS)
+        self.assertEqual(self.published, [(self.unit.pk, (1, 20)), (self.unit.pk, (0, 20))])
+
+    def test_rolled_back_change_is_not_announced(self):
+        try:
+            with transaction.atomic():
+                self.unit.max_number = 30
+                self.unit.save()
+                raise IntegrityError
+        except IntegrityError:
+            pass
+        self.assertEqual(self.published, [])
+
+
+# <------------------------------------지난 학기 보관------------------------------------>
+
+class ArchiveTests(TestCase):
+
+    def setUp(self):
+        clear_caches()
+        self.prof = make_prof()
+        self.old = make_research(self.prof, 'OLD', 2018, '2')
+        self.current = make_unit(make_research(self.prof, 'NOW'), hours=10)
+        self.units = [make_unit(self.old, hours=0, max_number=1), make_unit(self.old, hours=5)]
+        self.students = make_students(2)
+        for student in self.students:
+            enrollment.enroll(student, self.units[0].pk)  # 한 명은 신청, 한 명은 대기
+        enrollment.enroll(self.students[0], self.current.pk)
+        Record.objects.filter(unit_obj=self.units[0]).update(score='P', total=10)
+
+    def test_copies_the_semester_then_deletes_it(self):
+        counts = archive.archive_semester(2018, '2')
+
+        self.assertEqual(counts, {'units': 2, 'records': 1})
+        archived = ArchivedUnit.objects.get(pk=self.units[0].pk)
+        self.assertEqual((archived.research_id, archived.research_number, archived.year, archived.semester,
+                          archived.date, archived.end_date, archived.current_number, archived.max_number),
+                         (self.old.pk, 'OLD', 2018, '2', self.units[0].date, self.units[0].end_date, 1, 1))
+        self.assertEqual(list(ArchivedRecord.objects.values_list('unit_obj_id', 'student_number', 'score', 'total')),
+                         [(self.units[0].pk, self.students[0].student_number, 'P', 10)])
+
+        old_pks = [unit.pk for unit in self.units]
+        self.assertFalse(Unit.objects.filter(pk__in=old_pks).exists())
+        self.assertFalse(Record.objects.filter(unit_obj_id__in=old_pks).exists())
+        self.assertFalse(Waitlist.objects.filter(unit_obj_id__in=old_pks).exists())
+        self.assertFalse(UnitSummary.objects.filter(unit_obj_id__in=old_pks).exists())
+        self.assertTrue(Research.objects.filter(pk=self.old.pk).exists())
+        self.assertTrue(Record.objects.filter(unit_obj=self.current).exists())
+        self.assertTrue(UnitSummary.objects.filter(unit_obj=self.current).exists())
+
+    def test_rerun_replaces_an_interrupted_copy(self):
+        archive._copy([unit.pk for unit in self.units])  # 복사만 끝나고 삭제 전에 멈춘 상태
+
+        self.assertEqual(archive.archive_semester(2018, '2'), {'units': 2, 'records': 1})
+        self.assertEqual(ArchivedUnit.objects.count(), 2)
+        self.assertEqual(ArchivedRecord.objects.count(), 1)
+        self.assertEqual(archive.archive_semester(2018, '2'), {'units': 0, 'records': 0})
+        self.assertEqual(ArchivedUnit.objects.count(), 2)
+
+    def test_current_semester_needs_force(self):
+        with self.assertRaises(CommandError):
+            call_command('archive_semester', '2019', '1', stdout=io.StringIO())
+        self.assertTrue(Unit.objects.filter(pk=self.current.pk).exists())
+
+        call_command('archive_semester', '2019', '1', '--force', stdout=io.StringIO())
+        self.assertFalse(Unit.objects.filter(pk=self.current.pk).exists())
+        self.assertTrue(ArchivedUnit.objects.filter(pk=self.current.pk).exists())
+
+    def test_archived_research_is_still_readable(self):
+        archive.archive_semester(2018, '2')
+        clear_caches()
+
+        response = self.client.get(reverse('research_info', args=[self.old.pk]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([unit.pk for unit in response.context['unit_list']], [unit.pk for unit in self.units])
+
+        units = self.client.get(reverse('api_research', args=[self.old.pk])).json()['units']
+        self.assertEqual([(unit['id'], unit['research'], unit['current_number']) for unit in units],
+                         [(self.units[0].pk, self.old.pk, 1), (self.units[1].pk, self.old.pk, 0)])
+
+
+# <------------------------------------교강사 대시보드------------------------------------>
+
+class DashboardSummaryTests(TestCase):
+    """UnitSummary follows the records, and the dashboard reads it in one query."""
+
+    def setUp(self):
+        clear_caches()
+        self.prof = make_prof()
+        self.research = make_research(self.prof)
+
+    def assertSummariesMatchRecords(self):
+        for unit in Unit.objects.all():
+            records = Record.objects.filter(unit_obj=unit)
+            summary = UnitSummary.objects.get(unit_obj=unit)
+            self.assertEqual((summary.enrolled, summary.capacity, summary.passed, summary.failed),
+                             (records.count(), unit.max_number, records.filter(score='P').count(),
+                              records.filter(score='F').count()), unit)
+
+    def test_enroll_cancel_promotion_and_grading_keep_summaries_exact(self):
+        unit = make_unit(self.research, max_number=2)
+        other = make_unit(self.research, hours=5)
+        students = make_students(4)
+        for student in students:
+            enrollment.enroll(student, unit.pk)
+        enrollment.enroll(students[0], other.pk)
+        self.assertSummariesMatchRecords()
+
+        record = Record.objects.get(unit_obj=unit, student_obj=students[0])
+        enrollment.cancel(students[0], record.pk)  # 대기 1번이 올라온다
+        self.assertSummariesMatchRecords()
+
+        records = list(Record.objects.filter(unit_obj=unit))
+        records[0].score, records[1].score = 'P', 'F'
+        grading.apply_grades(records)
+        self.assertSummariesMatchRecords()
+
+        graded = Record.objects.get(pk=records[0].pk)
+        enrollment.cancel(graded.student_obj, graded.pk)
+        unit.refresh_from_db()
+        unit.max_number = 5
+        unit.save()
+        self.assertSummariesMatchRecords()
+
+    def count_queries(self):
+        clear_caches()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('prof_dashboard'))
+        self.assertEqual(response.status_code, 200)
+        return [query['sql'] for query in queries]
+
+    def test_dashboard_reads_summaries_in_one_query(self):
+        self.client.force_login(self.prof.user)
+        make_unit(self.research)
+        self.client.get(reverse('prof_dashboard'))  # 로그인 직후 첫 요청의 세션 저장은 세지 않는다
+        small = self.count_queries()
+        for i in range(3):
+            research = make_research(self.prof, 'R%d' % (i + 2))
+            for hours in range(3):
+                make_unit(research, hours=hours)
+        large = self.count_queries()
+
+        self.assertEqual(len(large), len(small))
+        self.assertEqual(len([sql for sql in large if 'asap_unitsummary' in sql]), 1)
+
+
+# <------------------------------------실험 검색------------------------------------>
+
+class ResearchSearchTests(TestCase):
+
+    def setUp(self):
+        clear_caches()
+        self.prof = make_prof()
+        self.count = 0
+
+    def add(self, name):
+        self.count += 1
+        return Research.objects.create(research_number='S%d' % self.count, research_name=name, prof_obj=self.prof,
+                                       year=2019, semester='1')
+
+    def found(self, q, q_option=None):
+        return set(search.search_research(q, q_option).values_list('research_name', flat=True))
+
+    def test_index_and_fallback_match_the_same_words(self):
+        self.assertTrue(search.index_available())
+        for name in ['Working memory test', 'Memory span', 'Test anxiety', 'Factory work']:
+            self.add(name)
+        queries = ['memory test', 'mem', 'TEST', 'ory', 'span memory', 'work']
+        indexed = [self.found(q) for q in queries]
+        self.assertEqual(indexed, [{'Working memory test'}, {'Working memory test', 'Memory span'},
+                                   {'Working memory test', 'Test anxiety'}, set(), {'Memory span'},
+                                   {'Working memory test', 'Factory work'}])
+        with mock.patch.object(search, 'index_available', return_value=False):
+            self.assertEqual([self.found(q) for q in queries], indexed)
+
+    def test_index_follows_saves_deletes_and_professor_renames(self):
+        research = self.add('Visual attention')
+        self.assertEqual(self.found('visual'), {'Visual attention'})
+
+        research.research_name = 'Auditory attention'
+        research.save()
+        self.assertEqual(self.found('visual'), set())
+        self.assertEqual(self.found('auditory'), {'Auditory attention'})
+
+        self.prof.user.name = 'Kim Minsu'
+        self.prof.user.save()
+        self.assertEqual(self.found('minsu', 'prof'), {'Auditory attention'})
+        self.assertEqual(self.found('prof0', 'prof'), set())
+
+        research.delete()
+        self.assertEqual(self.found('auditory'), set())
+
+    def test_rebuild_command_restores_the_index(self):
+        self.add('Visual attention')
+        with connection.cursor() as cursor:
+            cursor.execute('DELETE FROM %s' % search.INDEX_TABLE)
+        self.assertEqual(self.found('visual'), set())
+
+        call_command('rebuild_search_index', stdout=io.StringIO())
+        self.assertEqual(self.found('visual'), {'Visual attention'})
+
+    def test_migrating_another_database_leaves_the_index_alone(self):
+        with mock.patch.object(search, 'create_index') as create_index:
+            signals.create_search_index(sender=None, using='archive')
+            create_index.assert_not_called()
+            signals.create_search_index(sender=None, using='default')
+            create_index.assert_called_once_with()
+
+    def test_unknown_option_searches_the_research_name(self):
+        self.add('Visual attention')
+        self.assertEqual(self.found('visual', 'prof_obj__user__password'), {'Visual attention'})
+        self.assertEqual(self.found('prof0', 'description'), set())
+
+    def test_results_page_by_primary_key(self):
+        pks = [self.add('Paging study %d' % i).pk for i in range(25)]
+        self.add('Other')
+        url = reverse('all_research') + '?q=paging&q_option=research_name'
+
+        first = self.client.get(url).context
+        self.assertEqual([research.pk for research in first['all_researches']], pks[:20])
+        rest = self.client.get(url + '&after=%d' % first['next_cursor']).context
+        self.assertEqual([research.pk for research in rest['all_researches']], pks[20:])
+        self.assertIsNone(rest['next_cursor'])
+
+
+# <------------------------------------학기 일괄 등록------------------------------------>
+
+class SemesterImportTests(TestCase):
+
+    RESEARCH = {'research_number': 'R1', 'research_name': 'Visual attention', 'prof_number': 'P0',
+                'year': '2019', 'semester': '1', 'description': ''}
+
+    def setUp(self):
+        clear_caches()
+        make_prof()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def unit(self, hours, max_number='10'):
+        return {'research_number': 'R1', 'year': '2019', 'semester': '1', 'place': 'room',
+                'date': (START + datetime.timedelta(hours=hours)).strftime('%Y-%m-%d %H:%M'),
+                'period': '1', 'max_number': max_number, 'remark': ''}
+
+    def student(self, n):
+        return {'email': 'new%d@test.invalid' % n, 'name': 'n%d' % n, 'sex': 'F',
+                'student_number': 'N%d' % n, 'major': 'psy'}
+
+    def write(self, name, content):
+        path = os.path.join(self.tmp.name, name)
+        with open(path, 'w', encoding='utf-8') as fileobj:
+            fileobj.write(content)
+        return path
+
+    def write_bundle(self, units):
+        return self.write('bundle.json', json.dumps({
+            'researches': [self.RESEARCH], 'units': units, 'students': [self.student(1), self.student(2)]}))
+
+    def test_bundle_imports_summaries_and_search_index(self):
+        out = io.StringIO()
+        call_command('import_semester', self.write_bundle([self.unit(0), self.unit(2, '5')]), stdout=out)
+        self.assertIn('Unit: 2', out.getvalue())
+
+        research = Research.objects.get(research_number='R1')
+        self.assertEqual(research.prof_obj.prof_number, 'P0')
+        units = Unit.objects.filter(research_obj=research).order_by('date')
+        self.assertEqual([unit.end_date - unit.date for unit in units], [Unit.PERIOD_LENGTH] * 2)
+        self.assertEqual(list(UnitSummary.objects.order_by('unit_obj__date').values_list('unit_obj', 'capacity',
+                                                                                          'enrolled')),
+                         [(units[0].pk, 10, 0), (units[1].pk, 5, 0)])
+        student = Student.objects.select_related('user').get(student_number='N1')
+        self.assertTrue(student.user.is_student)
+        self.assertFalse(student.user.has_usable_password())
+
+        # bulk_create는 signal을 보내지 않으므로 검색 색인은 commit 뒤에 통째로 다시 만든다
+        self.assertFalse(search.search_research('visual').exists())
+        run_on_commit()
+        self.assertEqual(list(search.search_research('visual')), [research])
+
+    def test_one_bad_row_rolls_back_everything(self):
+        err = io.StringIO()
+        path = self.write_bundle([self.unit(0), self.unit(2, 'many'), self.unit(4)])
+        with self.assertRaisesMessage(CommandError, '1 rows have errors'):
+            call_command('import_semester', path, stderr=err)
+        self.assertIn('unit 2행: max_number', err.getvalue())
+        self.assertFalse(Research.objects.exists())
+        self.assertFalse(Unit.objects.exists())
+        self.assertFalse(Student.objects.exists())
+
+    def test_malformed_csv_reports_its_line(self):
+        researches = self.write('researches.csv', ','.join(self.RESEARCH) + '\n'
+                                + ','.join(self.RESEARCH.values()) + '\n')
+        fields = list(self.unit(0))
+        rows = [','.join(self.unit(hours).values()) for hours in (0, 2)]
+        units = self.write('units.csv', '\n'.join([','.join(fields), rows[0], rows[1].replace('room', '"room')]))
+        with self.assertRaisesMessage(CommandError, 'units.csv 3번째 줄'):
+            call_command('import_semester', researches=researches, units=units, stderr=io.StringIO())
+        self.assertFalse(Research.objects.exists())
+        self.assertFalse(Unit.objects.exists())
+
+
+# <------------------------------------관리자 목록------------------------------------>
+
+class AdminChangelistTests(TestCase):
+
+    def setUp(self):
+        clear_caches()
+        self.admin = User.objects.create_superuser('admin@test.invalid', 'pw', name='admin', sex='M')
+        self.client.force_login(self.admin)
+        self.client.get(reverse('admin:index'))  # 로그인 직후 첫 요청의 세션 저장은 세지 않는다
+        self.rows = 0
+
+    def add_rows(self, count):
+        for i in range(self.rows, self.rows + count):
+            prof = make_prof(i)
+            holder, waiting = make_students(2, start=2 * i)
+            unit = make_unit(make_research(prof, 'R%d' % i), hours=i, max_number=1)
+            enrollment.enroll(holder, unit.pk)
+            enrollment.enroll(waiting, unit.pk)
+            Preference.objects.create(student_obj=waiting, unit_obj=unit, rank=1)
+            OutboundMail.objects.create(subject='s%d' % i, body='-', to=holder.user.email)
+            archived = ArchivedUnit.objects.create(id=1000 + i, research_id=unit.research_obj_id, research_number='A%d' % i,
+                                                   research_name='a', year=2018, semester='2', place='room',
+                                                   date=START, end_date=START, period=1, max_number=1, current_number=1)
+            ArchivedRecord.objects.create(id=1000 + i, unit_obj=archived, student_pk=holder.pk,
+                                          student_number=holder.student_number)
+        self.rows += count
+
+    def changelists(self):
+        return {model: reverse('admin:%s_%s_changelist' % (model._meta.app_label, model._meta.model_name))
+                for model, model_admin in admin.site._registry.items() if isinstance(model_admin, LargeTableAdmin)}
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIsInstance(response.context['cl'].paginator, pagination.EstimatedCountPaginator)
+        return len(queries)
+
+    def test_changelists_do_not_scale_queries_with_rows(self):
+        self.add_rows(2)
+        small = {model: self.count_queries(url) for model, url in self.changelists().items()}
+        self.add_rows(6)
+        large = {model: self.count_queries(url) for model, url in self.changelists().items()}
+        self.assertEqual(large, small)
+        self.assertEqual(len(small), 11)
+
+    def test_unfiltered_count_is_estimated_and_searches_are_exact(self):
+        self.add_rows(3)
+        url = reverse('admin:asap_student_changelist')
+        with mock.patch.object(pagination, 'estimated_count', return_value=50000):
+            self.assertEqual(self.client.get(url).context['cl'].result_count, 50000)
+            searched = self.client.get(url + '?q=S000002').context['cl']
+        self.assertEqual(searched.result_count, 1)
+
+    def test_number_search_uses_the_column_index(self):
+        request = mock.Mock(GET={})
+        model_admin = admin.site._registry[Preference]
+        queryset, _ = model_admin.get_search_results(request, Preference.objects.all(), 'S000001')
+        plan = queryset.explain()
+        self.assertIn('SEARCH asap_student USING COVERING INDEX', plan)
+        self.assertNotIn('SCAN', plan)
+
+
+# <------------------------------------SQLite 연결 설정------------------------------------>
+
+class SqlitePragmaTests(TestCase):
+
+    def test_connection_runs_the_configured_pragmas(self):
+        pragmas = settings.DATABASES['default']['OPTIONS']['pragmas']
+        self.assertIs(pragmas, settings.SQLITE_PRAGMAS)
+        values = []
+        with connection.cursor() as cursor:
+            for name in ('journal_mode', 'synchronous', 'busy_timeout', 'cache_size'):
+                cursor.execute('PRAGMA %s' % name)
+                values.append(cursor.fetchone()[0])
+        self.assertEqual(values, ['wal', 1, pragmas['busy_timeout'], pragmas['cache_size']])  # synchronous 1 = normal
+        # 대기 시간은 busy_timeout 하나로만 정한다
+        self.assertNotIn('timeout', connection.get_connection_params())
+
+
+# <------------------------------------DB 올리기------------------------------------>
+
+class UpgradeDbTests(TestCase):
+
+    def test_old_combined_migrations_are_recorded_under_the_new_names(self):
+        from .management.commands.upgrade_db import RENAMED
+
+        recorder = MigrationRecorder(connection)
+        new_names = [name for names in RENAMED.values() for name in names]
+        for name in new_names:
+            recorder.record_unapplied('asap', name)
+        for name in RENAMED:
+            recorder.record_applied('asap', name)
+
+        call_command('upgrade_db', verbosity=0, stdout=io.StringIO())
+
+        applied = {name for app, name in recorder.applied_migrations() if app == 'asap'}
+        self.assertEqual(applied, {'0001_initial'} | set(new_names))
+
+
+# <------------------------------------요청 성능 기록------------------------------------>
+
+class PerfInstrumentationTests(TestCase):
+
+    def setUp(self):
+        clear_caches()
+        middleware.reset()
+        make_research(make_prof())
+
+    def test_requests_are_sampled_logged_and_summarised(self):
+        with self.assertLogs('asap.perf', 'INFO') as logs:
+            for _ in range(3):
+                self.client.get(reverse('api_researches'))
+
+        self.assertEqual([record.levelname for record in logs.records], ['INFO'] * 3)
+        self.assertEqual(logs.records[0].view, 'api_researches')
+        row, = middleware.summary()
+        self.assertEqual((row['view'], row['requests'], row['duplicate_queries']), ('api_researches', 3, 0))
+        self.assertGreater(row['queries_max'], 0)
+
+    def test_repeated_queries_log_a_warning(self):
+        def view(request):
+            for _ in range(2):
+                list(Research.objects.filter(pk=1))
+            return HttpResponse()
+
+        with self.assertLogs('asap.perf', 'INFO') as logs:
+            middleware.QueryInstrumentationMiddleware(view)(RequestFactory().get('/'))
+
+        record, = logs.records
+        self.assertEqual((record.levelname, record.queries, record.duplicate_queries), ('WARNING', 2, 1))
+
+    def test_perf_page_is_for_staff_and_resets(self):
+        self.assertEqual(self.client.get(reverse('perf_summary')).status_code, 302)
+
+        staff = User.objects.create_superuser('admin@test.invalid', 'pw', name='admin', sex='M')
+        self.client.force_login(staff)
+        self.client.get(reverse('api_researches'))
+        response = self.client.get(reverse('perf_summary'))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('api_researches', [row['view'] for row in response.context['rows']])
+
+        self.assertRedirects(self.client.post(reverse('perf_summary')), reverse('perf_summary'),
+                             fetch_redirect_response=False)
+        # 초기화 요청 자신만 남는다
+        self.assertEqual([(row['view'], row['requests']) for row in middleware.summary()], [('perf_summary', 1)])
+
+
+# <------------------------------------추첨 배정------------------------------------>
+
+class LotteryTests(TestCase):
+
+    def setUp(self):
+        clear_caches()
+        self.prof = make_prof()
+        self.researches = [make_research(self.prof, 'L%d' % i) for i in range(3)]
+
+    def held(self, student):
+        return list(Unit.objects.filter(record__student_obj=student))
+
+    def test_allocation_respects_capacity_conflicts_and_research(self):
+        first, second = self.researches[:2]
+        a1 = make_unit(first, hours=0, max_number=2)
+        a2 = make_unit(first, hours=5, max_number=2)
+        b = make_unit(second, hours=0, max_number=5)  # a1과 시간이 겹친다
+        c = make_unit(self.researches[2], hours=10, max_number=1)
+        students = make_students(5)
+        enrollment.enroll(students[0], c.pk)  # 미리 신청한 세션도 실험/시간 검사에 들어간다
+        for student in students:
+            lottery.save_preferences(student, [a1.pk, a2.pk, b.pk, c.pk])
+
+        stats = lottery.allocate(2019, '1', seed=3)
+
+        for unit in (a1, a2, b, c):
+            unit.refresh_from_db()
+            self.assertEqual(unit.current_number, Record.objects.filter(unit_obj=unit).count())
+            self.assertLessEqual(unit.current_number, unit.max_number)
+        for student in students:
+            units = self.held(student)
+            self.assertEqual(len({unit.research_obj_id for unit in units}), len(units))
+            for i, unit in enumerate(units):
+                for other in units[i + 1:]:
+                    self.assertFalse(unit.date < other.end_date and other.date < unit.end_date)
+        self.assertEqual(stats['students_without_seat'], 0)
+        self.assertEqual(stats['assigned'], Record.objects.count() - 1)
+
+    def test_everyone_gets_a_seat_before_anyone_gets_a_second(self):
+        popular = make_unit(self.researches[0], hours=0, max_number=1)
+        spare = make_unit(self.researches[1], hours=5, max_number=1)
+        flexible, picky = make_students(2)
+        lottery.save_preferences(flexible, [popular.pk, spare.pk])
+        lottery.save_preferences(picky, [popular.pk])
+
+        for seed in range(10):
+            assignments, stats = lottery.plan(2019, '1', seed=seed)
+            self.assertEqual(sorted(assignments), sorted([(flexible.pk, spare.pk), (picky.pk, popular.pk)]), seed)
+            self.assertEqual((stats['students_without_seat'], stats['students_with_several_seats']), (0, 0))
+
+    def test_dry_run_writes_nothing(self):
+        unit = make_unit(self.researches[0], max_number=3)
+        for student in make_students(2):
+            lottery.save_preferences(student, [unit.pk])
+        out = io.StringIO()
+
+        call_command('allocate_lottery', '2019-1', '--dry-run', stdout=out)
+
+        self.assertIn('2 seats assigned', out.getvalue())
+        self.assertFalse(Record.objects.exists())
+        unit.refresh_from_db()
+        self.assertEqual(unit.current_number, 0)
+
+    def test_command_needs_a_semester(self):
+        with self.assertRaises(CommandError):
+            call_command('allocate_lottery', '2019', stdout=io.StringIO())
+        Research.objects.all().delete()
+        clear_caches()
+        with override_settings(CURRENT_SEMESTER=''), self.assertRaises(CommandError):
+            call_command('allocate_lottery', stdout=io.StringIO())
@@ -1,5 +1,7 @@
+from django.conf import settings
 from django.shortcuts import render, redirect
-from django.views.generic import TemplateView, ListView, CreateView, DetailView
+from django.http import Http404, HttpResponseBadRequest, JsonResponse
+from django.views.generic import TemplateView, ListView, CreateView
 from django.urls import reverse_lazy
 from django.utils.http import urlsafe_base64_decode
 from django.utils.encoding import force_text
@@ -7,10 +9,13 @@ from django.contrib.auth.tokens import PasswordResetTokenGenerator
 from django.contrib.auth.forms import PasswordChangeForm
 from django.contrib.auth import update_session_auth_hash
 from django.contrib import messages
-from .models import User, Student, Prof, Research, Unit, Record
-from django.db.models import Count
+from django.contrib.admin.views.decorators import staff_member_required
+from .models import User, Research, Unit, Record
 from .forms import StudentSignUpForm, ProfSignUpForm, CreateResearchForm, CreateUnitForm, RecordScoreFormSet
-from .forms import ModifyProfForm, ModifyStudentForm
+from .forms import ModifyProfForm, ModifyStudentForm, GradeUploadForm
+from . import api, catalogue, enrollment, exports, grading, lottery, middleware, ratelimit, search, summary
+from .decorators import prof_required, student_required
+from .pagination import keyset_page
 
 import logging
 
@@ -56,25 +61,26 @@ class CreateProfView(CreateView):
 # <------------------------------------강사 View------------------------------------>
 
 
+@prof_required
 def create_view_research(request):
-    research_list = Research.objects.filter(prof_obj=Prof.objects.get(user=request.user))
+    research_list = Research.objects.owned_by(request.user)
 
     if request.method == "POST":
         form = CreateResearchForm(request.POST)
         if form.is_valid():
             research_form = form.save(commit = False)
-            research_form.prof_obj = Prof.objects.get(user=request.user)
+            research_form.prof_obj_id = request.user.pk  # Prof는 User와 pk를 공유
             research_form.save()
             messages.success(request, '성공적으로 등록되었습니다!')
-            return render(request, 'create_view_research.html', {'research_form': form, 'research_list': research_list})
     else:
         form = CreateResearchForm()
-        return render(request, 'create_view_research.html', {'research_form': form, 'research_list': research_list})
+    return render(request, 'create_view_research.html', {'research_form': form, 'research_list': research_list})
 
+@prof_required
 def modify_research(request, pk):
-    target = Research.objects.get(pk=pk)
-
-    if target.prof_obj != Prof.objects.get(user=request.user):
+    # 소유 여부를 조회 조건에 넣어 한 번의 쿼리로 확인
+    target = Research.objects.owned_by(request.user).filter(pk=pk).first()
+    if target is None:
         return redirect('warning')
 
     if request.method == "POST":
@@ -84,14 +90,15 @@ def modify_research(request, pk):
              messages.success(request, '성공적으로 수정되었습니다!')
              return redirect('create_research')
     else:
-        research_list = Research.objects.filter(prof_obj=Prof.objects.get(user=request.user))
+        research_list = Research.objects.owned_by(request.user)
         form = CreateResearchForm(instance = target)
         return render(request, 'modify_research.html', {'research_form': form, 'research_list': research_list, 'target': target})
 
+@prof_required
 def delete_research(request, pk):
-    target = Research.objects.get(pk=pk)
+    target = Research.objects.owned_by(request.user).filter(pk=pk).first()
 
-    if target.prof_obj == Prof.objects.get(user=request.user):
+    if target is not None:
         target.delete()
         messages.success(request, '성공적으로 삭제되었습니다!')
         return redirect('create_research')
@@ -99,50 +106,52 @@ def delete_research(request, pk):
         return redirect('warning')
     
 
+@prof_required
 def create_unit(request, pk):
-    research_obj = Research.objects.get(pk=pk)
-
-    if research_obj.prof_obj != Prof.objects.get(user=request.user):
+    research_obj = Research.objects.owned_by(request.user).filter(pk=pk).first()
+    if research_obj is None:
         return redirect('warning')
 
-    unit_list = Unit.objects.filter(research_obj=Research.objects.get(pk=pk))
+    unit_list = Unit.objects.filter(research_obj=research_obj)
 
     if request.method == "POST":
         form = CreateUnitForm(request.POST)
         if form.is_valid():
             unit_form = form.save(commit=False)
-            unit_form.research_obj = Research.objects.get(pk=pk)
+            unit_form.research_obj = research_obj
             unit_form.save()
             messages.success(request, '성공적으로 등록되었습니다!')
-            return render(request, 'create_unit.html', {'research_obj': research_obj, 'unit_form': form, 'unit_list': unit_list, 'rpk': pk})
     else:
         form = CreateUnitForm()
-        return render(request, 'create_unit.html', {'research_obj': research_obj, 'unit_form': form, 'unit_list': unit_list, 'rpk': pk})
+    return render(request, 'create_unit.html', {'research_obj': research_obj, 'unit_form': form, 'unit_list': unit_list, 'rpk': pk})
 
 
+@prof_required
 def modify_unit(request, rpk, upk):
-    research_obj = Research.objects.get(pk=rpk)
-    target = Unit.objects.get(pk=upk)
-
-    if research_obj.prof_obj != Prof.objects.get(user=request.user):
+    target = Unit.objects.owned_by(request.user).filter(pk=upk, research_obj_id=rpk).first()
+    if target is None:
         return redirect('warning')
+    research_obj = target.research_obj
 
     if request.method == "POST":
         form = CreateUnitForm(request.POST, instance=target)
         if form.is_valid():
-             form.save()
+             # current_number는 신청/취소 경로에서만 갱신한다
+             form.save(commit=False).save(update_fields=CreateUnitForm.Meta.fields)
+             enrollment.promote_waitlist(upk)  # 정원이 늘었다면 대기자를 승격
              messages.success(request, '성공적으로 수정되었습니다!')
              return redirect('create_unit', pk=rpk)
     else:
-        unit_list = Unit.objects.filter(research_obj=Research.objects.get(pk=rpk))
+        unit_list = Unit.objects.filter(research_obj_id=rpk)
         form = CreateUnitForm(instance=target)
         return render(request, 'modify_unit.html', {'research_obj': research_obj, 'unit_form': form, 'unit_list': unit_list, 'target': target})
 
 
+@prof_required
 def delete_unit(request, rpk, upk):
-    target = Unit.objects.get(pk=upk)
+    target = Unit.objects.owned_by(request.user).filter(pk=upk).first()
 
-    if target.research_obj.prof_obj == Prof.objects.get(user=request.user):
+    if target is not None:
         target.delete()
         messages.success(request, '성공적으로 삭제되었습니다!')
         return redirect('create_unit', pk=rpk)
@@ -150,114 +159,304 @@ def delete_unit(request, rpk, upk):
         return redirect('warning')
 
 
+@prof_required
 def list_manage_unit(request):
-    objects = Research.objects.filter(prof_obj=Prof.objects.get(user=request.user))
-    unit_list = Unit.objects.filter(research_obj__in=objects)
+    unit_list = Unit.objects.owned_by(request.user).catalogue()
     return render(request, 'list_manage_unit.html', {'unit_list': unit_list, })
 
-def manage_unit(request, pk):
-    target_unit = Unit.objects.get(pk=pk)
+@prof_required
+def prof_dashboard(request):
+    researches = summary.dashboard(request.user.pk)
+    return render(request, 'prof_dashboard.html', {'researches': researches, })
 
+@prof_required
+def manage_unit(request, pk):
     # 타인 강의 접근 차단
-    if not target_unit.research_obj.prof_obj == Prof.objects.get(user=request.user):
+    target_unit = Unit.objects.owned_by(request.user).filter(pk=pk).first()
+    if target_unit is None:
         return redirect('warning')
 
-    target_list = Record.objects.filter(unit_obj=target_unit)
+    target_list = Record.objects.roster(target_unit)
     if request.method == "POST":
         formset = RecordScoreFormSet(request.POST, queryset=target_list,)
         if formset.is_valid():
-            for fs in formset:
-                if fs.is_valid():
-                    fs.save()
+            grading.apply_grades(formset.save(commit=False))
             messages.success(request, '성공적으로 입력되었습니다!')
             return redirect('manage_unit',pk)
         else:
             messages.error(request, 'Please correct the error below.')
     else:
         formset = RecordScoreFormSet(queryset=target_list,)
-        zip_form = zip(target_list, formset)
-        return render(request, 'manage_unit.html', {'pk': pk, 'form': formset, 'zip_form': zip_form, })
+    zip_form = [(form.instance, form) for form in formset]
+    return render(request, 'manage_unit.html', {'pk': pk, 'form': formset, 'zip_form': zip_form,
+                                                'upload_form': GradeUploadForm(), })
+
+@prof_required
+def upload_grades(request, pk):
+    target_unit = Unit.objects.owned_by(request.user).filter(pk=pk).first()
+    if target_unit is None:
+        return redirect('warning')
+
+    form = GradeUploadForm(request.POST or None, request.FILES or None)
+    if request.method == "POST" and form.is_valid():
+        records, errors = grading.grades_from_file(target_unit, form.cleaned_data['grades'])
+        if errors:
+            # 한 행이라도 틀리면 아무것도 저장하지 않는다
+            messages.error(request, ' / '.join(errors[:10]))
+        else:
+            count = grading.apply_grades(records)
+            messages.success(request, '%d명의 성적이 입력되었습니다!' % count)
+    return redirect('manage_unit', pk)
+
+@prof_required
+def export_unit(request, pk):
+    target_unit = Unit.objects.owned_by(request.user).filter(pk=pk).first()
+    if target_unit is None:
+        return redirect('warning')
+    return exports.unit_roster(target_unit)
+
+@prof_required
+def export_research(request, pk):
+    target = Research.objects.owned_by(request.user).filter(pk=pk).first()
+    if target is None:
+        return redirect('warning')
+    return exports.research_grades(target)
+
+@staff_member_required
+def export_semester(request):
+    try:
+        return exports.semester_records(request.GET.get('year'), request.GET.get('semester'))
+    except ValueError as e:
+        return HttpResponseBadRequest(str(e), content_type='text/plain; charset=utf-8')
+
+@staff_member_required
+def perf_summary(request):
+    if request.method == "POST":
+        middleware.reset()
+        ratelimit.reset_rejected()
+        return redirect('perf_summary')
+    return render(request, 'perf_summary.html', {'rows': middleware.summary(), 'sample_size': middleware.SAMPLE_SIZE,
+                                                 'rejected': sorted(ratelimit.rejected_counts().items())})
 
 # <------------------------------------학생 View------------------------------------>
 
 
+@student_required
 def enroll_view_unit(request):
-    all_units = Unit.objects.all()
-    my_records = Record.objects.filter(student_obj=Student.objects.get(user=request.user))
-    my_researchs = Research.objects.filter(unit__record__in = my_records)
-    return render(request, 'enroll_view_unit.html', {'all_units': all_units, 'my_records': my_records, 'my_researchs': my_researchs.values_list('research_name', flat=True)})
-
+    if lottery.is_open():
+        return redirect('lottery_preferences')
+    me = request.student
+    all_units = catalogue.current_units()
+    my_records = list(Record.objects.for_student(me))
+    my_waitlist = list(enrollment.waitlist_with_position(me))
+    # 신청 여부는 템플릿에서 pk 집합으로 확인
+    enrolled_research_pks = {record.unit_obj.research_obj_id for record in my_records}
+    waiting_unit_pks = {entry.unit_obj_id for entry in my_waitlist}
+    conflict_unit_pks = enrollment.conflicting_unit_pks(all_units, my_records)
+    return render(request, 'enroll_view_unit.html', {'all_units': all_units, 'my_records': my_records, 'my_waitlist': my_waitlist,
+                                                     'enrolled_research_pks': enrolled_research_pks, 'waiting_unit_pks': waiting_unit_pks,
+                                                     'conflict_unit_pks': conflict_unit_pks, 'seat_events_url': settings.SEAT_EVENTS_URL})
+
+@student_required
 def enroll_unit(request, pk):
-    target_unit = Unit.objects.get(pk=pk)
-    me = Student.objects.get(user = request.user)
-
-    try: #신청 여부 검사
-        Record.objects.get(student_obj=me, unit_obj=target_unit)
-        messages.error(request, '이미 신청완료한 실험입니다!')
-        return redirect('enroll_page')
+    if lottery.is_open(): # 추첨 기간에는 선착순 신청을 받지 않는다
+        messages.error(request, '지금은 희망 세션 접수 기간입니다.')
+        return redirect('lottery_preferences')
+    me = request.student
 
-    except Record.DoesNotExist:
-        if target_unit.current_number >= target_unit.max_number:  # 수강 정원 검사
-            messages.error(request, '정원 초과입니다. 다른 실험을 선택하여 주시기 바랍니다.')
-            return redirect('enroll_page')
+    try:
+        result = enrollment.enroll(me, pk)
+    except Unit.DoesNotExist:
+        raise Http404
 
-        record = Record.objects.create(student_obj=me, unit_obj=target_unit)
-        record.save()
+    if result == enrollment.ALREADY_ENROLLED: #신청 여부 검사
+        messages.error(request, '이미 신청완료한 실험입니다!')
+    elif result == enrollment.ALREADY_WAITLISTED:
+        messages.error(request, '이미 대기 중인 실험입니다!')
+    elif result == enrollment.CONFLICT: # 신청한 다른 실험과 시간 중복
+        messages.error(request, '이미 신청한 실험과 시간이 겹칩니다!')
+    elif result == enrollment.WAITLISTED: # 수강 정원 초과 시 대기열 등록
+        messages.info(request, '정원 초과로 대기자 명단에 등록되었습니다. 자리가 나면 자동으로 신청됩니다.')
+    else:
         messages.success(request, '실험신청을 성공하였습니다!')
-        target_unit.current_number += 1
-        target_unit.save()
-        return redirect('enroll_page')
+    return redirect('enroll_page')
 
+@student_required
+def lottery_preferences(request):
+    if not lottery.is_open():
+        return redirect('enroll_page')
+    me = request.student
+    if request.method == 'POST':
+        ranks = []
+        for key, value in request.POST.items():
+            if key.startswith('rank_') and value.strip():
+                try:
+                    ranks.append((int(value), int(key[len('rank_'):])))
+                except ValueError:
+                    pass
+        saved = lottery.save_preferences(me, [unit_pk for _, unit_pk in sorted(ranks)])
+        messages.success(request, '희망 세션 %d개가 저장되었습니다.' % len(saved))
+        return redirect('lottery_preferences')
+    ranks = {p.unit_obj_id: p.rank for p in lottery.preferences(me)}
+    all_units = catalogue.current_units()
+    for unit in all_units:
+        unit.rank = ranks.get(unit.pk)
+    return render(request, 'lottery_preferences.html', {'all_units': all_units, 'max_choices': settings.LOTTERY_CHOICES})
+
+@student_required
 def cancel_unit(request,pk):
-    target_record = Record.objects.get(pk=pk)
-    if target_record.student_obj == Student.objects.get(user=request.user):
-        target_record.unit_obj.current_number -= 1
-        target_record.unit_obj.save()
-        target_record.delete()
+    result = enrollment.cancel(request.student, pk)
+    if result == enrollment.SUCCESS:
         messages.success(request, '신청 취소되었습니다.')
         return redirect('enroll_page')
     else:
         return redirect('warning')
 
+@student_required
+def leave_waitlist(request, pk):
+    result = enrollment.leave_waitlist(request.student, pk)
+    if result == enrollment.SUCCESS:
+        messages.success(request, '대기 신청이 취소되었습니다.')
+    return redirect('enroll_page')
+
+@student_required
+def waitlist_position(request, pk):
+    me = request.student
+    entry = enrollment.waitlist_with_position(me).filter(unit_obj_id=pk).first()
+    return JsonResponse({
+        'unit': int(pk),
+        'waiting': entry is not None,
+        'position': entry.position if entry else None,
+        'enrolled': entry is None and Record.objects.filter(student_obj=me, unit_obj_id=pk).exists(),
+    })
+
+@student_required
 def my_research_student(request):
-    my_researches = Record.objects.filter(student_obj=Student.objects.get(user=request.user))
+    my_researches = Record.objects.for_student(request.student)
     return render(request, 'my_research_student.html',{'my_researches': my_researches,})
 
 # <------------------------------------실험 조회/정보 View------------------------------------>
 
 
+def _in_semester(queryset, pair):
+    return queryset.in_semester(*pair) if pair else queryset.none()
+
+
 class AllResearchListView(ListView):
     template_name = 'all_research.html'
     context_object_name='all_researches'
 
     #검색창 
     def get_queryset(self):
+        try:
+            self.semester = api.requested_semester(self.request)
+        except api.ParamError:
+            raise Http404
         q = self.request.GET.get('q', '')
         q_option = self.request.GET.get('q_option')
-        if q:
-            if q_option == "prof":
-                return Research.objects.filter(prof_obj__user__name__icontains=q)
-            else:
-                filter_dict = {q_option+'__icontains': q}
-                return Research.objects.filter(**filter_dict)
-        else:
-            return Research.objects.filter()
+        after = self.request.GET.get('after')
+        queryset = _in_semester(search.search_research(q, q_option), self.semester).select_related('prof_obj__user')
+        page, self.next_cursor = keyset_page(queryset, after)
+        return page
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['q'] = self.request.GET.get('q', '')
+        context['q_option'] = self.request.GET.get('q_option', search.DEFAULT_FIELD)
+        context['next_cursor'] = self.next_cursor
+        context['after'] = self.request.GET.get('after', '')
+        context['semester'] = self.semester
+        context['semesters'] = catalogue.semesters()[::-1]
+        # 목록 표 조각의 캐시 키. 보고 있는 학기가 바뀔 때만 새 키가 된다
+        context['version'] = catalogue.semester_version(*self.semester) if self.semester else None
+        return context
 
 
 def research_info(request, pk):
-    research_obj = Research.objects.get(pk=pk)
-    unit_list = Unit.objects.filter(research_obj=research_obj)
-    return render(request, 'research_info.html', {'research_obj': research_obj, 'unit_list': unit_list,})
+    try:
+        research_obj, unit_list = catalogue.research_detail(pk)
+    except Research.DoesNotExist:
+        raise Http404
+    return render(request, 'research_info.html', {
+        'research_obj': research_obj,
+        'unit_list': unit_list,
+        # 세션 표 조각의 캐시 키: 실험/세션이 바뀌면 학기 버전이, 신청이 생기면 좌석 수가 달라진다
+        'version': catalogue.semester_version(research_obj.year, research_obj.semester),
+        'seats': [unit.current_number for unit in unit_list],
+    })
+
+# <------------------------------------JSON API View------------------------------------>
+
+
+def api_researches(request):
+    try:
+        fields = api.select_fields(request, api.RESEARCH_FIELDS)
+        semester = api.requested_semester(request)
+    except api.ParamError as e:
+        return api.error(str(e))
+    after, size = request.GET.get('after'), api.page_size(request)
+
+    def build():
+        page, next_cursor = keyset_page(_in_semester(Research.objects.select_related('prof_obj__user'), semester),
+                                        after, size)
+        return {'results': api.serialize(page, api.RESEARCH_FIELDS, fields), 'next': next_cursor}
+    # 실험 목록은 그 학기의 버전이 같으면 캐시도 읽지 않고 304
+    version = catalogue.semester_version(*semester) if semester else None
+    etag = api.make_etag('researches', semester, version, fields, after, size)
+    return api.conditional_json(request, build, etag)
+
+def api_research(request, pk):
+    try:
+        fields = api.select_fields(request, api.RESEARCH_FIELDS)
+        unit_fields = api.select_fields(request, api.UNIT_FIELDS, 'unit_fields')
+        research_obj, unit_list = catalogue.research_detail(pk)
+    except api.FieldError as e:
+        return api.error(str(e))
+    except Research.DoesNotExist:
+        return api.error('실험을 찾을 수 없습니다.', status=404)
+
+    def build():
+        result = api.serialize([research_obj], api.RESEARCH_FIELDS, fields)[0]
+        result['units'] = api.serialize(unit_list, api.UNIT_FIELDS, unit_fields)
+        return result
+    return api.conditional_json(request, build)
+
+def api_units(request):
+    try:
+        fields = api.select_fields(request, api.UNIT_FIELDS)
+        semester = api.requested_semester(request)
+    except api.ParamError as e:
+        return api.error(str(e))
+    units = _in_semester(Unit.objects.all(), semester)
+    research = request.GET.get('research')
+    if research and research.isdigit():
+        units = units.filter(research_obj_id=int(research))
+    page, next_cursor = keyset_page(units, request.GET.get('after'), api.page_size(request))
+    # 좌석 수는 수시로 바뀌므로 ETag는 응답 내용으로 계산
+    return api.conditional_json(request, lambda: {'results': api.serialize(page, api.UNIT_FIELDS, fields),
+                                                  'next': next_cursor})
+
+def api_my_records(request):
+    if not request.student:
+        return api.error('학생 계정으로 로그인해야 합니다.', status=403)
+    try:
+        fields = api.select_fields(request, api.RECORD_FIELDS)
+    except api.FieldError as e:
+        return api.error(str(e))
+    page, next_cursor = keyset_page(Record.objects.for_student(request.student),
+                                    request.GET.get('after'), api.page_size(request))
+    return api.conditional_json(request, lambda: {'results': api.serialize(page, api.RECORD_FIELDS, fields),
+                                                  'next': next_cursor})
 
 # <------------------------------------개인 설정 메뉴 View------------------------------------>
 
 
 def my_page(request):
-    if request.user.is_student:
-        target = Student.objects.get(user=request.user)
+    if request.student:
+        target = request.student
         form_type = ModifyStudentForm
-    elif request.user.is_prof:
-        target = Prof.objects.get(user=request.user)
+    elif request.prof:
+        target = request.prof
         form_type = ModifyProfForm
     else:
         target_user = request.user
@@ -0,0 +1,227 @@
+"""
+ASGI config for proj project.
+
+Django 2.1 has no ASGI handler, so this is a small hand-written ASGI
+application (run it with any ASGI server, e.g. ``uvicorn proj.asgi:application``):
+
+* ``/events/seats`` streams seat-count changes as Server-Sent Events.  One
+  hub per process drains ``asap.live.broker()`` every SEAT_EVENTS_TICK
+  seconds and fans the result out, so each watcher costs one idle
+  connection instead of repeated page renders.  ``?units=1,2,3`` limits
+  the stream to those units.
+* every other HTTP request is handed to the Django WSGI application in a
+  worker thread, so enrollments served here reach the in-process broker.
+  Responses are buffered; large CSV exports are better left to the WSGI
+  server.
+"""
+
+import asyncio
+import json
+import os
+import sys
+from io import BytesIO
+from urllib.parse import parse_qs
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'proj.settings')
+
+from django.conf import settings  # noqa: E402
+from django.db import close_old_connections  # noqa: E402
+
+from proj.wsgi import application as wsgi_application  # noqa: E402
+from asap import live  # noqa: E402
+
+EVENTS_PATH = '/events/seats'
+# 변화가 없어도 이 간격으로 주석 줄을 보내 프록시가 연결을 끊지 않게 한다
+KEEPALIVE = 15
+
+
+def _db(func, *args):
+    try:
+        return func(*args)
+    finally:
+        close_old_connections()
+
+
+async def _in_thread(func, *args):
+    return await asyncio.get_running_loop().run_in_executor(None, _db, func, *args)
+
+
+class Watcher:
+    """Seat changes not yet sent to one client, merged per unit.
+
+    A slow client only ever holds the latest value of each unit, so nothing
+    piles up and no change is lost between sends.
+    """
+
+    def __init__(self, wanted=None):
+        self.wanted = wanted
+        self.pending = {}
+        self.ready = asyncio.Event()
+
+    def push(self, seats):
+        if self.wanted:
+            seats = {pk: value for pk, value in seats.items() if pk in self.wanted}
+        if seats:
+            self.pending.update(seats)
+            self.ready.set()
+
+    def take(self):
+        seats, self.pending = self.pending, {}
+        self.ready.clear()
+        return seats
+
+
+class SeatHub:
+    """Fans seat changes out to every watcher; runs only while someone is watching."""
+
+    def __init__(self):
+        self.watchers = set()
+        self.task = None
+
+    def subscribe(self, wanted=None):
+        watcher = Watcher(wanted)
+        self.watchers.add(watcher)
+        if self.task is None:
+            self.task = asyncio.ensure_future(self.run())
+        return watcher
+
+    def unsubscribe(self, watcher):
+        self.watchers.discard(watcher)
+
+    async def run(self):
+        try:
+            while self.watchers:
+                seats = await _in_thread(live.poll)
+                if seats:
+                    for watcher in list(self.watchers):
+                        watcher.push(seats)
+                await asyncio.sleep(settings.SEAT_EVENTS_TICK)
+        finally:
+            self.task = None
+
+
+hub = SeatHub()
+
+
+async def _disconnect(receive):
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+
+def _event(seats):
+    data = json.dumps({str(pk): value for pk, value in seats.items()})
+    return ('event: seats\ndata: %s\n\n' % data).encode()
+
+
+async def seat_events(scope, receive, send):
+    query = parse_qs(scope.get('query_string', b'').decode('latin-1'))
+    wanted = {int(pk) for value in query.get('units', []) for pk in value.split(',') if pk.isdigit()}
+
+    await send({
+        'type': 'http.response.start',
+        'status': 200,
+        'headers': [
+            (b'content-type', b'text/event-stream; charset=utf-8'),
+            (b'cache-control', b'no-cache'),
+            (b'x-accel-buffering', b'no'),  # nginx가 스트림을 모아두지 않도록
+        ],
+    })
+    watcher = hub.subscribe(wanted)
+    disconnected = asyncio.ensure_future(_disconnect(receive))
+    try:
+        # 페이지를 그린 뒤 접속하기 전까지의 변화를 놓치지 않도록 현재 값부터 보낸다
+        if wanted:
+            await send({'type': 'http.response.body', 'body': _event(await _in_thread(live.snapshot, wanted)),
+                        'more_body': True})
+        while True:
+            update = asyncio.ensure_future(watcher.ready.wait())
+            done, _ = await asyncio.wait({update, disconnected}, timeout=KEEPALIVE,
+                                         return_when=asyncio.FIRST_COMPLETED)
+            if disconnected in done:
+                update.cancel()
+                break
+            if update in done:
+                body = _event(watcher.take())
+            else:
+                update.cancel()
+                body = b': keepalive\n\n'
+            await send({'type': 'http.response.body', 'body': body, 'more_body': True})
+    finally:
+        hub.unsubscribe(watcher)
+        disconnected.cancel()
+
+
+def _environ(scope, body):
+    server = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', ''),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': 'HTTP/%s' % scope.get('http_version', '1.1'),
+        'REMOTE_ADDR': (scope.get('client') or ('', 0))[0],
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope.get('headers', []):
+        name = name.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if name not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            name = 'HTTP_' + name
+        environ[name] = '%s,%s' % (environ[name], value) if name in environ else value
+    return environ
+
+
+def _call_wsgi(environ):
+    response = {}
+
+    def start_response(status, headers, exc_info=None):
+        response['status'] = int(status.split(' ', 1)[0])
+        response['headers'] = [(k.encode('latin-1'), v.encode('latin-1')) for k, v in headers]
+
+    result = wsgi_application(environ, start_response)
+    try:
+        response['body'] = b''.join(result)
+    finally:
+        if hasattr(result, 'close'):
+            result.close()
+    return response
+
+
+async def django_view(scope, receive, send):
+    body = []
+    while True:
+        message = await receive()
+        body.append(message.get('body', b''))
+        if not message.get('more_body'):
+            break
+    loop = asyncio.get_running_loop()
+    response = await loop.run_in_executor(None, _call_wsgi, _environ(scope, b''.join(body)))
+    await send({'type': 'http.response.start', 'status': response['status'], 'headers': response['headers']})
+    await send({'type': 'http.response.body', 'body': response['body']})
+
+
+async def lifespan(scope, receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        await lifespan(scope, receive, send)
+    elif scope['type'] == 'http' and scope['path'] == EVENTS_PATH:
+        await seat_events(scope, receive, send)
+    elif scope['type'] == 'http':
+        await django_view(scope, receive, send)
@@ -0,0 +1,28 @@
+"""
+Gunicorn settings for production: ``gunicorn -c proj/gunicorn.conf.py``.
+
+The app is preloaded, so proj.serving imports and warms Django once in the
+master and every worker starts warm; see proj.serving.  Point the load
+balancer's health check at /ready.
+"""
+
+import multiprocessing
+import os
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'proj.settings')
+os.environ.setdefault('DJANGO_DEBUG', '0')
+
+wsgi_app = 'proj.serving:application'
+preload_app = True
+
+bind = os.environ.get('BIND', '127.0.0.1:8000')
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+timeout = 30
+# 재시작 시 처리 중인 신청 요청이 끝날 때까지 기다린다
+graceful_timeout = 30
+keepalive = 5
+
+
+def post_fork(server, worker):
+    from proj import serving
+    serving.worker_started()
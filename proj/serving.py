@@ -0,0 +1,164 @@
+"""
+Production serving entry point: ``proj.serving:application``.
+
+Importing this module loads Django (settings, apps, admin autodiscovery,
+models) and then warms what the first request of every worker would
+otherwise pay for:
+
+* every route in ``proj/urls.py`` (and included URLconfs) is compiled and
+  the reverse lookup tables are built;
+* every template is compiled into the cached loader, which is on whenever
+  DEBUG is off;
+* each database is connected once and the current semester's catalogue is
+  loaded into the cache.
+
+With a preforking server that preloads the app (``gunicorn -c
+proj/gunicorn.conf.py``, or uWSGI without ``lazy-apps``) this happens once in
+the master, and the workers inherit the warm state.  Database connections
+are closed again before the fork; :func:`worker_started` reopens one per
+worker.
+
+``READY_PATH`` answers 200 once warm-up has finished and the default
+database responds, 503 otherwise, so a load balancer only sends traffic to
+warm workers during a rolling restart.  Import and warm-up times are
+included in the response and logged to ``asap.perf`` at INFO
+(``PERF_LOG_LEVEL=INFO``).
+"""
+
+import time
+
+STARTED = time.perf_counter()
+
+import json  # noqa: E402
+import logging  # noqa: E402
+import os  # noqa: E402
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'proj.settings')
+
+from proj.wsgi import application as wsgi_application  # noqa: E402
+
+IMPORTED = time.perf_counter()
+
+from django.conf import settings  # noqa: E402
+from django.db import connections, close_old_connections  # noqa: E402
+from django.template import engines, TemplateDoesNotExist, TemplateSyntaxError  # noqa: E402
+from django.template.utils import get_app_template_dirs  # noqa: E402
+from django.urls import get_resolver, URLResolver  # noqa: E402
+
+READY_PATH = '/ready'
+
+logger = logging.getLogger('asap.perf')
+
+startup = {'pid': os.getpid(), 'import_ms': round((IMPORTED - STARTED) * 1000, 1)}
+ready = False
+
+
+# <------------------------------------예열------------------------------------>
+
+def warm_urls(resolver=None):
+    """Compile every route's regex and build the reverse tables; returns the route count."""
+    resolver = resolver or get_resolver()
+    resolver.reverse_dict  # 역참조 표를 채운다. include된 URLconf는 아래 재귀에서
+    count = 0
+    for pattern in resolver.url_patterns:
+        pattern.pattern.regex  # 정규식은 처음 접근할 때 컴파일된다
+        if isinstance(pattern, URLResolver):
+            count += warm_urls(pattern)
+        else:
+            count += 1
+    return count
+
+
+def warm_templates():
+    """Load every ``.html`` template once so the cached loader holds it compiled.
+
+    Returns the number compiled; templates that fail to load (admin
+    templates of apps that are not installed, say) are skipped.
+    """
+    count = 0
+    for engine in engines.all():
+        dirs = list(engine.engine.dirs) + list(get_app_template_dirs('templates'))
+        names = set()
+        for root in dirs:
+            for directory, _, filenames in os.walk(root):
+                names.update(os.path.relpath(os.path.join(directory, filename), root).replace(os.sep, '/')
+                             for filename in filenames if filename.endswith('.html'))
+        for name in sorted(names):
+            try:
+                engine.get_template(name)
+            except (TemplateDoesNotExist, TemplateSyntaxError):
+                continue
+            count += 1
+    return count
+
+
+def warm_database():
+    """Connect to every database and load the current semester's catalogue into the cache."""
+    from asap import catalogue
+
+    for connection in connections.all():
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+    catalogue.current_units()
+
+
+def warm_up():
+    global ready
+    started = time.perf_counter()
+    startup['urls'] = warm_urls()
+    startup['templates'] = warm_templates()
+    warm_database()
+    connections.close_all()  # fork 전에 닫아 워커끼리 연결을 공유하지 않게 한다
+    startup['warm_up_ms'] = round((time.perf_counter() - started) * 1000, 1)
+    ready = True
+    if settings.DEBUG:
+        logger.warning('proj.serving is running with DEBUG on; set DJANGO_DEBUG=0')
+    logger.info(json.dumps(dict(startup, event='startup')))
+
+
+def worker_started():
+    """Call in each forked worker (gunicorn post_fork) to open its own connections."""
+    startup['pid'] = os.getpid()
+    for connection in connections.all():
+        connection.ensure_connection()
+
+
+# <------------------------------------준비 상태------------------------------------>
+
+def _database_ok():
+    try:
+        with connections['default'].cursor() as cursor:
+            cursor.execute('SELECT 1')
+        return None
+    except Exception as exc:
+        return repr(exc)
+    finally:
+        close_old_connections()
+
+
+class ReadinessApplication:
+    """WSGI wrapper answering READY_PATH without going through Django's middleware."""
+
+    def __init__(self, application):
+        self.application = application
+
+    def __call__(self, environ, start_response):
+        if environ.get('PATH_INFO') != READY_PATH:
+            return self.application(environ, start_response)
+        error = None if ready else 'warming up'
+        error = error or _database_ok()
+        body = dict(startup, ready=error is None,
+                    uptime_s=round(time.perf_counter() - STARTED, 1))
+        if error:
+            body['error'] = error
+        body = json.dumps(body).encode()
+        start_response('200 OK' if error is None else '503 Service Unavailable', [
+            ('Content-Type', 'application/json'),
+            ('Content-Length', str(len(body))),
+            ('Cache-Control', 'no-store'),
+        ])
+        return [body] if environ['REQUEST_METHOD'] != 'HEAD' else []
+
+
+application = ReadinessApplication(wsgi_application)
+warm_up()
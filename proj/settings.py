@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/2.1/ref/settings/
 """
 
 import os
+import sys
 
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -23,9 +24,9 @@ BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 SECRET_KEY = '0sa4um@vay(p_b-fz#jw%7ve&c=+cd&x0s3lamv&9!o)ja$y&^f'
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+DEBUG = os.environ.get('DJANGO_DEBUG', '1') == '1'
 
-ALLOWED_HOSTS = []
+ALLOWED_HOSTS = [host for host in os.environ.get('ALLOWED_HOSTS', '').split(',') if host]
 
 
 # Application definition
@@ -43,11 +44,15 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'asap.middleware.QueryInstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
+    'asap.middleware.SessionRefreshMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'asap.middleware.RoleMiddleware',
+    'asap.middleware.RateLimitMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 
@@ -55,12 +60,18 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = 'proj.urls'
 
+TEMPLATE_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [],
-        'APP_DIRS': True,
         'OPTIONS': {
+            # 운영에서는 파싱한 템플릿을 프로세스 안에 캐시한다
+            'loaders': TEMPLATE_LOADERS if DEBUG else [('django.template.loaders.cached.Loader', TEMPLATE_LOADERS)],
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
@@ -76,12 +87,72 @@ WSGI_APPLICATION = 'proj.wsgi.application'
 
 # Database
 # https://docs.djangoproject.com/en/2.1/ref/settings/#databases
+# 기본은 WAL 모드로 조정한 SQLite(proj.sqlite3), DB_ENGINE을 주면 서버 DB로 전환한다
+# 예) DB_ENGINE=django.db.backends.postgresql DB_NAME=asap DB_USER=asap DB_PASSWORD=... DB_HOST=localhost
+
+# proj.sqlite3가 새 연결마다 실행하는 PRAGMA. 잠긴 DB를 기다리는 시간은 busy_timeout(ms) 하나로 정한다
+SQLITE_PRAGMAS = {
+    'journal_mode': 'wal',
+    'synchronous': 'normal',
+    'busy_timeout': 5000,
+    'cache_size': -20000,  # 음수는 KiB 단위, 약 20MB
+}
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+if os.environ.get('DB_ENGINE'):
+    DATABASES = {
+        'default': {
+            'ENGINE': os.environ['DB_ENGINE'],
+            'NAME': os.environ.get('DB_NAME', 'asap'),
+            'USER': os.environ.get('DB_USER', ''),
+            'PASSWORD': os.environ.get('DB_PASSWORD', ''),
+            'HOST': os.environ.get('DB_HOST', ''),
+            'PORT': os.environ.get('DB_PORT', ''),
+            'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', '60')),
+        }
+    }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'proj.sqlite3',
+            'NAME': os.environ.get('DB_NAME', os.path.join(BASE_DIR, 'db.sqlite3')),
+            'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', '600')),
+            'OPTIONS': {'pragmas': SQLITE_PRAGMAS},
+            # 동시성 테스트가 여러 스레드에서 접속하므로 메모리 DB 대신 파일을 쓴다
+            'TEST': {'NAME': os.path.join(BASE_DIR, 'test_db.sqlite3')},
+        }
+    }
+
+# 지난 학기 보관 표(asap.ArchivedUnit/ArchivedRecord)를 둘 DB. ARCHIVE_DB_NAME을 주면 별도 SQLite 파일에 둔다
+# 예) ARCHIVE_DB_NAME=/var/lib/asap/archive.sqlite3 후 `manage.py migrate --database=archive`
+if os.environ.get('ARCHIVE_DB_NAME'):
+    DATABASES['archive'] = {
+        'ENGINE': 'proj.sqlite3',
+        'NAME': os.environ['ARCHIVE_DB_NAME'],
+        'OPTIONS': {'pragmas': SQLITE_PRAGMAS},
     }
+    ARCHIVE_DATABASE = 'archive'
+else:
+    ARCHIVE_DATABASE = 'default'
+DATABASE_ROUTERS = ['asap.routers.ArchiveRouter']
+
+
+# Cache
+# https://docs.djangoproject.com/en/2.1/topics/cache/
+# locmem은 프로세스마다 따로이므로 여러 워커를 띄울 때는 파일/Redis 캐시를 지정한다
+# 예) CACHE_BACKEND=django.core.cache.backends.filebased.FileBasedCache CACHE_LOCATION=/var/tmp/asap_cache
+
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', 'asap'),
+    },
+    # {% cache %} 템플릿 조각. 개발 중에는 템플릿을 고치면 바로 보이도록 캐시하지 않는다
+    'fragments': {
+        'BACKEND': 'django.core.cache.backends.dummy.DummyCache' if DEBUG
+                   else os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', 'asap'),
+        'KEY_PREFIX': 'fragments',
+    },
 }
 
 
@@ -122,7 +193,21 @@ USE_TZ = False
 # https://docs.djangoproject.com/en/2.1/howto/static-files/
 
 STATIC_URL = '/static/'
-STATIC_ROOT = os.path.join(BASE_DIR, 'static')
+# collectstatic 결과만 두는 곳. 저장소의 static/ 원본 트리와 섞이지 않게 따로 두고 커밋하지 않는다
+STATIC_ROOT = os.environ.get('STATIC_ROOT', os.path.join(BASE_DIR, 'staticfiles'))
+
+# `manage.py collectstatic`이 템플릿과 CSS가 실제로 참조하는 파일만 모아 번들을 만들고,
+# 파일 이름에 내용 해시를 붙이고, .gz/.br 압축본을 함께 만든다 (asap.assets)
+STATICFILES_STORAGE = 'asap.assets.BundledManifestStorage'
+STATICFILES_FINDERS = [
+    'django.contrib.staticfiles.finders.FileSystemFinder',
+    'asap.assets.ReferencedFinder',
+]
+# 켜져 있으면 템플릿이 asap.assets.BUNDLES의 묶음 파일 하나만 불러온다
+ASSET_BUNDLES = not DEBUG
+# 켜져 있으면 proj.wsgi가 STATIC_ROOT를 직접 서비스한다 (압축본 선택, 해시 파일은 1년 캐시).
+# collectstatic의 manifest가 없는 디렉터리는 서비스하지 않는다
+SERVE_STATIC = os.environ.get('SERVE_STATIC', '0' if DEBUG else '1') == '1'
 
 LOGIN_REDIRECT_URL = '/' 
 LOGOUT_REDIRECT_URL = '/'
@@ -136,7 +221,67 @@ EMAIL_HOST_USER = 'hanyangbslab@gmail.com'
 EMAIL_HOST_PASSWORD = 'bslab123'
 EMAIL_PORT = 587
 
+# 메일은 asap.outbox에 쌓아두고 요청 밖에서 보낸다.
+# OUTBOX_WORKER가 켜져 있으면 웹 프로세스 안의 스레드가, 아니면 `manage.py send_outbox --loop`가 발송한다.
+OUTBOX_WORKER = os.environ.get('OUTBOX_WORKER', '') == '1'
+OUTBOX_INTERVAL = 30
+
+# 수강신청 페이지의 실시간 좌석 현황 (proj.asgi, Server-Sent Events)
+# proj.asgi가 Django 앱까지 함께 서비스하면 LocalBroker로 충분하고,
+# 신청을 별도 WSGI 워커가 처리하면 SEAT_BROKER=asap.live.PollingBroker로 DB의 좌석 수 변화를 감지한다.
+SEAT_BROKER = os.environ.get('SEAT_BROKER', 'asap.live.LocalBroker')
+SEAT_EVENTS_TICK = 0.5
+# 비어 있으면 페이지가 이벤트 스트림에 접속하지 않는다. 예) SEAT_EVENTS_URL=/events/seats
+SEAT_EVENTS_URL = os.environ.get('SEAT_EVENTS_URL', '')
+
+# URL 이름별 사용자당 요청 한도: (한 번에 보낼 수 있는 요청 수, 초당 회복되는 요청 수)
+# 넘으면 asap.middleware.RateLimitMiddleware가 뷰를 실행하지 않고 429를 돌려준다.
+# 여러 워커가 한도를 공유하려면 RATE_LIMIT_CACHE가 공유 캐시(파일/Redis)를 가리켜야 한다
+RATE_LIMITS = {
+    'enroll_unit': (5, 0.5),
+    'enroll_page': (10, 1),
+    'cancel_unit': (5, 0.5),
+    'leave_waitlist': (5, 0.5),
+    'waitlist_position': (20, 2),  # 대기 중인 세션마다 15초에 한 번씩 조회
+    'lottery_preferences': (10, 1),
+}
+RATE_LIMIT_CACHE = os.environ.get('RATE_LIMIT_CACHE', 'default')
+
+# 신청 방식. 'first_come'은 선착순 신청, 'lottery'는 기간 동안 희망 세션을 순위대로 받은 뒤
+# `manage.py allocate_lottery`로 한 번에 배정한다(asap.lottery). 배정 후 first_come으로 돌리면 남은 자리를 선착순으로 받는다
+ENROLLMENT_MODE = os.environ.get('ENROLLMENT_MODE', 'first_come')
+LOTTERY_CHOICES = 10  # 학생 한 명이 낼 수 있는 희망 세션 수
+
+# 수강신청을 받는 학기. 비워 두면 실험이 등록된 가장 최근 학기. 예) CURRENT_SEMESTER=2019-1
+CURRENT_SEMESTER = os.environ.get('CURRENT_SEMESTER', '')
+
 SITE_ID = 1
 
+# 세션은 캐시에서 읽고 바뀔 때만 DB에 쓴다. 만료 연장은 asap.middleware.SessionRefreshMiddleware가
+# 유효기간의 절반이 지났을 때만 한다. 만료된 세션 행은 cron으로 `manage.py clearsessions`를 돌려 지운다.
+# 예) SESSION_ENGINE=django.contrib.sessions.backends.signed_cookies 이면 DB에 전혀 쓰지 않는다
+SESSION_ENGINE = os.environ.get('SESSION_ENGINE', 'django.contrib.sessions.backends.cached_db')
 SESSION_COOKIE_AGE = 12000
-SESSION_SAVE_EVERY_REQUEST = True
+
+
+# 요청별 쿼리 수/SQL 시간/응답 시간 로그 (asap.middleware.QueryInstrumentationMiddleware).
+# 기본은 같은 쿼리가 반복된(N+1) 요청만 WARNING으로 남긴다. 모든 요청을 보려면 PERF_LOG_LEVEL=INFO.
+# `manage.py test` 중에는 끈다
+TESTING = sys.argv[1:2] == ['test']
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'asap.perf': {
+            'handlers': ['console'],
+            'level': 'CRITICAL' if TESTING else os.environ.get('PERF_LOG_LEVEL', 'WARNING'),
+            'propagate': False,
+        },
+    },
+}
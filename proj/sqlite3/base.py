@@ -0,0 +1,28 @@
+"""SQLite backend tuned for many concurrent readers and short writes.
+
+Runs the PRAGMAs from ``OPTIONS['pragmas']`` on every new connection
+(settings.SQLITE_PRAGMAS: WAL journal, relaxed fsync, busy timeout, larger
+page cache) and lets ``asap.db.write_atomic`` open its transaction with
+``BEGIN IMMEDIATE``.
+"""
+from django.db.backends.sqlite3 import base
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    # 다음 트랜잭션을 BEGIN IMMEDIATE로 시작할지 여부 (asap.db.write_atomic이 설정)
+    begin_immediate = False
+
+    def get_connection_params(self):
+        kwargs = super().get_connection_params()
+        kwargs.pop('pragmas', None)
+        return kwargs
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        pragmas = self.settings_dict['OPTIONS'].get('pragmas', {})
+        for name, value in pragmas.items():
+            conn.execute('PRAGMA %s = %s' % (name, value))
+        return conn
+
+    def _start_transaction_under_autocommit(self):
+        self.cursor().execute('BEGIN IMMEDIATE' if self.begin_immediate else 'BEGIN')
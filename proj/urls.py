@@ -47,15 +47,29 @@ urlpatterns = [
             asap_view.delete_unit, name='delete_unit'),
 
     path('prof/manage', asap_view.list_manage_unit, name='list_manage_unit'),
+    path('prof/dashboard', asap_view.prof_dashboard, name='prof_dashboard'),
     re_path(r'^prof/manage/(?P<pk>[0-9]*)/$',
             asap_view.manage_unit, name='manage_unit'),
+    re_path(r'^prof/manage/(?P<pk>[0-9]*)/upload/$',
+            asap_view.upload_grades, name='upload_grades'),
+    re_path(r'^prof/manage/(?P<pk>[0-9]*)/export/$',
+            asap_view.export_unit, name='export_unit'),
+    re_path(r'^research/(?P<pk>[0-9]*)/export/$',
+            asap_view.export_research, name='export_research'),
+    path('staff/export/records', asap_view.export_semester, name='export_semester'),
+    path('staff/perf', asap_view.perf_summary, name='perf_summary'),
 
     #학생 메뉴
     path('research/enroll', asap_view.enroll_view_unit, name='enroll_page'),
+    path('research/preferences', asap_view.lottery_preferences, name='lottery_preferences'),
     re_path(r'^research/enroll/(?P<pk>[0-9]*)/$',
             asap_view.enroll_unit, name='enroll_unit'),
     re_path(r'^research/cancel/(?P<pk>[0-9]*)/$',
             asap_view.cancel_unit, name='cancel_unit'),
+    re_path(r'^research/waitlist/(?P<pk>[0-9]*)/$',
+            asap_view.waitlist_position, name='waitlist_position'),
+    re_path(r'^research/waitlist/(?P<pk>[0-9]*)/cancel/$',
+            asap_view.leave_waitlist, name='leave_waitlist'),
     path('student/myresearch', asap_view.my_research_student, name='my_research_student'),
 
     #실험 조회 및 정보
@@ -63,6 +77,12 @@ urlpatterns = [
     re_path(r'^research/info/(?P<pk>[0-9]*)/$',
             asap_view.research_info, name='research_info'),
 
+    #JSON API
+    path('api/researches', asap_view.api_researches, name='api_researches'),
+    re_path(r'^api/researches/(?P<pk>[0-9]+)$', asap_view.api_research, name='api_research'),
+    path('api/units', asap_view.api_units, name='api_units'),
+    path('api/me/records', asap_view.api_my_records, name='api_my_records'),
+
     #개인 설정 메뉴
     path('mypage/', asap_view.my_page, name='my_page'),
     path('mypage/changepassword/', asap_view.change_password, name='change_password'),